@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio variants of the search services and `download_and_build`
+constructors, to be used from an event loop (requires aiohttp, and Python
+3.6 or later: the paginated searches are asynchronous generators).
+
+The network calls are asynchronous while the parsing stays synchronous: it
+runs in `executor` (the loop default executor if None, a
+`concurrent.futures.ProcessPoolExecutor` can be given to parse on many cores)
+so html5lib never blocks the loop.
+
+    >>> async with AsyncTransport(limit_per_host=50) as transport:
+    ...     amendement = await download_and_build_amendement(url, transport)
+
+The search services close the transport they create when none is given:
+
+    >>> async with AsyncQuestionSearchService() as service:
+    ...     count = await service.total_count(legislature=15)
+"""
+import asyncio
+import json
+from collections import deque
+from functools import partial
+from itertools import islice
+
+import attr
+
+from anpy.amendement import (AmendementSearchService, parse_amendement,
+                             parse_amendements_summary)
+from anpy.question import (RE_PAGE_OFFSET, QuestionSearchCursor,
+                           QuestionSearchService, parse_question_search_result)
+from anpy.scrutin import parse_scrutin
+from anpy.transport import DEFAULT_TIMEOUT, FileTransport
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+@attr.s
+class Response(object):
+    url = attr.ib(default=None)
+    status_code = attr.ib(default=None)
+    content = attr.ib(default=None)
+    encoding = attr.ib(default=None)
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncTransport(object):
+    """
+    aiohttp based transport, the session is opened on the first request.
+
+    :param timeout: (connect timeout, read timeout) in seconds
+    :param limit: maximum number of simultaneous connections
+    :param limit_per_host: maximum number of simultaneous connections per host
+    :param headers: headers sent with every request
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT, limit=100, limit_per_host=10,
+                 headers=None):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required to use AsyncTransport')
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.headers = headers
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            connect_timeout, read_timeout = self.timeout
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit, limit_per_host=self.limit_per_host),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout,
+                                              sock_read=read_timeout),
+                headers=self.headers)
+        return self._session
+
+    async def request(self, method, url, params=None, data=None):
+        async with self.session.request(method, url,
+                                        params=_clean_params(params),
+                                        data=_clean_params(data)) as resp:
+            content = await resp.read()
+            return Response(url=str(resp.url), status_code=resp.status,
+                            content=content, encoding=resp.charset)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncFileTransport(object):
+    """Asynchronous counterpart of `anpy.transport.FileTransport`"""
+    def __init__(self, routes, encoding=None):
+        self.transport = FileTransport(routes, encoding=encoding)
+
+    async def request(self, method, url, **kwargs):
+        resp = self.transport.request(method, url, **kwargs)
+        return Response(url=resp.url, status_code=resp.status_code,
+                        content=resp.content, encoding=resp.encoding)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+def _clean_params(params):
+    # requests silently drops None values, aiohttp rejects them
+    if not isinstance(params, dict):
+        return params
+    return {key: str(value) for key, value in params.items()
+            if value is not None}
+
+
+# get_running_loop is Python 3.7+, get_event_loop gives the running loop too
+# when called from a coroutine
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+async def run_parser(executor, func, *args):
+    loop = _get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def _concurrent_map(func, iterable, concurrency):
+    # asynchronous equivalent of anpy.utils.concurrent_map, an asynchronous
+    # generator like the paginated searches: Python 3.6+ (tests/conftest.py
+    # does not collect the aio tests before)
+    iterator = iter(iterable)
+    pending = deque(asyncio.ensure_future(func(item))
+                    for item in islice(iterator, max(concurrency, 1)))
+    try:
+        while pending:
+            result = await pending.popleft()
+            for item in islice(iterator, 1):
+                pending.append(asyncio.ensure_future(func(item)))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def download_and_build_amendement(url, transport, executor=None,
+                                        engine='html5lib'):
+    response = await transport.get(url)
+    return await run_parser(executor, partial(parse_amendement, engine=engine),
+                            url, response.content)
+
+
+async def download_and_build_scrutin(url, transport, executor=None):
+    response = await transport.get(url)
+    return await run_parser(executor, parse_scrutin, url, response.content)
+
+
+class _AsyncService(object):
+    """
+    Closes the `AsyncTransport` created by the service when none was given,
+    with `await service.close()` or `async with service:`
+    """
+    _owns_transport = False
+
+    async def close(self):
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncAmendementSearchService(_AsyncService, AmendementSearchService):
+    def __init__(self, transport=None, concurrency=10):
+        super(AsyncAmendementSearchService, self).__init__(
+            transport=transport or AsyncTransport(), concurrency=concurrency)
+        self._owns_transport = transport is None
+
+    async def get(self, **kwargs):
+        params = self.build_params(**kwargs)
+        response = await self.transport.get(self.base_url, params=params)
+        return parse_amendements_summary(response.url, response.json())
+
+    async def total_count(self, **kwargs):
+        kwargs_copy = kwargs.copy()
+        kwargs_copy['rows'] = 1
+        response = await self.get(**kwargs_copy)
+        return response.total_count
+
+    async def iterator(self, concurrency=None, **kwargs):
+        rows = kwargs.get('rows', self.default_params['rows'])
+        if concurrency is None:
+            concurrency = self.concurrency
+
+        response = await self.get(**kwargs)
+        yield response
+
+        async def get_page(start):
+            kwargs_copy = kwargs.copy()
+            kwargs_copy['start'] = start + 1
+            return await self.get(**kwargs_copy)
+
+        starts = range(rows, response.total_count, rows)
+        async for page in _concurrent_map(get_page, starts, concurrency):
+            yield page
+
+    async def get_order(self, **kwargs):
+        order = []
+        async for it in self.iterator(**kwargs):
+            order += [amendement.num_amend for amendement in it.results]
+        return order
+
+
+class AsyncQuestionSearchService(_AsyncService, QuestionSearchService):
+    def __init__(self, transport=None, executor=None, concurrency=10):
+        super(AsyncQuestionSearchService, self).__init__(
+            transport=transport or AsyncTransport(), concurrency=concurrency)
+        self._owns_transport = transport is None
+        self.executor = executor
+
+    async def get(self, legislature=14, is_answered=None, is_removed=None,
+                  size=10):
+        params = self.build_params(legislature=legislature,
+                                   is_answered=is_answered,
+                                   is_removed=is_removed, size=size)
+        response = await self.transport.post(self.search_url, data=params)
+        return await run_parser(self.executor, parse_question_search_result,
+                                response.url, response.content)
+
+    async def get_page(self, url):
+        response = await self.transport.get(self.base_url + url)
+        return await run_parser(self.executor, parse_question_search_result,
+                                response.url, response.content)
+
+    async def total_count(self, legislature=14, is_answered=None,
+                          is_removed=None):
+        search_results = await self.get(legislature=legislature,
+                                        is_answered=is_answered,
+                                        is_removed=is_removed, size=1)
+        return search_results.total_count
+
+    async def iter(self, legislature=14, is_answered=None, is_removed=None,
+                   size=10, concurrency=None):
+        cursor = QuestionSearchCursor(legislature=legislature,
+                                      is_answered=is_answered,
+                                      is_removed=is_removed, size=size)
+        async for page in self.iter_from(cursor, concurrency=concurrency):
+            yield page
+
+    async def iter_from(self, cursor, concurrency=None):
+        if concurrency is None:
+            concurrency = self.concurrency
+
+        first_page = await self.get(legislature=cursor.legislature,
+                                    is_answered=cursor.is_answered,
+                                    is_removed=cursor.is_removed,
+                                    size=cursor.size)
+        cursor.total_count = first_page.total_count
+
+        if cursor.offset == 0:
+            yield first_page
+            cursor.offset = cursor.size
+
+        if first_page.next_url is None:
+            return
+
+        offsets = range(cursor.offset, cursor.total_count, cursor.size)
+        urls = (RE_PAGE_OFFSET.sub('(offset)/%d' % offset, first_page.next_url)
+                for offset in offsets)
+        offsets_iterator = iter(offsets)
+        async for page in _concurrent_map(self.get_page, urls, concurrency):
+            offset = next(offsets_iterator)
+            yield page
+            cursor.offset = offset + cursor.size
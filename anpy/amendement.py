@@ -3,12 +3,14 @@
 import logging
 import re
 import time
+from functools import partial
 
 import attr
-import requests
-from bs4 import BeautifulSoup, NavigableString, Comment
+from bs4 import BeautifulSoup, NavigableString, Comment, SoupStrainer
 
-from anpy.utils import convert_camelcase_to_underscore
+from anpy.bulk import bulk_download_and_build
+from anpy.transport import get_default_transport
+from anpy.utils import concurrent_map, convert_camelcase_to_underscore
 
 LOGGER = logging.getLogger(__name__)
 
@@ -49,21 +51,38 @@ def parse_amendements_summary(url, json_response):
     })
 
 
-def parse_amendement(url, html_response):
-    soup = BeautifulSoup(html_response, "html5lib")
+AMENDEMENT_META_NAMES = [
+    'NUM_AMTXT', 'NUM_AMEND', 'AMEND_PARENT', 'URL_DOSSIER', 'NUM_INIT',
+    'ETAPE', 'DELIBERATION', 'TITRE_INIT', 'NUM_PARTIE',
+    'DESIGNATION_ARTICLE', 'URL_DIVISION', 'DESIGNATION_ALINEA', 'MISSION',
+    'AUTEURS', 'AUTEUR_ID', 'GROUPE_ID', 'COSIGNATAIRES_ID', 'SEANCE',
+    'SORT', 'DATE_BADAGE', 'DATE_SORT', 'ORDRE_TEXTE', 'CODE', 'REFCODE',
+    'LEGISLATURE',
+]
 
-    meta_names = [
-        'NUM_AMTXT', 'NUM_AMEND', 'AMEND_PARENT', 'URL_DOSSIER', 'NUM_INIT',
-        'ETAPE', 'DELIBERATION', 'TITRE_INIT', 'NUM_PARTIE',
-        'DESIGNATION_ARTICLE', 'URL_DIVISION', 'DESIGNATION_ALINEA', 'MISSION',
-        'AUTEURS', 'AUTEUR_ID', 'GROUPE_ID', 'COSIGNATAIRES_ID', 'SEANCE',
-        'SORT', 'DATE_BADAGE', 'DATE_SORT', 'ORDRE_TEXTE', 'CODE', 'REFCODE',
-        'LEGISLATURE',
-    ]
+# html5lib: the reference parser, slow
+# lxml: same output, builds the whole tree with lxml
+# targeted: same output, lxml only builds the elements read by the parser
+PARSER_ENGINES = ('html5lib', 'lxml', 'targeted')
+
+
+def make_amendement_soup(html_response, engine='html5lib'):
+    if engine == 'html5lib':
+        return BeautifulSoup(html_response, 'html5lib')
+    elif engine == 'lxml':
+        return BeautifulSoup(html_response, 'lxml')
+    elif engine == 'targeted':
+        return BeautifulSoup(html_response, 'lxml', parse_only=SoupStrainer(
+            ['meta', 'dispositif', 'expose']))
+    raise ValueError('Unknown parser engine: %s' % engine)
+
+
+def parse_amendement(url, html_response, engine='html5lib'):
+    soup = make_amendement_soup(html_response, engine)
 
     kwargs = dict((meta_name.lower(), clean_text(soup.find(
         'meta', attrs={'name': meta_name})['content']))
-        for meta_name in meta_names)
+        for meta_name in AMENDEMENT_META_NAMES)
     kwargs['auteurs'] = kwargs['auteurs'].replace(u'\xa0', ' ')
     kwargs['dispositif'] = clean_text(remove_inline_css_and_invalid_tags(
         soup.find('dispositif')))
@@ -75,7 +94,9 @@ def parse_amendement(url, html_response):
 
 
 class AmendementSearchService(object):
-    def __init__(self):
+    def __init__(self, transport=None, concurrency=1):
+        self.transport = transport or get_default_transport()
+        self.concurrency = concurrency
         self.base_url = "http://www2.assemblee-nationale.fr/recherche/query_amendements"  # noqa
         self.default_params = {
             'texteRecherche': None,
@@ -97,6 +118,11 @@ class AmendementSearchService(object):
             'typeDocument': 'amendement',
         }
 
+    def build_params(self, **kwargs):
+        params = self.default_params.copy()
+        params.update(kwargs)
+        return params
+
     def get(self, **kwargs):
         """
         :param texteRecherche:
@@ -113,11 +139,10 @@ class AmendementSearchService(object):
         :param start:
         :param sort:
         """
-        params = self.default_params.copy()
-        params.update(kwargs)
+        params = self.build_params(**kwargs)
 
         start = time.time()
-        response = requests.get(self.base_url, params=params)
+        response = self.transport.get(self.base_url, params=params)
         end = time.time()
 
         LOGGER.debug(
@@ -134,8 +159,15 @@ class AmendementSearchService(object):
         response = self.get(**kwargs_copy)
         return response.total_count
 
-    def iterator(self, **kwargs):
+    def iterator(self, concurrency=None, **kwargs):
+        """
+        Iterate over all the result pages of a search, pages after the first
+        one are fetched by `concurrency` threads (defaults to the service
+        concurrency) and are yielded in order.
+        """
         rows = kwargs.get('rows', self.default_params['rows'])
+        if concurrency is None:
+            concurrency = self.concurrency
 
         response = self.get(**kwargs)
 
@@ -149,17 +181,22 @@ class AmendementSearchService(object):
 
         yield response
 
-        for start in range(rows, response.total_count, rows):
+        def get_page(start):
+            kwargs_copy = kwargs.copy()
+            kwargs_copy['start'] = start + 1
+            return self.get(**kwargs_copy)
+
+        starts = range(rows, response.total_count, rows)
+        for start, page in zip(starts, concurrent_map(get_page, starts,
+                                                      concurrency)):
             LOGGER.debug('amendements fetched: %s / %s (%.1f%%)',
                          rows + start,
                          response.total_count,
                          (rows + start) / response.total_count * 100)
-            kwargs_copy = kwargs.copy()
-            kwargs_copy['start'] = start + 1
-            yield self.get(**kwargs_copy)
+            yield page
 
     def get_order(self, **kwargs):
-        iterator = AmendementSearchService().iterator(**kwargs)
+        iterator = self.iterator(**kwargs)
         order = []
         for it in iterator:
             order += [amendement.num_amend for amendement in it.results]
@@ -226,8 +263,22 @@ class Amendement(object):
     num_amend = attr.ib(default=None)
 
     @staticmethod
-    def download_and_build(url):
-        return parse_amendement(url, requests.get(url).content)
+    def download_and_build(url, transport=None, engine='html5lib'):
+        transport = transport or get_default_transport()
+        return parse_amendement(url, transport.get(url).content, engine=engine)
+
+
+def download_amendements(urls, transport=None, io_workers=8, cpu_workers=None,
+                         engine='html5lib'):
+    """
+    Build the `Amendement` of each url of `urls` (for instance the `url_amend`
+    of the summaries), see `anpy.bulk.bulk_download_and_build`.
+    """
+    return bulk_download_and_build(urls, partial(parse_amendement,
+                                                 engine=engine),
+                                   transport=transport,
+                                   io_workers=io_workers,
+                                   cpu_workers=cpu_workers)
 
 
 def clean_text(text):
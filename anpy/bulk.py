@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk download of pages: fetching is done by a pool of threads while the
+parsing runs in a pool of processes, so both the network and the CPUs are
+kept busy.
+"""
+import json
+import logging
+import os
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from itertools import islice
+
+import attr
+
+from anpy.transport import get_default_transport
+
+LOGGER = logging.getLogger(__name__)
+
+
+@attr.s
+class BulkResult(object):
+    url = attr.ib(default=None)
+    value = attr.ib(default=None)
+    error = attr.ib(default=None)
+
+
+def resume_jsonl(path, key):
+    """
+    Values of `key` in the JSON lines already written in `path`, to skip
+    them when resuming. A last line without its newline, left by an
+    interrupted run, is removed so that the file can be appended to; the
+    other invalid lines are logged and skipped.
+    """
+    values = set()
+    if not os.path.exists(path):
+        return values
+    with open(path, 'rb+') as f:
+        end = 0
+        for number, line in enumerate(f, 1):
+            if not line.endswith(b'\n'):
+                LOGGER.warning('%s: dropping the truncated line at byte %d', path, end)
+                f.truncate(end)
+                break
+            end += len(line)
+            try:
+                values.add(json.loads(line.decode('utf-8'))[key])
+            except (ValueError, KeyError, TypeError) as error:
+                LOGGER.warning('%s: skipping the invalid line %d: %r', path, number, error)
+    return values
+
+
+def _fetch(transport, url):
+    response = transport.get(url)
+    response.raise_for_status()
+    return response.content
+
+
+def _fetch_and_parse(transport, parse, url):
+    return parse(url, _fetch(transport, url))
+
+
+def bulk_download_and_build(urls, parse, transport=None, io_workers=8,
+                            cpu_workers=None, max_pending=None):
+    """
+    Download and parse every url of `urls` with `parse(url, content)`,
+    yielding a `BulkResult` per url as soon as it is ready (so not in the
+    order of `urls`). Failed urls are yielded with their `error` set.
+
+    :param urls: iterable of urls, consumed lazily
+    :param parse: picklable function used to build the results
+    :param io_workers: number of threads downloading the pages
+    :param cpu_workers: number of processes parsing the pages, defaults to the
+                        number of CPUs; with 0 the pages are parsed by the
+                        downloading threads
+    :param max_pending: maximum number of urls being processed at once,
+                        defaults to four times `io_workers`
+    """
+    transport = transport or get_default_transport()
+    if cpu_workers is None:
+        cpu_workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = io_workers * 4
+
+    urls = iter(urls)
+    pending = {}  # future -> (url, is_download)
+
+    io_executor = ThreadPoolExecutor(max_workers=io_workers)
+    cpu_executor = ProcessPoolExecutor(max_workers=cpu_workers) \
+        if cpu_workers else None
+
+    def submit(count):
+        for url in islice(urls, count):
+            if cpu_executor:
+                future = io_executor.submit(_fetch, transport, url)
+            else:
+                future = io_executor.submit(_fetch_and_parse,
+                                            transport, parse, url)
+            pending[future] = (url, cpu_executor is not None)
+
+    try:
+        submit(max_pending)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, is_download = pending.pop(future)
+
+                error = future.exception()
+                if error is not None:
+                    LOGGER.warning('failed to build %s: %r', url, error)
+                    submit(1)
+                    yield BulkResult(url=url, error=error)
+                elif is_download:
+                    parsing = cpu_executor.submit(parse, url, future.result())
+                    pending[parsing] = (url, False)
+                else:
+                    submit(1)
+                    yield BulkResult(url=url, value=future.result())
+    finally:
+        for future in pending:
+            future.cancel()
+        io_executor.shutdown()
+        if cpu_executor:
+            cpu_executor.shutdown()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk HTTP cache for the scrapers.
+
+`CachingTransport` wraps a transport and stores every successful GET response
+with its `ETag` and `Last-Modified` headers. A cached response is served as
+long as it is fresh; after that it is revalidated with a conditional GET, so
+an unchanged page costs a `304 Not Modified` instead of a full download.
+
+With `stream=True` the body is copied to the cache in chunks and the
+response reads it from the cached file, so a large zip is never held in
+memory.
+
+    >>> transport = CachingTransport(directory='/tmp/anpy-cache')
+    >>> Scrutin.download_and_build(url, transport=transport)
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from anpy.transport import Transport
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'anpy')
+
+CURRENT_LEGISLATURE = 15
+
+# size of the chunks copied to the cache for the `stream=True` requests
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# in seconds, None means the cached responses never expire
+CURRENT_LEGISLATURE_TTL = 3600
+
+# the first pattern matching an url gives its legislature
+LEGISLATURE_PATTERNS = [
+    re.compile(r'\((?:legislature|legis)\)/(\d+)'),
+    re.compile(r'[?&]legislature=(\d+)'),
+    re.compile(r'questions\.assemblee-nationale\.fr/q(\d+)/'),
+    re.compile(r'/repository/(\d+)/'),
+    re.compile(r'archive-AN-doslegs/master/archive/(\d+)/'),
+    re.compile(r'assemblee-nationale\.fr/(?:dyn/)?(\d+)/'),
+]
+
+
+def find_legislature(url):
+    for pattern in LEGISLATURE_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return int(match.group(1))
+
+
+def legislature_ttl(url, current_legislature=CURRENT_LEGISLATURE,
+                    current_ttl=CURRENT_LEGISLATURE_TTL):
+    """
+    Time to live of a cached response: pages of a closed legislature do not
+    change anymore, the other ones (current legislature or unknown) expire
+    after `current_ttl` seconds.
+    """
+    legislature = find_legislature(url)
+    if legislature is not None and legislature < current_legislature:
+        return None
+    return current_ttl
+
+
+class CachingTransport(object):
+    """
+    Transport caching the GET responses on disk, the other methods are sent
+    as is to the wrapped transport.
+
+    :param transport: transport doing the actual requests, a new `Transport`
+                      if None
+    :param directory: where the responses are stored
+    :param ttl: function giving the time to live in seconds of the response
+                of an url, None for a response that never expires
+    """
+    def __init__(self, transport=None, directory=DEFAULT_CACHE_DIR,
+                 ttl=legislature_ttl):
+        self.transport = transport or Transport()
+        self.directory = directory
+        self.ttl = ttl
+
+    def request(self, method, url, params=None, **kwargs):
+        if method.upper() != 'GET':
+            return self.transport.request(method, url, params=params, **kwargs)
+
+        stream = kwargs.get('stream', False)
+        full_url = requests.Request(method, url, params=params).prepare().url
+        path = self.path(full_url)
+        meta = self.load_meta(path)
+
+        if meta is not None and self.is_fresh(full_url, meta):
+            LOGGER.debug('cache hit: %s', full_url)
+            return self.build_response(path, meta, stream=stream)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.transport.request(method, url, params=params,
+                                          headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            LOGGER.debug('cache revalidated: %s', full_url)
+            meta['fetched_at'] = time.time()
+            meta['etag'] = response.headers.get('ETag', meta.get('etag'))
+            meta['last_modified'] = response.headers.get(
+                'Last-Modified', meta.get('last_modified'))
+            self.write(path + '.json', json.dumps(meta).encode('utf-8'))
+            return self.build_response(path, meta, stream=stream)
+
+        if response.status_code == 200:
+            LOGGER.debug('cache store: %s', full_url)
+            meta = self.store(path, full_url, response, stream=stream)
+            if stream:
+                # the body was consumed by the copy to the cache
+                response.close()
+                response = self.build_response(path, meta, stream=True)
+                response.from_cache = False
+                return response
+        response.from_cache = False
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def is_fresh(self, url, meta):
+        ttl = self.ttl(url)
+        return ttl is None or time.time() - meta['fetched_at'] < ttl
+
+    def load_meta(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path + '.json', 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except (IOError, ValueError):
+            return None
+
+    def store(self, path, url, response, stream=False):
+        """
+        Write the body of `response` and its meta in the cache, return the
+        meta. With `stream`, the body is copied in chunks.
+        """
+        meta = {
+            'url': url,
+            'final_url': response.url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        # the body goes first: a response is only cached with its meta
+        if stream:
+            self.write_chunks(path, response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        else:
+            self.write(path, response.content)
+        self.write(path + '.json', json.dumps(meta).encode('utf-8'))
+        return meta
+
+    def write(self, path, content):
+        self.write_chunks(path, [content])
+
+    def write_chunks(self, path, chunks):
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+    def build_response(self, path, meta, stream=False):
+        """
+        Response of the cached body, read from the cached file as it is
+        consumed when `stream` is True
+        """
+        response = requests.Response()
+        if stream:
+            response.raw = open(path, 'rb')
+            response._content = False
+            response._content_consumed = False
+        else:
+            with open(path, 'rb') as f:
+                response._content = f.read()
+            response._content_consumed = True
+        response.url = meta['final_url']
+        response.status_code = meta['status_code']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = meta['encoding']
+        response.from_cache = True
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -5,13 +5,11 @@ import re
 from builtins import map, filter, str
 from operator import itemgetter
 
-import mistune
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString
 from future.utils import iteritems
-from html2text import html2text
 from six.moves.urllib.parse import urljoin
 
+from anpy.transport import get_default_transport
 from anpy.utils import extract_datetime
 
 AN_BASE_URL = 'http://www.assemblee-nationale.fr'
@@ -32,11 +30,12 @@ class Dossier(object):
         self.steps = steps or []
 
     @staticmethod
-    def download_and_build(url):
-        resp = requests.get(url)
+    def download_and_build(url, transport=None, engine='markdown'):
+        transport = transport or get_default_transport()
+        resp = transport.get(url)
         if resp.status_code >= 400:
             raise InvalidResponseException('%s: %d' % (url, resp.status_code))
-        return DossierParser(url, resp.content).parse()
+        return DossierParser(url, resp.content, engine=engine).parse()
 
     def to_dict(self):
         return {
@@ -93,10 +92,19 @@ class LegislativeActType(object):
 
 
 class DossierParser(object):
-    def __init__(self, url, html):
+    """
+    :param engine: 'markdown' normalizes the page with `clean_html`,
+                   'direct' with `normalize_html` which is much faster
+    """
+    def __init__(self, url, html, engine='markdown'):
         self.url = url
         self.html = html
-        self.soup = BeautifulSoup(clean_html(html), 'html5lib')
+        if engine == 'markdown':
+            self.soup = BeautifulSoup(clean_html(html), 'html5lib')
+        elif engine == 'direct':
+            self.soup = normalize_html(html)
+        else:
+            raise ValueError('Unknown normalization engine: %s' % engine)
 
     def parse(self):
         return Dossier(
@@ -177,6 +185,10 @@ class DossierParser(object):
 
 
 def clean_html(html):
+    # only the markdown engine needs them
+    import mistune
+    from html2text import html2text
+
     soup = BeautifulSoup(html, 'html5lib')
     if soup.body.header:
         soup.body.header.extract()
@@ -184,6 +196,120 @@ def clean_html(html):
     return mistune.markdown(md_text).replace('<br>\n', '</p>\n<p>')
 
 
+class BlockNormalizer(object):
+    """
+    Direct equivalent of `clean_html`: walks the page once and splits its
+    content into flat `p` (or heading) blocks at every block-level element
+    and `<br>`, keeping only the links and emphasis as inline elements.
+    """
+    BLOCK_TAGS = {
+        'address', 'article', 'aside', 'blockquote', 'body', 'center', 'dd',
+        'div', 'dl', 'dt', 'fieldset', 'figure', 'footer', 'form', 'h1', 'h2',
+        'h3', 'h4', 'h5', 'h6', 'header', 'li', 'main', 'nav', 'ol', 'p',
+        'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead',
+        'tr', 'ul',
+    }
+    BREAK_TAGS = {'br', 'hr'}
+    HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    IGNORED_TAGS = {'head', 'script', 'style', 'noscript'}
+    INLINE_TAGS = {'a': 'a', 'b': 'strong', 'strong': 'strong',
+                   'i': 'em', 'em': 'em'}
+    RE_SPACES = re.compile(r'\s+')
+
+    def __init__(self):
+        self.soup = BeautifulSoup('', 'html.parser')
+        self.block = None
+        self.block_name = 'p'
+        self.inlines = []  # inline tags opened in the current block
+        self.ends_with_space = True
+
+    def normalize(self, html):
+        page = BeautifulSoup(html, 'lxml')
+        body = page.body or page
+        if body.header:
+            body.header.extract()
+        self.walk(body)
+        self.end_block()
+        return self.soup
+
+    def walk(self, node):
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if type(child) in (NavigableString, CData):
+                    self.add_text(child)
+            elif child.name in self.IGNORED_TAGS:
+                continue
+            elif child.name in self.BREAK_TAGS:
+                self.end_block()
+            elif child.name in self.BLOCK_TAGS:
+                self.end_block()
+                if child.name in self.HEADING_TAGS:
+                    self.block_name = child.name
+                self.walk(child)
+                self.end_block()
+            elif child.name == 'img':
+                self.add_node(self.soup.new_tag('img', src=child.get('src', ''),
+                                                alt=child.get('alt', '')))
+            elif self.is_inline(child):
+                self.open_inline(child)
+                self.walk(child)
+                self.inlines.pop()
+            else:
+                self.walk(child)
+
+    def is_inline(self, node):
+        if node.name == 'a':
+            # anchors and internal links are dropped like html2text does
+            href = node.get('href')
+            return bool(href) and not href.startswith('#')
+        return node.name in self.INLINE_TAGS
+
+    def open_inline(self, node):
+        attrs = {'href': node['href']} if node.name == 'a' else {}
+        tag = self.soup.new_tag(self.INLINE_TAGS[node.name], **attrs)
+        if self.block is not None:
+            self.add_node(tag)
+        self.inlines.append(tag)
+
+    def start_block(self):
+        self.block = self.soup.new_tag(self.block_name)
+        # inline tags spanning many blocks are re-opened in each of them
+        parent = self.block
+        for i, tag in enumerate(self.inlines):
+            tag = self.soup.new_tag(tag.name, **tag.attrs)
+            parent.append(tag)
+            self.inlines[i] = parent = tag
+
+    def add_node(self, node):
+        if self.block is None:
+            self.start_block()
+        (self.inlines[-1] if self.inlines else self.block).append(node)
+
+    def add_text(self, text):
+        text = self.RE_SPACES.sub(' ', text.replace('\xa0', ' '))
+        if self.ends_with_space and text.startswith(' '):
+            text = text[1:]
+        if not text:
+            return
+        self.add_node(NavigableString(text))
+        self.ends_with_space = text.endswith(' ')
+
+    def end_block(self):
+        if self.block is not None:
+            strings = list(self.block.find_all(string=True))
+            if strings:
+                strings[-1].replace_with(strings[-1].rstrip())
+            if self.block.get_text() or self.block.find(['a', 'img']):
+                self.soup.append(self.block)
+        self.block = None
+        self.block_name = 'p'
+        self.ends_with_space = True
+
+
+def normalize_html(html):
+    return BlockNormalizer().normalize(html)
+
+
 def filter_dossier_element(element):
     return element.text.strip() and \
            not element.text.startswith('_') and \
@@ -4,16 +4,97 @@ Experiment to use the JSON formatted data provided by the AN for the doslegs
   python dossier_from_opendata.py <dosleg_url>
 """
 
+import itertools
+import os
 import sys
 import json
 import zipfile
-import io
 import re
+import tempfile
+from functools import lru_cache
 
 from lawfactory_utils.urls import download, enable_requests_cache, clean_url, parse_national_assembly_url
 
+from anpy.transport import get_configured_transport
+from anpy.utils import gc_paused
+
+# optional faster JSON decoders
+try:
+    import orjson as fast_json
+except ImportError:
+    try:
+        import ujson as fast_json
+    except ImportError:
+        fast_json = None
+
 
 OPENDATA_ID_REGEX = r'(.{4})([ANS]*)(R[0-9])([LS]*)([0-9]*)([BTACP]*)(.*)'
+OPENDATA_ID_RE = re.compile(OPENDATA_ID_REGEX)
+
+# legislature -> (name of the file holding the whole export or None when
+# there is a file per dossier/document, url of the zip)
+OPEN_DATA_DOSLEGS_FILES = {
+    15: (
+        None,
+        "http://data.assemblee-nationale.fr/static/openData/repository/15/loi/dossiers_legislatifs/Dossiers_Legislatifs_XV.json.zip",
+    ),
+    14: (
+        "Dossiers_Legislatifs_XIV.json",
+        "http://data.assemblee-nationale.fr/static/openData/repository/14/loi/dossiers_legislatifs/Dossiers_Legislatifs_XIV.json.zip",
+    ),
+}
+
+OPEN_DATA_REUNIONS_URL = "http://data.assemblee-nationale.fr/static/openData/repository/15/vp/reunions/Agenda_XV.json.zip"
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# number of zip members decoded by a worker at once
+DECODE_CHUNK_SIZE = 64
+
+
+def decode_json(raw):
+    """Decode UTF-8 encoded JSON bytes with the fastest decoder available"""
+    if fast_json is not None:
+        try:
+            return fast_json.loads(raw)
+        except ValueError:
+            pass  # the json module is more lenient (NaN, big integers)
+    return json.loads(raw.decode('utf-8'))
+
+
+# (pid, zip path) -> zip opened by a worker process on its first chunk, a
+# forked worker must not share the file position of its parent's zip
+_worker_zips = {}
+
+
+def _decode_members(zip_path, names):
+    key = (os.getpid(), zip_path)
+    if key not in _worker_zips:
+        _worker_zips[key] = zipfile.ZipFile(zip_path)
+    return [decode_json(_worker_zips[key].read(name)) for name in names]
+
+
+def decode_zip_members(data_zip, workers=0):
+    """
+    Yield (member name, decoded JSON) of every member of `data_zip`, in order.
+
+    :param workers: number of processes decoding the members, they are
+                    decoded in this process with 0 or when the zip has no
+                    path the workers could open
+    """
+    names = data_zip.namelist()
+    if not workers or not isinstance(data_zip.filename, str):
+        for name in names:
+            yield name, decode_json(data_zip.read(name))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [names[i:i + DECODE_CHUNK_SIZE] for i in range(0, len(names), DECODE_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        decoded_chunks = executor.map(_decode_members, itertools.repeat(data_zip.filename), chunks)
+        for chunk, decoded in zip(chunks, decoded_chunks):
+            yield from zip(chunk, decoded)
 
 
 def same_stage_step_instit(a, b):
@@ -22,38 +103,126 @@ def same_stage_step_instit(a, b):
 
 
 def yield_leafs(etape, path=None):
-    if path is None:
-        path = []
-    if etape.get("actesLegislatifs"):
-        for children in to_arr(etape["actesLegislatifs"]["acteLegislatif"]):
-            yield from yield_leafs(children, path=path + [etape])
+    """yield (parent actes, acte) for each leaf acte of `etape`, depth first"""
+    path = list(path or [])
+    stack = [iter((etape,))]
+    while stack:
+        for acte in stack[-1]:
+            if acte.get("actesLegislatifs"):
+                path.append(acte)
+                stack.append(iter(to_arr(acte["actesLegislatifs"]["acteLegislatif"])))
+                break
+            yield list(path), acte
+        else:
+            stack.pop()
+            if stack:
+                path.pop()
+
+
+@lru_cache(maxsize=None)
+def classify_code_acte(code):
+    """
+    Classify a leaf acte from its codeActe, computed once per distinct code
+
+    :returns: (institution, step, stage, skip), step is None for the unknown
+              step types and skip is True for the actes to ignore
+    """
+    if "AVIS-RAPPORT" in code or code == 'CMP-DEPOT' or '-DPTLETTRECT' in code:
+        return None, None, None, True
+
+    institution = None
+    if code.startswith("AN"):
+        institution = "assemblee"
+    elif code.startswith("SN"):
+        institution = "senat"
+
+    if "-DEPOT" in code:
+        step = "depot"
+    elif "-COM" in code:
+        step = "commission"
+    elif "-DEBATS" in code:
+        step = "hemicycle"
     else:
-        yield path, etape
+        return institution, None, None, False
+
+    stage = None
+    skip = False
+    if "1-" in code:
+        stage = "1ère lecture"
+    elif "2-" in code:
+        stage = "2ème lecture"
+    elif "3-" in code:
+        stage = "3ème lecture"  # TODO: else libelleCourt
+    elif "NLEC-" in code:
+        stage = "nouv. lect."
+    elif "ANLDEF-" in code:
+        stage = "l. définitive"
+        skip = step == "commission"
+    elif "CMP-" in code:
+        stage = "CMP"
+        if "-DEBATS-AN" in code:
+            institution = "assemblee"
+        elif "-SN" in code:
+            institution = "senat"
+            # ignore the cmp_commission_other_url for now
+            skip = "RAPPORT-SN" in code
+        else:
+            institution = "CMP"
+    elif "ANLUNI-" in code:
+        stage = "l. unique"
 
+    return institution, step, stage, skip
 
-# TODO : make this generic for the latest legislature, for instance by finding the url of the zip in http://data.assemblee-nationale.fr/reunions/reunions
-def find_texts_discussed_after(min_date, senate_urls=False, include_resolutions=False):
-    OPEN_DATA_REUNIONS_URL = "http://data.assemblee-nationale.fr/static/openData/repository/15/vp/reunions/Agenda_XV.json.zip"
-    reunions = convert_reunions_open_data_file(download_open_data_file(None, OPEN_DATA_REUNIONS_URL))
 
-    doslegs = set()
-    for reunion in to_arr(reunions['reunions']['reunion']):
+def yield_strings(obj):
+    if isinstance(obj, dict):
+        for value in obj.values():
+            yield from yield_strings(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from yield_strings(value)
+    elif isinstance(obj, str):
+        yield obj
 
-        date = reunion['timeStampDebut'].split('T')[0]
-        if date < min_date:
-            continue
 
-        if not reunion.get('ODJ') or not reunion['ODJ'].get('pointsODJ'):
-            continue
+def dossier_url(legislature, titreChemin):
+    """
+    url `parse` gives to a dosleg: its /dyn/ page from the XV legislature,
+    its .asp page before
+    """
+    if int(legislature) >= 15:
+        return "http://www.assemblee-nationale.fr/dyn/{}/dossiers/{}".format(legislature, titreChemin)
+    return "http://www.assemblee-nationale.fr/{}/dossiers/{}.asp".format(legislature, titreChemin)
+
+
+# TODO : make this generic for the latest legislature, for instance by finding the url of the zip in http://data.assemblee-nationale.fr/reunions/reunions
+def find_texts_discussed_after(min_date, senate_urls=False, include_resolutions=False, transport=None, store=None):
+    """
+    :param store: `OpenDataStore` to read the dossiers from, by default they
+                  are streamed from the open data zip
+    """
+    doslegs = set()
+    with OpenDataZip(OPEN_DATA_REUNIONS_URL, transport=transport) as reunions_zip:
+        for reunion in reunions_zip.reunions():
 
-        for pointODJ in to_arr(reunion['ODJ']['pointsODJ']['pointODJ']):
-            if not pointODJ['dossiersLegislatifsRefs']:
+            date = reunion['timeStampDebut'].split('T')[0]
+            if date < min_date:
                 continue
-            for dosleg in to_arr(pointODJ['dossiersLegislatifsRefs']['dossierRef']):
-                doslegs.add(dosleg)
 
-    dossiers_json = download_open_data_doslegs(15)
-    docs = {doc['dossierParlementaire']["uid"]: doc['dossierParlementaire'] for doc in dossiers_json["export"]["dossiersLegislatifs"]["dossier"]}
+            if not reunion.get('ODJ') or not reunion['ODJ'].get('pointsODJ'):
+                continue
+
+            for pointODJ in to_arr(reunion['ODJ']['pointsODJ']['pointODJ']):
+                if not pointODJ['dossiersLegislatifsRefs']:
+                    continue
+                for dosleg in to_arr(pointODJ['dossiersLegislatifsRefs']['dossierRef']):
+                    doslegs.add(dosleg)
+
+    if store is not None:
+        docs = store.dossiers(15)
+    else:
+        with open_data_doslegs_zip(15, transport=transport) as data_zip:
+            docs = {dossier["uid"]: dossier for dossier in data_zip.dossiers(uids=doslegs)}
 
     doslegs_urls = set()
     for dosleg_ref in doslegs:
@@ -70,8 +239,7 @@ def find_texts_discussed_after(min_date, senate_urls=False, include_resolutions=
             continue
 
         titreChemin = dossier["titreDossier"]["titreChemin"]
-        url_pattern = "http://www.assemblee-nationale.fr/dyn/{}/dossiers/{}"
-        url = url_pattern.format(dossier["legislature"], titreChemin)
+        url = dossier_url(dossier["legislature"], titreChemin)
         url_senat = dossier["titreDossier"]["senatChemin"]
         if url_senat and senate_urls:
             url = clean_url(url_senat)
@@ -86,9 +254,22 @@ def to_arr(obj):
     return [obj]
 
 
-def test_status(url):
+def fetch(url, transport=None):
+    """
+    GET `url` with `transport` (see `anpy.transport` and `anpy.cache`), or
+    with the default transport when one was set with
+    `anpy.transport.set_default_transport`, or else with
+    `lawfactory_utils.urls.download` (and its `enable_requests_cache`)
+    """
+    transport = transport or get_configured_transport()
+    if transport is None:
+        return download(url)
+    return transport.get(url)
+
+
+def test_status(url, transport=None):
     try:
-        resp = download(url)
+        resp = fetch(url, transport=transport)
         if resp.status_code != 200:
             return False
     except Exception:
@@ -96,16 +277,131 @@ def test_status(url):
     return resp
 
 
-def download_open_data_file(filename, file_url):
-    raw_data = download(file_url)
-    data_zip = zipfile.ZipFile(io.BytesIO(raw_data.content))
+def spool_open_data_file(file_url, transport=None):
+    """
+    Download `file_url` in a temporary file, deleted when closed (it is named
+    so that worker processes can open it)
+    """
+    transport = transport or get_configured_transport()
+    if transport is None:
+        resp = download(file_url)
+    else:
+        resp = transport.get(file_url, stream=True)
+    spool = tempfile.NamedTemporaryFile()
+    for chunk in resp.iter_content(chunk_size=SPOOL_CHUNK_SIZE):
+        spool.write(chunk)
+    resp.close()
+    spool.seek(0)
+    return spool
+
+
+def member_uid(name):
+    """uid of the object of a zip member, 'json/document/<uid>.json' -> '<uid>'"""
+    return name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+
+
+class OpenDataZip(object):
+    """
+    Open data zip spooled on disk whose JSON members are decoded one at a time
+
+    :param file_url: url of the zip
+    :param filename: member holding a whole export (like for the XIV
+                     doslegs), None when there is a member per object
+    """
+    def __init__(self, file_url, filename=None, transport=None):
+        self.filename = filename
+        self.zip = zipfile.ZipFile(spool_open_data_file(file_url, transport=transport))
+        self._export = None
+
+    def members(self, predicate=None):
+        """
+        yield (member name, decoded JSON)
+
+        :param predicate: function of a member name, only the members it
+                          accepts are decoded
+        """
+        for name in self.zip.namelist():
+            if self.filename and name != self.filename:
+                continue
+            if predicate is not None and not predicate(name):
+                continue
+            yield name, decode_json(self.zip.read(name))
+
+    def export(self):
+        """
+        Decoded `filename` member, the single file exports can only be loaded
+        at once so it is decoded once for both the dossiers and the documents
+        """
+        if self._export is None:
+            self._export = decode_json(self.zip.read(self.filename))["export"]
+        return self._export
+
+    def dossiers(self, uids=None):
+        """
+        yield each dossierParlementaire
+
+        :param uids: uids of the dossiers to yield, all of them if None
+        """
+        if self.filename:
+            for dossier in self.export()["dossiersLegislatifs"]["dossier"]:
+                if uids is None or dossier["dossierParlementaire"]["uid"] in uids:
+                    yield dossier["dossierParlementaire"]
+            return
+
+        def is_dossier(name):
+            return "dossierParlementaire" in name and (uids is None or member_uid(name) in uids)
+        for name, data in self.members(is_dossier):
+            yield data["dossierParlementaire"]
+
+    def documents(self, uids=None):
+        """
+        yield each document (texts of the doslegs)
+
+        :param uids: uids of the documents to yield, all of them if None
+        """
+        if self.filename:
+            for document in self.export()["textesLegislatifs"]["document"]:
+                if uids is None or document["uid"] in uids:
+                    yield document
+            return
+
+        def is_document(name):
+            return "dossierParlementaire" not in name and (uids is None or member_uid(name) in uids)
+        for name, data in self.members(is_document):
+            yield data["document"]
+
+    def reunions(self):
+        for name, data in self.members():
+            yield data["reunion"]
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_data_doslegs_zip(legislature, transport=None):
+    filename, file_url = OPEN_DATA_DOSLEGS_FILES[legislature]
+    return OpenDataZip(file_url, filename=filename, transport=transport)
+
+
+def download_open_data_file(filename, file_url, transport=None):
+    data_zip = zipfile.ZipFile(spool_open_data_file(file_url, transport=transport))
     if filename:
-        with data_zip.open(filename) as d:
-            return json.loads(d.read().decode('utf-8'))
+        with gc_paused():
+            return decode_json(data_zip.read(filename))
     return data_zip
 
 
-def convert_dossiers_open_data_file(data_zip):
+def convert_dossiers_open_data_file(data_zip, workers=0):
+    """
+    :param workers: number of processes decoding the members, see
+                    `decode_zip_members`
+    """
     data = {
         "export": {
             "@xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
@@ -117,9 +413,8 @@ def convert_dossiers_open_data_file(data_zip):
             }
         }
     }
-    for filename in data_zip.namelist():
-        with data_zip.open(filename) as d:
-            filedata = json.loads(d.read().decode('utf-8'))
+    with gc_paused():
+        for filename, filedata in decode_zip_members(data_zip, workers=workers):
             if "dossierParlementaire" in filename:
                 data["export"]["dossiersLegislatifs"]["dossier"].append(filedata)
             else:
@@ -133,409 +428,562 @@ def convert_reunions_open_data_file(data_zip):
             "reunion": []
         }
     }
-    for filename in data_zip.namelist():
-        with data_zip.open(filename) as d:
-            filedata = json.loads(d.read().decode('utf-8'))
+    with gc_paused():
+        for filename, filedata in decode_zip_members(data_zip):
             data["reunions"]["reunion"].append(filedata["reunion"])
     return data
 
 
-def download_open_data_doslegs(legislature):
-    files = {
-        15: (
-            None,
-            "http://data.assemblee-nationale.fr/static/openData/repository/15/loi/dossiers_legislatifs/Dossiers_Legislatifs_XV.json.zip",
-        ),
-        14: (
-            "Dossiers_Legislatifs_XIV.json",
-            "http://data.assemblee-nationale.fr/static/openData/repository/14/loi/dossiers_legislatifs/Dossiers_Legislatifs_XIV.json.zip",
-        ),
-    }
-    filename, file_url = files[legislature]
-    data = download_open_data_file(filename, file_url)
+def download_open_data_doslegs(legislature, transport=None, workers=0):
+    """
+    :param workers: number of processes decoding the zip members, see
+                    `decode_zip_members`
+    """
+    filename, file_url = OPEN_DATA_DOSLEGS_FILES[legislature]
+    data = download_open_data_file(filename, file_url, transport=transport)
     if filename is None:
-        data = convert_dossiers_open_data_file(data)
+        with data:
+            data = convert_dossiers_open_data_file(data, workers=workers)
     return data
 
 
+class OpenDataStore(object):
+    """
+    Open data doslegs of each legislature, downloaded once and indexed to
+    find a dosleg from its url without scanning the whole export.
+
+    :param transport: transport used for the downloads, see `fetch`
+    :param cache: dict legislature -> export already loaded (as returned by
+                  `download_open_data_doslegs`)
+    :param workers: number of processes decoding the exports
+    """
+    RE_URL_PATH = re.compile(r'(\d+/dossiers/[^/]*)$')
+
+    def __init__(self, transport=None, cache=None, workers=0):
+        self.transport = transport
+        self.workers = workers
+        self.cache = cache if cache is not None else {}
+        self._documents = {}
+        self._dossiers = {}
+        self._url_index = {}
+        self._text_urls = {}
+
+    def export(self, legislature):
+        if legislature not in self.cache:
+            self.cache[legislature] = download_open_data_doslegs(legislature, transport=self.transport, workers=self.workers)
+        return self.cache[legislature]
+
+    def documents(self, legislature):
+        """dict uid -> document of the texts of a legislature"""
+        if legislature not in self._documents:
+            self._documents[legislature] = {
+                doc["uid"]: doc for doc in self.export(legislature)["export"]["textesLegislatifs"]["document"]}
+        return self._documents[legislature]
+
+    def text_urls(self, legislature):
+        """dict uid -> url of the texts of a legislature, see `TextUrlResolver.source_urls`"""
+        if legislature not in self._text_urls:
+            self._text_urls[legislature] = TEXT_URL_RESOLVER.source_urls(self.documents(legislature).values())
+        return self._text_urls[legislature]
+
+    def dossiers(self, legislature):
+        """dict uid -> dossierParlementaire of a legislature, in the export order"""
+        if legislature not in self._dossiers:
+            self._dossiers[legislature] = {
+                doc["dossierParlementaire"]["uid"]: doc["dossierParlementaire"]
+                for doc in self.export(legislature)["export"]["dossiersLegislatifs"]["dossier"]}
+        return self._dossiers[legislature]
+
+    def url_index(self, legislature):
+        """
+        dict url suffix -> position in the export of the first dosleg
+        matching it, the suffixes are the ones `find` accepts
+        """
+        if legislature not in self._url_index:
+            index = {}
+            for i, dossier in enumerate(self.export(legislature)["export"]["dossiersLegislatifs"]["dossier"]):
+                dossier = dossier["dossierParlementaire"]
+                if dossier.get("@xsi:type") != "DossierLegislatif_Type":
+                    continue
+                titreChemin = dossier["titreDossier"]["titreChemin"]
+                for key in (
+                    "{}/dossiers/{}".format(dossier["legislature"], titreChemin),
+                    # dosleg might be from previous legislature
+                    "{}/dossiers/{}".format(int(dossier["legislature"]) + 1, titreChemin),
+                    # doslegs can also be accessed by uid
+                    dossier["uid"],
+                    dossier["uid"] + '.asp',
+                ):
+                    index.setdefault(key, i)
+            self._url_index[legislature] = index
+        return self._url_index[legislature]
+
+    def preload(self, legislatures):
+        """
+        Download and index the exports of `legislatures` now, before sharing
+        the store with forked processes for instance
+        """
+        for legislature in legislatures:
+            self.url_index(legislature)
+            self.documents(legislature)
+
+    def find(self, url, legislature):
+        """
+        First dosleg of the legislature export whose
+        `<legislature>/dossiers/<titreChemin>` (or the same path with the
+        next legislature) or uid ends the url, None if there is none
+        """
+        index = self.url_index(legislature)
+        candidates = [url.split('/')[-1]]
+        match = self.RE_URL_PATH.search(url)
+        if match:
+            candidates.append(match.group(1))
+        positions = [index[key] for key in candidates if key in index]
+        if positions:
+            return self.export(legislature)["export"]["dossiersLegislatifs"]["dossier"][min(positions)]["dossierParlementaire"]
+
+
+def match_dossier_url(dossier, url):
+    """
+    `<legislature>/dossiers/<titreChemin>` path of the dosleg if `url` leads
+    to it, None otherwise
+    """
+    if dossier.get("@xsi:type") != "DossierLegislatif_Type":
+        return None
+
+    titreChemin = dossier["titreDossier"]["titreChemin"]
+
+    # find the right dosleg even if it's an old url
+    url_common_part = "{}/dossiers/{}".format(dossier["legislature"], titreChemin)
+    if url.endswith(url_common_part):
+        return url_common_part
+    # dosleg might be from previous legislature
+    url_common_part = "{}/dossiers/{}".format(int(dossier["legislature"]) + 1, titreChemin)
+    if url.endswith(url_common_part):
+        return url_common_part
+    # doslegs can also be accessed by uid
+    if url.endswith(dossier["uid"]) or url.endswith(dossier["uid"] + '.asp'):
+        return url_common_part
+    return None
+
+
+def find_in_open_data_zip(url, legislature, transport=None):
+    """
+    First dosleg of the legislature matching `url` and the documents it
+    refers to, read from the open data zip one member at a time.
+
+    Returns (None, None) when no dosleg matches.
+    """
+    with open_data_doslegs_zip(legislature, transport=transport) as data_zip:
+        for dossier in data_zip.dossiers():
+            if match_dossier_url(dossier, url):
+                break
+        else:
+            return None, None
+        refs = set(yield_strings(dossier))
+        docs = {doc["uid"]: doc for doc in data_zip.documents(uids=refs)}
+    return dossier, docs
+
+
 def an_text_url_opendata(uid):
     return "http://www.assemblee-nationale.fr/dyn/opendata/%s.html" % uid
 
 
-def an_text_url(identifiant, code):
-    """
-    Port of the PHP function used by the National Assembly:
-
-    public function urlOpaque($identifiant, $codeType = NULL)
-    {
-        $datas = array(
-            'PRJL' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => ''),
-            'PION' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
-            'PNRECOMENQ' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
-            'PNREAPPART341' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
-            'PNREMODREGLTAN' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
-            'AVCE' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ace'),
-            'ETDI' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ei'),
-            'ACIN' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ai'),
-            'LETT' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-l'),
-            'PNRETVXINSTITEUROP' => array('repertoire' => 'europe/resolutions', 'prefixe' => 'ppe', 'suffixe' => ''),
-            'PNRE' => array('repertoire' => 'europe/resolutions', 'prefixe' => 'ppe', 'suffixe' => ''),
-            'RION' => array('repertoire' => '', 'prefixe' => '', 'suffixe' => ''),
-            'TCOM' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
-            'TCOMMODREGLTAN' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
-            'TCOMTVXINSTITEUROP' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
-            'TCOMCOMENQ' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
-            'TADO' => array('repertoire' => 'ta', 'prefixe' => 'ta', 'suffixe' => ''),
-        );
-        preg_match('/(.{4})([ANS]*)(R[0-9])([LS]*)([0-9]*)([BTACP]*)(.*)/', $identifiant, $matches);
-        $leg = $matches[5];
-        $typeTa = $matches[6];
-        $num = $matches[7];
-        switch ($typeTa) {
-            case 'BTC':
-                $type = 'TCOM';
-                break;
-            case 'BTA':
-                $type = 'TADO';
-                break;
-            default:
-                $type = $codeType;
-        }
-        $host = "http://www.assemblee-nationale.fr/";
-        return $host . $leg . "/" . $datas[$type]['repertoire'] . "/" . $datas[$type]['prefixe'] . $num . $datas[$type]['suffixe'] . ".pdf";
+# document type -> where the AN website publishes the texts of this type, the
+# table of the PHP function used by the National Assembly (see TextUrlResolver)
+AN_TEXT_TYPES = {
+    'PRJL': {
+        'repertoire': 'projets',
+        'prefixe': 'pl',
+        'suffixe': '',
+    },
+    'PION': {
+        'repertoire': 'propositions',
+        'prefixe': 'pion',
+        'suffixe': '',
+    },
+    'PNRECOMENQ': {
+        'repertoire': 'propositions',
+        'prefixe': 'pion',
+        'suffixe': '',
+    },
+    'PNREAPPART341': {
+        'repertoire': 'propositions',
+        'prefixe': 'pion',
+        'suffixe': '',
+    },
+    'PNREMODREGLTAN': {
+        'repertoire': 'propositions',
+        'prefixe': 'pion',
+        'suffixe': '',
+    },
+    'AVCE': {
+        'repertoire': 'projets',
+        'prefixe': 'pl',
+        'suffixe': '-ace',
+    },
+    'ETDI': {
+        'repertoire': 'projets',
+        'prefixe': 'pl',
+        'suffixe': '-ei',
+    },
+    'ACIN': {
+        'repertoire': 'projets',
+        'prefixe': 'pl',
+        'suffixe': '-ai',
+    },
+    'LETT': {
+        'repertoire': 'projets',
+        'prefixe': 'pl',
+        'suffixe': '-l',
+    },
+    'PNRETVXINSTITEUROP': {
+        'repertoire': 'europe/resolutions',
+        'prefixe': 'ppe',
+        'suffixe': '',
+    },
+    'PNRE': {
+        'repertoire': 'propositions',
+        'prefixe': 'pion',
+        'suffixe': '',
+    },
+    'RION': {
+        'repertoire': '',
+        'prefixe': '',
+        'suffixe': '',
+    },
+    'TCOM': {
+        'repertoire': 'ta-commission',
+        'prefixe': 'r',
+        'suffixe': '-a0',
+    },
+    'TCOMMODREGLTAN': {
+        'repertoire': 'ta-commission',
+        'prefixe': 'r',
+        'suffixe': '-a0',
+    },
+    'TCOMTVXINSTITEUROP': {
+        'repertoire': 'ta-commission',
+        'prefixe': 'r',
+        'suffixe': '-a0',
+    },
+    'TCOMCOMENQ': {
+        'repertoire': 'ta-commission',
+        'prefixe': 'r',
+        'suffixe': '-a0',
+    },
+    'TADO': {
+        'repertoire': 'ta',
+        'prefixe': 'ta',
+        'suffixe': '',
+    },
+    # NOT IN NATIONAL ASSEMBLY PHP CODE
+    'RAPP': {
+        'repertoire': 'rapports',
+        'prefixe': 'r',
+        'suffixe': '',
+    },
+    'RINF': {
+        'repertoire': 'rap-inf',
+        'prefixe': 'i',
+        'suffixe': '',
     }
+}
+
+
+class TextUrlResolver(object):
     """
-    datas = {
-        'PRJL': {
-            'repertoire': 'projets',
-            'prefixe': 'pl',
-            'suffixe': '',
-        },
-        'PION': {
-            'repertoire': 'propositions',
-            'prefixe': 'pion',
-            'suffixe': '',
-        },
-        'PNRECOMENQ': {
-            'repertoire': 'propositions',
-            'prefixe': 'pion',
-            'suffixe': '',
-        },
-        'PNREAPPART341': {
-            'repertoire': 'propositions',
-            'prefixe': 'pion',
-            'suffixe': '',
-        },
-        'PNREMODREGLTAN': {
-            'repertoire': 'propositions',
-            'prefixe': 'pion',
-            'suffixe': '',
-        },
-        'AVCE': {
-            'repertoire': 'projets',
-            'prefixe': 'pl',
-            'suffixe': '-ace',
-        },
-        'ETDI': {
-            'repertoire': 'projets',
-            'prefixe': 'pl',
-            'suffixe': '-ei',
-        },
-        'ACIN': {
-            'repertoire': 'projets',
-            'prefixe': 'pl',
-            'suffixe': '-ai',
-        },
-        'LETT': {
-            'repertoire': 'projets',
-            'prefixe': 'pl',
-            'suffixe': '-l',
-        },
-        'PNRETVXINSTITEUROP': {
-            'repertoire': 'europe/resolutions',
-            'prefixe': 'ppe',
-            'suffixe': '',
-        },
-        'PNRE': {
-            'repertoire': 'propositions',
-            'prefixe': 'pion',
-            'suffixe': '',
-        },
-        'RION': {
-            'repertoire': '',
-            'prefixe': '',
-            'suffixe': '',
-        },
-        'TCOM': {
-            'repertoire': 'ta-commission',
-            'prefixe': 'r',
-            'suffixe': '-a0',
-        },
-        'TCOMMODREGLTAN': {
-            'repertoire': 'ta-commission',
-            'prefixe': 'r',
-            'suffixe': '-a0',
-        },
-        'TCOMTVXINSTITEUROP': {
-            'repertoire': 'ta-commission',
-            'prefixe': 'r',
-            'suffixe': '-a0',
-        },
-        'TCOMCOMENQ': {
-            'repertoire': 'ta-commission',
-            'prefixe': 'r',
-            'suffixe': '-a0',
-        },
-        'TADO': {
-            'repertoire': 'ta',
-            'prefixe': 'ta',
-            'suffixe': '',
-        },
-        # NOT IN NATIONAL ASSEMBLY PHP CODE
-        'RAPP': {
-            'repertoire': 'rapports',
-            'prefixe': 'r',
-            'suffixe': '',
-        },
-        'RINF': {
-            'repertoire': 'rap-inf',
-            'prefixe': 'i',
-            'suffixe': '',
+    Build the urls of the texts from their open data uid, each url is
+    computed once and cached.
+
+    :param types: document type -> url parts of the texts of this type
+    """
+    def __init__(self, types=AN_TEXT_TYPES):
+        self.types = types
+        self._cache = {}
+        self._source_cache = {}
+
+    def text_url(self, identifiant, code):
+        """
+        Port of the PHP function used by the National Assembly:
+
+        public function urlOpaque($identifiant, $codeType = NULL)
+        {
+            $datas = array(
+                'PRJL' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => ''),
+                'PION' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
+                'PNRECOMENQ' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
+                'PNREAPPART341' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
+                'PNREMODREGLTAN' => array('repertoire' => 'propositions', 'prefixe' => 'pion', 'suffixe' => ''),
+                'AVCE' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ace'),
+                'ETDI' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ei'),
+                'ACIN' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-ai'),
+                'LETT' => array('repertoire' => 'projets', 'prefixe' => 'pl', 'suffixe' => '-l'),
+                'PNRETVXINSTITEUROP' => array('repertoire' => 'europe/resolutions', 'prefixe' => 'ppe', 'suffixe' => ''),
+                'PNRE' => array('repertoire' => 'europe/resolutions', 'prefixe' => 'ppe', 'suffixe' => ''),
+                'RION' => array('repertoire' => '', 'prefixe' => '', 'suffixe' => ''),
+                'TCOM' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
+                'TCOMMODREGLTAN' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
+                'TCOMTVXINSTITEUROP' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
+                'TCOMCOMENQ' => array('repertoire' => 'ta-commission', 'prefixe' => 'r', 'suffixe' => '-a0'),
+                'TADO' => array('repertoire' => 'ta', 'prefixe' => 'ta', 'suffixe' => ''),
+            );
+            preg_match('/(.{4})([ANS]*)(R[0-9])([LS]*)([0-9]*)([BTACP]*)(.*)/', $identifiant, $matches);
+            $leg = $matches[5];
+            $typeTa = $matches[6];
+            $num = $matches[7];
+            switch ($typeTa) {
+                case 'BTC':
+                    $type = 'TCOM';
+                    break;
+                case 'BTA':
+                    $type = 'TADO';
+                    break;
+                default:
+                    $type = $codeType;
+            }
+            $host = "http://www.assemblee-nationale.fr/";
+            return $host . $leg . "/" . $datas[$type]['repertoire'] . "/" . $datas[$type]['prefixe'] . $num . $datas[$type]['suffixe'] . ".pdf";
         }
-    }
-    match = re.match(OPENDATA_ID_REGEX, identifiant)
-    leg = match.group(5)
-    typeTa = match.group(6)
-    num = match.group(7)
-    if typeTa == 'BTC':
-        type = 'TCOM'
-    elif typeTa == 'BTA':
-        type = 'TADO'
-    elif typeTa == 'TAP':
-        type = 'TADO'
-    else:
-        type = code
-    host = "http://www.assemblee-nationale.fr/"
+        """
+        key = (identifiant, code)
+        url = self._cache.get(key)
+        if url is None:
+            url = self._cache[key] = self._text_url(OPENDATA_ID_RE.match(identifiant), identifiant, code)
+        return url
+
+    def _text_url(self, match, identifiant, code):
+        leg = match.group(5)
+        typeTa = match.group(6)
+        num = match.group(7)
+        if typeTa == 'BTC':
+            type = 'TCOM'
+        elif typeTa == 'BTA':
+            type = 'TADO'
+        elif typeTa == 'TAP':
+            type = 'TADO'
+        else:
+            type = code
+        host = "http://www.assemblee-nationale.fr/"
+
+        if type not in self.types:
+            # ex: ALCNANR5L15B0002 (allocution du président)
+            raise Exception('Unknown document type for %s' % identifiant)
+
+        datas = self.types[type]
+        return host + leg + "/" + datas['repertoire'] + "/" + datas['prefixe'] + num + datas['suffixe'] + ".asp"
+
+    def source_url(self, identifiant, code):
+        """url of a text, on the open data website from the XVth legislature"""
+        key = (identifiant, code)
+        url = self._source_cache.get(key)
+        if url is None:
+            match = OPENDATA_ID_RE.match(identifiant)
+            if int(match.group(5)) >= 15:
+                url = an_text_url_opendata(identifiant)
+            else:
+                url = self._cache.get(key) or self._text_url(match, identifiant, code)
+            self._source_cache[key] = url
+        return url
+
+    def source_urls(self, texts):
+        """
+        :param texts: (uid, document type code) of the texts, or the
+                      documents of an export `textesLegislatifs`
+        :returns: dict uid -> url of the text, None for an unknown type
+        """
+        urls = {}
+        for text in texts:
+            if isinstance(text, dict):
+                uid, code = text["uid"], text["classification"]["type"]["code"]
+            else:
+                uid, code = text
+            try:
+                urls[uid] = self.source_url(uid, code)
+            except Exception:
+                urls[uid] = None
+        return urls
+
 
-    if type not in datas:
-        # ex: ALCNANR5L15B0002 (allocution du président)
-        raise Exception('Unknown document type for %s' % identifiant)
+TEXT_URL_RESOLVER = TextUrlResolver()
 
-    return host + leg + "/" + datas[type]['repertoire'] + "/" + datas[type]['prefixe'] + num + datas[type]['suffixe'] + ".asp"
 
+def an_text_url(identifiant, code):
+    return TEXT_URL_RESOLVER.text_url(identifiant, code)
 
-def parse(url, logfile=sys.stderr, cached_opendata_an={}):
+
+def parse(url, logfile=sys.stderr, cached_opendata_an={}, transport=None, store=None):
+    """
+    :param store: `OpenDataStore` to share the open data exports between
+                  calls, without it the exports missing from
+                  `cached_opendata_an` are streamed from the zips
+    """
     def _log(*args):
         nonlocal logfile
         print(*args, file=logfile)
 
+    streaming = store is None
+    if store is None:
+        store = OpenDataStore(transport=transport, cache=dict(cached_opendata_an))
+
     legislature_parsed, _ = parse_national_assembly_url(url)
 
     # try to find the dosleg in current and past legislature
     for legislature in (legislature_parsed, legislature_parsed - 1):
-        if legislature and legislature in cached_opendata_an:
-            dossiers_json = cached_opendata_an[legislature]
+        if streaming and legislature not in store.cache:
+            dossier, docs = find_in_open_data_zip(url, legislature, transport=transport)
+            if dossier is None:
+                continue
+            text_urls = TEXT_URL_RESOLVER.source_urls(docs.values())
         else:
-            dossiers_json = download_open_data_doslegs(legislature)
-
-        docs = {doc["uid"]: doc for doc in dossiers_json["export"]["textesLegislatifs"]["document"]}
-
-        for dossier in dossiers_json["export"]["dossiersLegislatifs"]["dossier"]:
-            dossier = dossier["dossierParlementaire"]
-
-            if dossier.get("@xsi:type") != "DossierLegislatif_Type":
+            dossier = store.find(url, legislature)
+            if dossier is None:
                 continue
+            docs = store.documents(legislature)
+            text_urls = store.text_urls(legislature)
 
-            titreChemin = dossier["titreDossier"]["titreChemin"]
+        url = "http://www.assemblee-nationale.fr/dyn/{}".format(match_dossier_url(dossier, url))
 
-            # find the right dosleg even if it's an old url
-            url_common_part = "{}/dossiers/{}".format(dossier["legislature"], titreChemin)
-            if not url.endswith(url_common_part):
-                # dosleg might be from previous legislature
-                url_common_part = "{}/dossiers/{}".format(int(dossier["legislature"]) + 1, titreChemin)
-                if not url.endswith(url_common_part):
-                    # doslegs can also be accessed by uid
-                    if not url.endswith(dossier["uid"]) and not url.endswith(dossier["uid"] + '.asp'):
-                        continue
-            url = "http://www.assemblee-nationale.fr/dyn/{}".format(url_common_part)
-
-            data = {}
-            data["urgence"] = False
-            url_senat = dossier["titreDossier"]["senatChemin"]
-            if url_senat:
-                data["url_dossier_senat"] = clean_url(url_senat)
-            data["long_title"] = dossier["titreDossier"]["titre"]
-            data["url_dossier_assemblee"] = clean_url(url)
-            data["assemblee_legislature"] = int(dossier["legislature"])
-            data["assemblee_slug"] = dossier["titreDossier"]["titreChemin"]
-            if data["assemblee_slug"] is None:
-                raise Exception('Found null titreChemin')
-
-            data["assemblee_id"] = "%s-%s" % (dossier["legislature"], data["assemblee_slug"])
-
-            if dossier["procedureParlementaire"]["libelle"] in (
-                "Projet de loi de finances de l'année",
-                "Projet de loi de financement de la sécurité sociale",
-                "Projet de loi de finances rectificative",
-                "Projet ou proposition de loi constitutionnelle",
-            ):
-                data['use_old_procedure'] = True
-
-            data["steps"] = []
-            step = None
-            start_step = None
-            for etape in to_arr(dossier["actesLegislatifs"]["acteLegislatif"]):
-                for path, sous_etape in yield_leafs(etape):
-                    if sous_etape["@xsi:type"] in ("EtudeImpact_Type", "DepotAvisConseilEtat_Type"):
-                        continue
-
-                    step = {}
-
-                    date = sous_etape.get("dateActe")
-                    if date:
-                        step["date"] = date.split("T")[0]
-
-                    if sous_etape["@xsi:type"] == "ProcedureAccelere_Type":
-                        data["urgence"] = True
-                        continue
-                    elif sous_etape["@xsi:type"] == "Promulgation_Type":
-                        url = clean_url(sous_etape.get("urlLegifrance") or sous_etape["infoJO"]["urlLegifrance"])
-                        data["url_jo"] = url
-                        data["end"] = step["date"]
-
-                        step["institution"] = "gouvernement"
-                        step["stage"] = "promulgation"
-                        step["source_url"] = url
-                        data["steps"].append(step)
-                        continue
-                    elif sous_etape["@xsi:type"] == "ConclusionEtapeCC_Type":
-                        step["institution"] = "conseil constitutionnel"
-                        step["stage"] = "constitutionnalité"
-                        step["source_url"] = clean_url(sous_etape["urlConclusion"])
-                        data["steps"].append(step)
-
-                    if "textesAssocies" in sous_etape:
-                        # TODO review
-                        sous_etape["texteAssocie"] = to_arr(sous_etape["textesAssocies"]["texteAssocie"])[0]["refTexteAssocie"]
-
-                    code = sous_etape.get("codeActe")
-
-                    if "AVIS-RAPPORT" in code or code == 'CMP-DEPOT':
-                        continue
-                    if '-DPTLETTRECT' in code:
-                        continue
-
-                    if code.startswith("AN"):
-                        step["institution"] = "assemblee"
-                    elif code.startswith("SN"):
-                        step["institution"] = "senat"
-
-                    if "-DEPOT" in code:
-                        step["step"] = "depot"
-                    elif "-COM" in code:
-                        step["step"] = "commission"
-                    elif "-DEBATS" in code:
-                        step["step"] = "hemicycle"
-                    else:
+        data = {}
+        data["urgence"] = False
+        url_senat = dossier["titreDossier"]["senatChemin"]
+        if url_senat:
+            data["url_dossier_senat"] = clean_url(url_senat)
+        data["long_title"] = dossier["titreDossier"]["titre"]
+        data["url_dossier_assemblee"] = clean_url(url)
+        data["assemblee_legislature"] = int(dossier["legislature"])
+        data["assemblee_slug"] = dossier["titreDossier"]["titreChemin"]
+        if data["assemblee_slug"] is None:
+            raise Exception('Found null titreChemin')
+
+        data["assemblee_id"] = "%s-%s" % (dossier["legislature"], data["assemblee_slug"])
+
+        if dossier["procedureParlementaire"]["libelle"] in (
+            "Projet de loi de finances de l'année",
+            "Projet de loi de financement de la sécurité sociale",
+            "Projet de loi de finances rectificative",
+            "Projet ou proposition de loi constitutionnelle",
+        ):
+            data['use_old_procedure'] = True
+
+        data["steps"] = []
+        step = None
+        start_step = None
+        for etape in to_arr(dossier["actesLegislatifs"]["acteLegislatif"]):
+            for path, sous_etape in yield_leafs(etape):
+                if sous_etape["@xsi:type"] in ("EtudeImpact_Type", "DepotAvisConseilEtat_Type"):
+                    continue
+
+                step = {}
+
+                date = sous_etape.get("dateActe")
+                if date:
+                    step["date"] = date.split("T")[0]
+
+                if sous_etape["@xsi:type"] == "ProcedureAccelere_Type":
+                    data["urgence"] = True
+                    continue
+                elif sous_etape["@xsi:type"] == "Promulgation_Type":
+                    url = clean_url(sous_etape.get("urlLegifrance") or sous_etape["infoJO"]["urlLegifrance"])
+                    data["url_jo"] = url
+                    data["end"] = step["date"]
+
+                    step["institution"] = "gouvernement"
+                    step["stage"] = "promulgation"
+                    step["source_url"] = url
+                    data["steps"].append(step)
+                    continue
+                elif sous_etape["@xsi:type"] == "ConclusionEtapeCC_Type":
+                    step["institution"] = "conseil constitutionnel"
+                    step["stage"] = "constitutionnalité"
+                    step["source_url"] = clean_url(sous_etape["urlConclusion"])
+                    data["steps"].append(step)
+
+                if "textesAssocies" in sous_etape:
+                    # TODO review
+                    sous_etape["texteAssocie"] = to_arr(sous_etape["textesAssocies"]["texteAssocie"])[0]["refTexteAssocie"]
+
+                code = sous_etape.get("codeActe")
+
+                institution, step_type, stage, skip = classify_code_acte(code)
+                if institution:
+                    step["institution"] = institution
+                if step_type is None:
+                    if not skip:
                         _log("  - WARNING Unknown step type", code)
-                        continue
-
-                    if "1-" in code:
-                        step["stage"] = "1ère lecture"
-                    elif "2-" in code:
-                        step["stage"] = "2ème lecture"
-                    elif "3-" in code:
-                        step["stage"] = "3ème lecture"  # TODO: else libelleCourt
-                    elif "NLEC-" in code:
-                        step["stage"] = "nouv. lect."
-                    elif "ANLDEF-" in code:
-                        step["stage"] = "l. définitive"
-                        if step["step"] == "commission":
-                            continue
-                    elif "CMP-" in code:
-                        step["stage"] = "CMP"
-                        if "-DEBATS-AN" in code:
-                            step["institution"] = "assemblee"
-                        elif "-SN" in code:
-                            step["institution"] = "senat"
-                            if "RAPPORT-SN" in code:
-                                # ignore the cmp_commission_other_url for now
-                                continue
+                    continue
+                step["step"] = step_type
+                if stage:
+                    step["stage"] = stage
+                if skip:
+                    continue
+
+                step["id_opendata"] = sous_etape["uid"]
+
+                # keep first step for a step-type (ex: first hemiycle)
+                if start_step is None or not same_stage_step_instit(start_step, step):
+                    start_step = step
+
+                if "texteAdopte" in sous_etape or "texteAssocie" in sous_etape:
+                    # there is no multiple depot in the National Assembly
+                    # simply the senate re-submitting the same text
+                    if data['steps']:
+                        last_step = data['steps'][-1]
+                        if last_step['institution'] == 'assemblee' and last_step.get('step') == step.get('step') == 'depot':
+                            # ignore the depot we already have (since the new one is the same)
+                            data['steps'] = data['steps'][:-1]
+
+                    # step['xsi-type'] = sous_etape.get('@xsi:type')
+                    # step['code'] = sous_etape.get('codeActe')
+
+                    id_text = sous_etape.get("texteAdopte") or sous_etape.get("texteAssocie")
+                    if id_text:
+                        if "proposal_type" not in data:
+                            if id_text.startswith("PRJL"):
+                                data["proposal_type"] = "PJL"
+                            elif id_text.startswith("PION"):
+                                data["proposal_type"] = "PPL"
+
+                        doc = {}
+                        if id_text in docs:
+                            doc = docs[id_text]
                         else:
-                            step["institution"] = "CMP"
-                    elif "ANLUNI-" in code:
-                        step["stage"] = "l. unique"
-
-                    step["id_opendata"] = sous_etape["uid"]
-
-                    # keep first step for a step-type (ex: first hemiycle)
-                    if start_step is None or not same_stage_step_instit(start_step, step):
-                        start_step = step
-
-                    if "texteAdopte" in sous_etape or "texteAssocie" in sous_etape:
-                        # there is no multiple depot in the National Assembly
-                        # simply the senate re-submitting the same text
-                        if data['steps']:
-                            last_step = data['steps'][-1]
-                            if last_step['institution'] == 'assemblee' and last_step.get('step') == step.get('step') == 'depot':
-                                # ignore the depot we already have (since the new one is the same)
-                                data['steps'] = data['steps'][:-1]
-
-                        # step['xsi-type'] = sous_etape.get('@xsi:type')
-                        # step['code'] = sous_etape.get('codeActe')
-
-                        id_text = sous_etape.get("texteAdopte") or sous_etape.get("texteAssocie")
-                        if id_text:
-                            if "proposal_type" not in data:
-                                if id_text.startswith("PRJL"):
-                                    data["proposal_type"] = "PJL"
-                                elif id_text.startswith("PION"):
-                                    data["proposal_type"] = "PPL"
-
-                            doc = {}
-                            if id_text in docs:
-                                doc = docs[id_text]
-                            else:
-                                _log("  - ERROR missing text", id_text)
-
-                            url = None
-                            if step.get("institution") == "assemblee" or "-AN" in code:
-                                doc_code = None
-                                if doc:
-                                    doc_code = doc['classification']['type']['code']
-                                    if doc_code == 'ACIN':
-                                        continue
-
-                                match = re.match(OPENDATA_ID_REGEX, id_text)
-                                step_legislature = int(match.group(5))
-                                if step_legislature >= 15:
-                                    url = an_text_url_opendata(id_text)
-                                else:
-                                    url = an_text_url(id_text, doc_code)
-                                if url:
-                                    step['source_url'] = url
-
-                                    # hardfix and should be fixed by the AN one day
-                                    if data["assemblee_id"] == '15-retablissement_confiance_action_publique':
-                                        if step["stage"] == "l. définitive" and step["step"] == "depot":
-                                            step['source_url'] = 'http://www.assemblee-nationale.fr/dyn/opendata/PRJLANR5L15BTA0017.html'
-
-                        data["steps"].append(step)
-
-                    else:
-                        pass
-
-            if data['steps']:
-                # add predicted step
-                if not data.get('url_jo'):
-                    if data['steps'][-1].get('step') != start_step.get('step') and start_step.get('step'):
-                        # TODO: we could also add all the dates into a steps['dates'] = [..]
-                        data['steps'].append(start_step)
-                data["beginning"] = data["steps"][0]["date"]
-            else:
-                _log("  - WARNING no steps found for", url)
+                            _log("  - ERROR missing text", id_text)
+
+                        url = None
+                        if step.get("institution") == "assemblee" or "-AN" in code:
+                            doc_code = None
+                            if doc:
+                                doc_code = doc['classification']['type']['code']
+                                if doc_code == 'ACIN':
+                                    continue
+
+                            # the texts of unknown types are None and raise
+                            url = text_urls.get(id_text) or TEXT_URL_RESOLVER.source_url(id_text, doc_code)
+                            if url:
+                                step['source_url'] = url
+
+                                # hardfix and should be fixed by the AN one day
+                                if data["assemblee_id"] == '15-retablissement_confiance_action_publique':
+                                    if step["stage"] == "l. définitive" and step["step"] == "depot":
+                                        step['source_url'] = 'http://www.assemblee-nationale.fr/dyn/opendata/PRJLANR5L15BTA0017.html'
+
+                    data["steps"].append(step)
+
+                else:
+                    pass
+
+        if data['steps']:
+            # add predicted step
+            if not data.get('url_jo'):
+                if data['steps'][-1].get('step') != start_step.get('step') and start_step.get('step'):
+                    # TODO: we could also add all the dates into a steps['dates'] = [..]
+                    data['steps'].append(start_step)
+            data["beginning"] = data["steps"][0]["date"]
+        else:
+            _log("  - WARNING no steps found for", url)
 
-            return data
+        return data
     return []
 
 
@@ -1,20 +1,26 @@
 # re-write of the dosleg parser to have
 # the same output as senapy
 
+import gc
+import io
+import os
 import sys
 import re
+from collections import OrderedDict
 from urllib.parse import urljoin
 
-import dateparser
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
 
-from lawfactory_utils.urls import clean_url, download, parse_national_assembly_url, AN_OLD_URL_TEMPLATE
+from lawfactory_utils.urls import clean_url, parse_national_assembly_url, AN_OLD_URL_TEMPLATE
 
-from anpy.dossier_from_opendata import parse as opendata_parse
+from anpy.bulk import BulkResult
+from anpy.dossier_from_opendata import OPEN_DATA_DOSLEGS_FILES, OpenDataStore, fetch, parse as opendata_parse
+from anpy.utils import parse_french_date
 
 
 def format_date(date):
-    parsed = dateparser.parse(date, languages=['fr'])
+    parsed = parse_french_date(date)
     return parsed.strftime("%Y-%m-%d")
 
 
@@ -27,12 +33,60 @@ def find_promulgation_date(line):
     return format_date(re.search(r"(\d\d? \w\w\w+ \d\d\d\d)", line).group(1))
 
 
-def find_senat_url(data):
+class HtmlLine(object):
+    """
+    A line of a dosleg page, parsed with lxml the first time its text or its
+    links are needed. `text` is the same as `BeautifulSoup(line).text.strip()`
+    """
+    TEXT_XPATH = '//text()[not(parent::script or parent::style)]'
+
+    def __init__(self, line):
+        self.line = line
+        self._root = False
+        self._text = None
+        self._hrefs = None
+
+    @property
+    def root(self):
+        if self._root is False:
+            self._root = etree.HTML(self.line) if self.line.strip() else None
+        return self._root
+
+    @property
+    def text(self):
+        if self._text is None:
+            if self.root is None:
+                self._text = ''
+            else:
+                # like BeautifulSoup, whitespace-only strings are collapsed
+                self._text = ''.join(
+                    string if string.strip() else ('\n' if '\n' in string else ' ')
+                    for string in self.root.xpath(self.TEXT_XPATH)).strip()
+        return self._text
+
+    @property
+    def hrefs(self):
+        """href of each <a> tag of the line, None when it has none"""
+        if self._hrefs is None:
+            if self.root is None:
+                self._hrefs = []
+            else:
+                self._hrefs = [a.get('href') for a in self.root.iter('a')]
+        return self._hrefs
+
+
+def parse_metas(html):
+    soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('meta'))
+    return {meta.attrs['name']: meta.attrs['content']
+            for meta in soup.find_all('meta') if 'name' in meta.attrs}
+
+
+def find_senat_url(data, transport=None):
     if not data['steps']:
         return
     senat_text_url = [step['source_url'] for step in data['steps'] if step.get('source_url') and 'senat.fr' in step.get('source_url')]
     for url in senat_text_url:
-        html = download(url).text
+        html = fetch(url, transport=transport).text
         soup = BeautifulSoup(html, 'lxml')
         for a in soup.select('#primary a'):
             href = urljoin(url, a.attrs.get('href', ''))
@@ -40,8 +94,8 @@ def find_senat_url(data):
                 return clean_url(href)
 
 
-def download_historic_dosleg(url):
-    resp = download(url)
+def download_historic_dosleg(url, transport=None):
+    resp = fetch(url, transport=transport)
 
     if '/dyn/' in resp.url:
         # fallback to backed-up doslegs when the redirect is forced
@@ -49,7 +103,7 @@ def download_historic_dosleg(url):
         display_url = AN_OLD_URL_TEMPLATE.format(legislature=legislature, slug=slug)
         download_url = 'https://raw.githubusercontent.com/regardscitoyens/archive-AN-doslegs/master/archive/' \
             + display_url.split('.fr/')[1]
-        resp = download(download_url)
+        resp = fetch(download_url, transport=transport)
         resp.url = display_url
 
     resp.encoding = 'Windows-1252'
@@ -74,7 +128,8 @@ def merge_previous_works_an(older_dos, dos):
     return dos
 
 
-def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_page=0, parse_previous_works=True, parse_next_works=True):
+def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_page=0, parse_previous_works=True, parse_next_works=True,
+                           transport=None):
     """
     Parse an AN dosleg like http://www.assemblee-nationale.fr/13/dossiers/accord_Montenegro_mobilite_jeunes.asp
 
@@ -92,8 +147,6 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
     def log_warning(*error):
         print('## WARNING ###', *error, file=logfile)
 
-    soup = BeautifulSoup(html, 'lxml')
-
     legislature, slug = parse_national_assembly_url(data['url_dossier_assemblee'])
     data['assemblee_slug'] = slug
     if legislature:
@@ -115,11 +168,7 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
 
     html_lines = html.split('\n')
     for i, line in enumerate(html_lines):
-        def parse_line():
-            return BeautifulSoup(line, 'lxml')
-
-        def line_text():
-            return parse_line().text.strip()
+        parsed_line = HtmlLine(line)
 
         def get_last_step():
             if len(data['steps']) > 0:
@@ -130,14 +179,14 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
             continue
 
         if '<font face="ARIAL" size="3" color="#000080">' in line:
-            data['long_title'] = line_text()
+            data['long_title'] = parsed_line.text
         if '<br><b><font color="#000099">Travaux des commissions</font></b><br>' in line:
-            last_section = line_text()
+            last_section = parsed_line.text
         if '<p align="center"><b><font color="#000080">Travaux préparatoires</font></b><br>' in line:
             if travaux_prep_already:
                 if parse_next_works and not nth_dos_in_page:
                     log_warning('FOUND ANOTHER DOSLEG INSIDE THE DOSLEG')
-                    another_dosleg_inside = '\n'.join(html.split('\n')[last_step_index + 1:])
+                    another_dosleg_inside = '\n'.join(html_lines[last_step_index + 1:])
                 if not nth_dos_in_page:
                     break
                 travaux_prep_already = False
@@ -148,11 +197,10 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
 
         # Senat 1ère lecture, CMP, ...
         if '<font color="#000099" size="2" face="Arial">' in line:
-            text = line_text()
+            text = parsed_line.text
             last_section = None
             if 'Dossier en ligne sur le site du Sénat' in text:
-                data['url_dossier_senat'] = clean_url(parse_line().select(
-                    'a')[-1].attrs['href'])
+                data['url_dossier_senat'] = clean_url(parsed_line.hrefs[-1])
                 text = text.replace(
                     '(Dossier en ligne sur le site du Sénat)', '')
             if 'Sénat' in text:
@@ -189,7 +237,7 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
             return None
 
         if '>Accès aux Travaux préparatoires' in line and not previous_works:
-            previous_works = clean_url(urljoin(url_an, parse_line().find('a').attrs['href']))
+            previous_works = clean_url(urljoin(url_an, parsed_line.hrefs[0]))
 
         curr_step = None
         # conseil. consti. has no step but we should get the link
@@ -239,9 +287,8 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
                     if curr_institution == 'senat' and curr_stage != 'CMP':
                         curr_step = 'depot'
 
-            links = [a.attrs.get('href') for a in parse_line().select('a')]
             links = [
-                href for href in links if href and 'fiches_id' not in href and '/senateur/' not in href and 'javascript:' not in href]
+                href for href in parsed_line.hrefs if href and 'fiches_id' not in href and '/senateur/' not in href and 'javascript:' not in href]
             if not links:
                 log_error('NO LINK IN LINE: %s' % (line,))
                 continue
@@ -300,7 +347,7 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
             last_step_index = i
 
         if 'publiée au Journal Officiel' in line and not url_jo:
-            links = [clean_url(a.attrs['href']) for a in parse_line().select('a') if 'legifrance' in a.attrs.get('href', '')]
+            links = [clean_url(href) for href in parsed_line.hrefs if href and 'legifrance' in href]
             if not links:
                 log_error('NO GOOD LINK IN LINE: %s' % (line,))
                 continue
@@ -326,10 +373,7 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
                     'step': 'commission',
                 }
 
-    metas = {}
-    for meta in soup.select('meta'):
-        if 'name' in meta.attrs:
-            metas[meta.attrs['name']] = meta.attrs['content']
+    metas = parse_metas(html)
 
     if not url_jo:
         url_jo = metas.get('LIEN_LOI_PROMULGUEE')
@@ -350,18 +394,19 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
         data['steps'].append(predicted_next_step)
 
     if 'url_dossier_senat' not in data or 'dossier-legislatif' not in data['url_dossier_senat']:
-        senat_url = find_senat_url(data)
+        senat_url = find_senat_url(data, transport=transport)
         if senat_url:
             data['url_dossier_senat'] = senat_url
 
     # append previous works if there are some
     if previous_works and parse_previous_works:
         log_warning('MERGING %s WITH PREVIOUS WORKS %s' % (url_an, previous_works))
-        resp = download_historic_dosleg(previous_works)
+        resp = download_historic_dosleg(previous_works, transport=transport)
         prev_data = historic_doslegs_parse(
             resp.text, previous_works,
             logfile=logfile,
-            nth_dos_in_page=nth_dos_in_page, parse_next_works=False)
+            nth_dos_in_page=nth_dos_in_page, parse_next_works=False,
+            transport=transport)
         if prev_data:
             prev_data = prev_data[nth_dos_in_page] if len(prev_data) > 1 else prev_data[0]
             data = merge_previous_works_an(prev_data, data)
@@ -372,38 +417,170 @@ def historic_doslegs_parse(html, url_an=None, logfile=sys.stderr, nth_dos_in_pag
     next_legislature = data['assemblee_legislature'] + 1 if 'assemblee_legislature' in data else 9999
     if parse_next_works and next_legislature < 15:
         #  TODO: parse 15th legislature from open data if it exists
-        resp = download_historic_dosleg(url_an.replace('/%d/' % data['assemblee_legislature'], '/%d/' % (data['assemblee_legislature'] + 1)))
+        resp = download_historic_dosleg(url_an.replace('/%d/' % data['assemblee_legislature'], '/%d/' % (data['assemblee_legislature'] + 1)),
+                                        transport=transport)
         if resp.status_code == 200:
             recent_data = historic_doslegs_parse(
                 resp.text, resp.url,
                 logfile=logfile,
-                nth_dos_in_page=nth_dos_in_page, parse_previous_works=False)
+                nth_dos_in_page=nth_dos_in_page, parse_previous_works=False,
+                transport=transport)
             if recent_data:
                 log_warning('FOUND MORE RECENT WORKS', resp.url)
                 recent_data = recent_data[nth_dos_in_page] if len(recent_data) > 1 else recent_data[0]
                 data = merge_previous_works_an(data, recent_data)
 
     if another_dosleg_inside:
-        others = historic_doslegs_parse(another_dosleg_inside, url_an, logfile=logfile, nth_dos_in_page=nth_dos_in_page+1)
+        others = historic_doslegs_parse(another_dosleg_inside, url_an, logfile=logfile, nth_dos_in_page=nth_dos_in_page+1,
+                                        transport=transport)
         if others:
             return [data] + others
     return [data]
 
 
-def parse(url, logfile=sys.stderr, cached_opendata_an={}):
+def parse(url, logfile=sys.stderr, cached_opendata_an={}, transport=None, store=None):
     url = clean_url(url)
 
     if '/dyn/' in url:
-        parsed = opendata_parse(url, logfile=logfile, cached_opendata_an=cached_opendata_an)
+        parsed = opendata_parse(url, logfile=logfile, cached_opendata_an=cached_opendata_an, transport=transport, store=store)
         if parsed:
             return [parsed]
         print('WARNING: NOT FOUND IN OPEN-DATA', file=logfile)
 
-    resp = download_historic_dosleg(url)
+    resp = download_historic_dosleg(url, transport=transport)
     if resp.status_code != 200:
         print('WARNING: NOT FOUND IN HISTORIC DOSLEGS', file=logfile)
         return []
-    return historic_doslegs_parse(resp.text, resp.url, logfile=logfile)
+    return historic_doslegs_parse(resp.text, resp.url, logfile=logfile, transport=transport)
+
+
+# open data store and transport of the `parse_many` workers, inherited from
+# the parent process when the workers are forked
+_WORKER_STORE = None
+_WORKER_TRANSPORT = None
+# pid of the process which last used `_WORKER_TRANSPORT`
+_WORKER_TRANSPORT_PID = None
+
+
+def _parse_in_worker(url, transport=None):
+    """
+    :param transport: transport of `parse_many`, given when the workers are
+                      not forked since they do not inherit `_WORKER_TRANSPORT`
+    """
+    global _WORKER_STORE, _WORKER_TRANSPORT, _WORKER_TRANSPORT_PID
+    if _WORKER_TRANSPORT_PID != os.getpid():
+        # first url of a forked worker: do not share the connections opened
+        # by the parent process
+        if _WORKER_TRANSPORT is not None:
+            _WORKER_TRANSPORT.close()
+        _WORKER_TRANSPORT_PID = os.getpid()
+        if transport is not None:
+            _WORKER_TRANSPORT = transport
+    if _WORKER_STORE is None:  # not forked
+        _WORKER_STORE = OpenDataStore(transport=_WORKER_TRANSPORT)
+    logfile = io.StringIO()
+    parsed = parse(url, logfile=logfile, transport=_WORKER_TRANSPORT, store=_WORKER_STORE)
+    return parsed, logfile.getvalue()
+
+
+def opendata_legislatures(urls):
+    """
+    legislatures of the open data exports `parse` needs for `urls`, the
+    previous legislature it falls back to when a dosleg is not found is left
+    out
+    """
+    legislatures = set()
+    for url in urls:
+        url = clean_url(url)
+        if '/dyn/' in url:
+            legislatures.add(parse_national_assembly_url(url)[0])
+    return sorted(legislatures & set(OPEN_DATA_DOSLEGS_FILES))
+
+
+def parse_many(urls, logfile=sys.stderr, transport=None, store=None, jobs=1, ordered=False):
+    """
+    `parse` every url of `urls`, yield a `BulkResult` per url with the
+    parsed doslegs or the error raised, as soon as it is ready or in the
+    order of `urls` when `ordered` is True
+
+    :param store: `OpenDataStore` shared by all the urls, a new one if None
+    :param jobs: number of processes parsing the urls. The open data
+                 exports needed by `urls` are then loaded once in this
+                 process and shared with the forked workers (copy on write,
+                 the exports are frozen out of the reach of the garbage
+                 collector from Python 3.7). Without fork, or for the
+                 exports of the previous legislatures, each worker loads
+                 its own.
+    """
+    if store is None:
+        store = OpenDataStore(transport=transport)
+
+    if jobs <= 1:
+        for url in urls:
+            print(' -- ', url, file=logfile)
+            try:
+                yield BulkResult(url=url, value=parse(url, logfile=logfile, transport=transport, store=store))
+            except Exception as error:
+                yield BulkResult(url=url, error=error)
+        return
+
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    global _WORKER_STORE, _WORKER_TRANSPORT, _WORKER_TRANSPORT_PID
+    urls = list(urls)
+    store.preload(opendata_legislatures(urls))
+
+    if sys.version_info >= (3, 7):
+        fork = 'fork' in multiprocessing.get_all_start_methods()
+        executor_kwargs = {'mp_context': multiprocessing.get_context('fork' if fork else None)}
+    else:
+        # the executor uses the default start method
+        executor_kwargs = {}
+        fork = multiprocessing.get_start_method() == 'fork'
+    if fork:
+        _WORKER_STORE, _WORKER_TRANSPORT = store, transport
+        _WORKER_TRANSPORT_PID = os.getpid()
+        worker_transport = None
+    else:
+        # pickled with each url, only the first one of a worker is kept
+        worker_transport = transport
+    executor = ProcessPoolExecutor(max_workers=jobs, **executor_kwargs)
+    futures = {}
+
+    def result(url, future):
+        print(' -- ', url, file=logfile)
+        error = future.exception()
+        if error is not None:
+            return BulkResult(url=url, error=error)
+        parsed, log = future.result()
+        logfile.write(log)
+        return BulkResult(url=url, value=parsed)
+
+    # gc.freeze() is only available from Python 3.7
+    freeze_gc = hasattr(gc, 'freeze')
+    try:
+        # the workers are forked on the first submit
+        if freeze_gc:
+            gc.freeze()
+        if ordered:
+            futures = OrderedDict((executor.submit(_parse_in_worker, url, worker_transport), url) for url in urls)
+            for future, url in futures.items():
+                yield result(url, future)
+        else:
+            futures = {executor.submit(_parse_in_worker, url, worker_transport): url for url in urls}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield result(futures.pop(future), future)
+    finally:
+        # the urls not started yet are dropped when the iteration is stopped
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+        if freeze_gc:
+            gc.unfreeze()
+        _WORKER_STORE = _WORKER_TRANSPORT = _WORKER_TRANSPORT_PID = None
 
 
 """
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental refresh of the open data doslegs exports.
+
+A snapshot records the CRC32 of each member of an export zip (read from the
+zip central directory, so without decompressing anything). On refresh, only
+the members added or changed since the snapshot are decoded and the uids of
+the doslegs to re-parse are reported: the ones added or changed, and the
+ones referring to a text that changed.
+
+    >>> snapshot = OpenDataSnapshot.load('snapshot-15.json')
+    >>> changes = snapshot.refresh_legislature(15)
+    >>> snapshot.save('snapshot-15.json')
+    >>> changes.updated
+    {'DLR5L15N36159', ...}
+
+or from the command line, to re-parse only the doslegs that changed:
+
+    anpy-cli opendata_changes snapshot-15.json | anpy-cli parse_many --overwrite doslegs/
+"""
+import json
+import os
+import tempfile
+import zlib
+
+import attr
+
+from anpy.dossier_from_opendata import OPEN_DATA_DOSLEGS_FILES, decode_json, dossier_url, open_data_doslegs_zip
+
+# keys of the acteLegislatif referring to a text of the export
+TEXT_REF_KEYS = ('texteAdopte', 'texteAssocie', 'refTexteAssocie')
+
+
+@attr.s
+class OpenDataChanges(object):
+    added = attr.ib(default=attr.Factory(set))
+    changed = attr.ib(default=attr.Factory(set))
+    removed = attr.ib(default=attr.Factory(set))
+
+    @property
+    def updated(self):
+        """uids of the doslegs to (re-)parse"""
+        return self.added | self.changed
+
+
+def yield_text_refs(obj):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in TEXT_REF_KEYS and isinstance(value, str):
+                yield value
+            else:
+                yield from yield_text_refs(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from yield_text_refs(value)
+
+
+def _canonical_crc(obj):
+    return zlib.crc32(json.dumps(obj, sort_keys=True).encode('utf-8'))
+
+
+class OpenDataSnapshot(object):
+    """
+    :param members: dict member name -> {'crc': CRC32, 'uid': uid of the
+                    dossier or document it holds}
+    :param dossiers: dict dosleg uid -> {'type', 'legislature',
+                     'titreChemin', 'texts': uids of the texts it refers to}
+    """
+    def __init__(self, members=None, dossiers=None):
+        self.members = members or {}
+        self.dossiers = dossiers or {}
+
+    @classmethod
+    def load(cls, path):
+        """Snapshot saved in `path`, an empty one if there is none"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'rb') as f:
+            data = json.loads(f.read().decode('utf-8'))
+        return cls(members=data['members'], dossiers=data['dossiers'])
+
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps({'members': self.members, 'dossiers': self.dossiers}).encode('utf-8'))
+        os.replace(tmp_path, path)
+
+    def url(self, uid):
+        """
+        url of a dosleg, see `dossier_url`: the /dyn/ urls of
+        `find_texts_discussed_after` from the XV legislature. `anpy-cli
+        doslegs_urls` lists the .asp urls of the website index instead,
+        `parse` handles both.
+        """
+        dossier = self.dossiers[uid]
+        if dossier['type'] != "DossierLegislatif_Type" or not dossier['titreChemin']:
+            return None
+        return dossier_url(dossier['legislature'], dossier['titreChemin'])
+
+    def entries(self, data_zip, filename=None):
+        """
+        yield (member name, CRC32, function decoding the member) of the
+        export, a single file export is split in a member per dossier and
+        document whose CRC32 is computed on their canonical JSON
+        """
+        for info in data_zip.infolist():
+            if filename is None:
+                yield info.filename, info.CRC, lambda name=info.filename: decode_json(data_zip.read(name))
+            elif info.filename == filename:
+                export = decode_json(data_zip.read(filename))["export"]
+                for dossier in export["dossiersLegislatifs"]["dossier"]:
+                    yield ('%s#dossierParlementaire/%s' % (filename, dossier["dossierParlementaire"]["uid"]),
+                           _canonical_crc(dossier), lambda dossier=dossier: dossier)
+                for document in export["textesLegislatifs"]["document"]:
+                    yield ('%s#document/%s' % (filename, document["uid"]),
+                           _canonical_crc(document), lambda document=document: {"document": document})
+
+    def refresh(self, data_zip, filename=None):
+        """
+        Update the snapshot with `data_zip` and return the `OpenDataChanges`
+
+        :param filename: member holding the whole export for the single file
+                         exports (XIV)
+        """
+        changes = OpenDataChanges()
+        changed_texts = set()
+        seen = set()
+
+        if filename is not None and self.members.get(filename, {}).get('crc') == data_zip.getinfo(filename).CRC:
+            # the whole single file export did not change
+            return changes
+
+        for name, crc, decode in self.entries(data_zip, filename=filename):
+            seen.add(name)
+            if self.members.get(name, {}).get('crc') == crc:
+                continue
+
+            data = decode()
+            if "dossierParlementaire" in name:
+                dossier = data["dossierParlementaire"]
+                uid = dossier["uid"]
+                (changes.changed if uid in self.dossiers else changes.added).add(uid)
+                self.dossiers[uid] = {
+                    'type': dossier.get("@xsi:type"),
+                    'legislature': dossier["legislature"],
+                    'titreChemin': dossier["titreDossier"]["titreChemin"],
+                    'texts': sorted(set(yield_text_refs(dossier))),
+                }
+            else:
+                uid = data["document"]["uid"]
+                changed_texts.add(uid)
+            self.members[name] = {'crc': crc, 'uid': uid}
+
+        for name in set(self.members) - seen - {filename}:
+            member = self.members.pop(name)
+            if "dossierParlementaire" in name:
+                self.dossiers.pop(member['uid'], None)
+                changes.removed.add(member['uid'])
+            else:
+                changed_texts.add(member['uid'])
+
+        if filename is not None:
+            self.members[filename] = {'crc': data_zip.getinfo(filename).CRC, 'uid': None}
+
+        if changed_texts:
+            for uid, dossier in self.dossiers.items():
+                if uid not in changes.added and changed_texts.intersection(dossier['texts']):
+                    changes.changed.add(uid)
+
+        return changes
+
+    def refresh_legislature(self, legislature, transport=None):
+        """Download the doslegs export of `legislature` and refresh the snapshot with it"""
+        filename, _ = OPEN_DATA_DOSLEGS_FILES[legislature]
+        with open_data_doslegs_zip(legislature, transport=transport) as data_zip:
+            return self.refresh(data_zip.zip, filename=filename)
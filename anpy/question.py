@@ -1,19 +1,208 @@
 # -*- coding: utf-8 -*-
+import io
+import os
 import re
+import sys
+from datetime import date
 
 import attr
-import requests
-import xmltodict
-from bs4 import BeautifulSoup
+
+from anpy.transport import get_default_transport
+from anpy.utils import concurrent_map
+
+# offset of the first result of a page in the pagination urls
+RE_PAGE_OFFSET = re.compile(r'\(offset\)/\d+')
 
 
 def parse_question(url, xml):
+    import xmltodict
+
     data = xmltodict.parse(xml)['QUESTION']
     data['URL'] = url
     return data
 
 
+QUESTION_URL = 'http://questions.assemblee-nationale.fr/q{legislature}/{legislature}-{numero}{question_type}.htm'
+
+# number of documents parsed by a worker at once
+QUESTION_CHUNK_SIZE = 64
+
+
+@attr.s(slots=True)
+class QuestionRecord(object):
+    """
+    Compact version of a question XML document, the categorical values
+    (groupe, rubrique, ministere...) are interned: they are shared by all the
+    records holding them.
+    """
+    url = attr.ib(default=None)
+    legislature = attr.ib(default=None)
+    numero = attr.ib(default=None)
+    question_type = attr.ib(default=None)
+    date_depot = attr.ib(default=None)
+    author_id = attr.ib(default=None)
+    author = attr.ib(default=None)
+    groupe = attr.ib(default=None)
+    departement = attr.ib(default=None)
+    rubrique = attr.ib(default=None)
+    tete_analyse = attr.ib(default=None)
+    analyses = attr.ib(default=())
+    ministere = attr.ib(default=None)
+    ministere_attributaire = attr.ib(default=None)
+    texte = attr.ib(default=None)
+    cloture = attr.ib(default=None)
+    date_reponse = attr.ib(default=None)
+    texte_reponse = attr.ib(default=None)
+
+    CATEGORICAL_FIELDS = ('question_type', 'groupe', 'departement', 'rubrique', 'tete_analyse',
+                          'ministere', 'ministere_attributaire', 'cloture')
+
+    def intern(self):
+        """intern the categorical values again, after an unpickling for instance"""
+        for field in self.CATEGORICAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                setattr(self, field, sys.intern(value))
+        self.analyses = tuple(sys.intern(analyse) for analyse in self.analyses)
+        return self
+
+
+def _text(element, path):
+    text = element.findtext(path)
+    if text is None:
+        return None
+    return text.strip() or None
+
+
+def _categorical(value):
+    return sys.intern(value) if value else None
+
+
+def _jo_date(text):
+    """'07/01/2014' -> date(2014, 1, 7)"""
+    if not text:
+        return None
+    day, month, year = text.split('/')
+    return date(int(year), int(month), int(day))
+
+
+def build_question_record(question, url=None):
+    """`QuestionRecord` of a QUESTION element"""
+    legislature = int(question.findtext('LEGISLATURE'))
+    numero = int(question.find('DEPOT').get('NUMERO'))
+    question_type = _categorical(question.get('TYPE'))
+
+    author_id = _text(question, 'AUTEUR/ID_ACTEUR')
+    author = ' '.join(filter(None, (_text(question, 'AUTEUR/PRENOM'), _text(question, 'AUTEUR/NOM'))))
+    groupe = question.find('GROUPE')
+    indexation = question.find('INDEXATION_AN')
+    attributions = question.findall('MINA/ORDRE/DEVELOPPE')
+
+    return QuestionRecord(
+        url=url or QUESTION_URL.format(legislature=legislature, numero=numero, question_type=question_type),
+        legislature=legislature,
+        numero=numero,
+        question_type=question_type,
+        date_depot=_jo_date(_text(question, 'DEPOT/DATE_JO')),
+        author_id=int(author_id) if author_id else None,
+        author=author or None,
+        groupe=_categorical(groupe.get('SIGLE') if groupe is not None else None),
+        departement=_categorical(_text(question, 'CIRCONSCRIPTION/DEPARTEMENT')),
+        rubrique=_categorical(indexation.get('RUBRIQUE') if indexation is not None else None),
+        tete_analyse=_categorical(_text(question, 'INDEXATION_AN/TETE_ANALYSE')),
+        analyses=tuple(sys.intern(ana.text.strip()) for ana in question.iterfind('INDEXATION_AN/ANALYSE/ANA') if ana.text),
+        ministere=_categorical(_text(question, 'MINI/DEVELOPPE')),
+        ministere_attributaire=_categorical(attributions[-1].text.strip() if attributions and attributions[-1].text else None),
+        texte=_text(question, 'DEPOT/TEXTE_DEPOT'),
+        cloture=_categorical(_text(question, 'CLOTURE/LIBELLE')),
+        date_reponse=_jo_date(_text(question, 'REPONSE/DATE_JO_REPONSE')),
+        texte_reponse=_text(question, 'REPONSE/TEXTE_REPONSE'),
+    )
+
+
+def iterparse_questions(source, url=None):
+    """
+    Yield a `QuestionRecord` per QUESTION element of `source` (a path, a file
+    object or bytes), each element is freed once its record is built.
+
+    :param url: url of the question, built from its legislature and number
+                by default
+    """
+    from lxml import etree
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    for _, question in etree.iterparse(source, events=('end',), tag='QUESTION'):
+        yield build_question_record(question, url=url)
+        question.clear()
+        while question.getprevious() is not None:
+            del question.getparent()[0]
+
+
+def iter_question_documents(path):
+    """
+    Yield (name, content) of the XML files of a directory (recursively) or
+    of a tarball (compressed or not)
+    """
+    if os.path.isdir(path):
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith('.xml'):
+                    with open(os.path.join(directory, filename), 'rb') as f:
+                        yield filename, f.read()
+        return
+
+    import tarfile
+
+    with tarfile.open(path) as tarball:
+        for member in tarball:
+            if member.isfile() and member.name.lower().endswith('.xml'):
+                yield member.name, tarball.extractfile(member).read()
+
+
+def _parse_question_documents(documents):
+    return [record for document in documents for record in iterparse_questions(document)]
+
+
+def parse_question_files(path, workers=None, chunk_size=QUESTION_CHUNK_SIZE):
+    """
+    Yield the `QuestionRecord` of every question XML file of a directory or
+    a tarball, in the files order.
+
+    :param workers: number of parsing processes, defaults to the number of
+                    CPUs; with 0 the files are parsed in this process
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    def chunks():
+        chunk = []
+        for _, content in iter_question_documents(path):
+            chunk.append(content)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    if not workers:
+        for chunk in chunks():
+            yield from _parse_question_documents(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # two chunks per worker, so they never wait for the next one
+        for records in concurrent_map(_parse_question_documents, chunks(), concurrency=workers * 2, executor=executor):
+            for record in records:
+                yield record.intern()
+
+
 def parse_question_search_result(url, html_content):
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, "html5lib")
 
     search_result = QuestionSearchResult(**{
@@ -48,7 +237,9 @@ def parse_question_search_result(url, html_content):
 
 
 class QuestionSearchService(object):
-    def __init__(self):
+    def __init__(self, transport=None, concurrency=1):
+        self.transport = transport or get_default_transport()
+        self.concurrency = concurrency
         self.base_url = 'http://www2.assemblee-nationale.fr/'
         self.search_url = '%srecherche/resultats_questions' % self.base_url
         self.default_params = {
@@ -59,7 +250,8 @@ class QuestionSearchService(object):
             'ssTypeDocument[]': 'qe',
         }
 
-    def get(self, legislature=14, is_answered=None, is_removed=None, size=10):
+    def build_params(self, legislature=14, is_answered=None, is_removed=None,
+                     size=10):
         params = self.default_params.copy()
 
         if is_answered:
@@ -75,7 +267,13 @@ class QuestionSearchService(object):
             'replies[]': is_answered,
             'removed[]': is_removed
         })
-        response = requests.post(self.search_url, data=params)
+        return params
+
+    def get(self, legislature=14, is_answered=None, is_removed=None, size=10):
+        params = self.build_params(legislature=legislature,
+                                   is_answered=is_answered,
+                                   is_removed=is_removed, size=size)
+        response = self.transport.post(self.search_url, data=params)
 
         return parse_question_search_result(response.url, response.content)
 
@@ -83,18 +281,71 @@ class QuestionSearchService(object):
         return self.get(legislature=legislature, is_answered=is_answered,
                         is_removed=is_removed, size=1).total_count
 
-    def iter(self, legislature=14, is_answered=None, is_removed=None, size=10):
-        search_results = self.get(legislature=legislature,
-                                  is_answered=is_answered,
-                                  is_removed=is_removed, size=size)
-        yield search_results
-
-        for start in range(1, search_results.total_count, size):
-            if search_results.next_url is not None:
-                yield parse_question_search_result(
-                    search_results.next_url,
-                    requests.get(self.base_url +
-                                 search_results.next_url).content)
+    def get_page(self, url):
+        response = self.transport.get(self.base_url + url)
+        return parse_question_search_result(response.url, response.content)
+
+    def iter(self, legislature=14, is_answered=None, is_removed=None, size=10,
+             concurrency=None):
+        """
+        Iterate over all the result pages of a search, pages after the first
+        one are fetched by `concurrency` threads (defaults to the service
+        concurrency) and are yielded in order.
+        """
+        cursor = QuestionSearchCursor(legislature=legislature,
+                                      is_answered=is_answered,
+                                      is_removed=is_removed, size=size)
+        return self.iter_from(cursor, concurrency=concurrency)
+
+    def iter_from(self, cursor, concurrency=None):
+        """
+        Same as `iter` for the search of `cursor`, starting at its offset.
+
+        The cursor is updated once a page has been processed (when the next
+        one is requested), so an interrupted iteration resumes with the page
+        it was processing.
+        """
+        if concurrency is None:
+            concurrency = self.concurrency
+
+        # the search parameters are kept by the server session, the search is
+        # sent again even when resuming from another offset
+        first_page = self.get(legislature=cursor.legislature,
+                              is_answered=cursor.is_answered,
+                              is_removed=cursor.is_removed, size=cursor.size)
+        cursor.total_count = first_page.total_count
+
+        if cursor.offset == 0:
+            yield first_page
+            cursor.offset = cursor.size
+
+        if first_page.next_url is None:
+            return
+
+        offsets = range(cursor.offset, cursor.total_count, cursor.size)
+        urls = (RE_PAGE_OFFSET.sub('(offset)/%d' % offset, first_page.next_url)
+                for offset in offsets)
+        for offset, page in zip(offsets, concurrent_map(self.get_page, urls,
+                                                        concurrency)):
+            yield page
+            cursor.offset = offset + cursor.size
+
+
+@attr.s
+class QuestionSearchCursor(object):
+    """
+    Position of an iteration over a search, `attr.asdict` gives a JSON
+    serializable version to resume it later with
+    `QuestionSearchService.iter_from(QuestionSearchCursor(**data))`
+
+    :param offset: offset of the first result of the next page to yield
+    """
+    legislature = attr.ib(default=14)
+    is_answered = attr.ib(default=None)
+    is_removed = attr.ib(default=None)
+    size = attr.ib(default=10)
+    offset = attr.ib(default=0)
+    total_count = attr.ib(default=None)
 
 
 @attr.s
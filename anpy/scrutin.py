@@ -2,11 +2,11 @@
 from __future__ import unicode_literals
 
 import re
-from builtins import filter, str
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 
+from .bulk import bulk_download_and_build
+from .transport import get_default_transport
 from .utils import extract_datetime
 
 
@@ -22,8 +22,9 @@ class Scrutin(object):
         self.groupes = groupes
 
     @staticmethod
-    def download_and_build(url):
-        return ScrutinParser(url, requests.get(url).content).parse()
+    def download_and_build(url, transport=None):
+        transport = transport or get_default_transport()
+        return parse_scrutin(url, transport.get(url).content)
 
     def to_dict(self):
         return {
@@ -51,8 +52,8 @@ class ScrutinSynthese(object):
         self.resultat = resultat
 
     @staticmethod
-    def build(url, html):
-        return ScrutinSyntheseParser(url, html).parse()
+    def build(url, html, soup=None):
+        return ScrutinSyntheseParser(url, html, soup=soup).parse()
 
     def to_dict(self):
         return {
@@ -92,6 +93,20 @@ class ScrutinGroupe(object):
         }
 
 
+def parse_scrutin(url, html):
+    return ScrutinParser(url, html).parse()
+
+
+def download_scrutins(urls, transport=None, io_workers=8, cpu_workers=None):
+    """
+    Build the `Scrutin` of each url of `urls` (for instance the
+    `url_scrutin` of the table), see `anpy.bulk.bulk_download_and_build`.
+    """
+    return bulk_download_and_build(urls, parse_scrutin, transport=transport,
+                                   io_workers=io_workers,
+                                   cpu_workers=cpu_workers)
+
+
 class ScrutinParser(object):
     RE_DATE = re.compile(r'(\d+/\d+/\d+)')
     RE_SCRUTIN_URL = re.compile(
@@ -109,7 +124,8 @@ class ScrutinParser(object):
             legislature=self.parse_legislature(),
             numero=self.parse_numero(),
             date=self.parse_date(),
-            synthese=ScrutinSynthese.build(self.url, self.html),
+            synthese=ScrutinSynthese.build(self.url, self.html,
+                                           soup=self.soup),
             groupes=self.parse_groupes()
         )
 
@@ -145,11 +161,21 @@ class ScrutinParser(object):
 
 
 class ScrutinSyntheseParser(object):
-    def __init__(self, url, html):
+    def __init__(self, url, html, soup=None):
         self.url = url
         self.html = html
 
-        self.soup = BeautifulSoup(html, 'html5lib')
+        # the soup of the whole page can be shared with ScrutinParser
+        self.soup = soup if soup is not None \
+            else BeautifulSoup(html, 'html5lib')
+
+        # the five numbers are read from the same nodes, index them once
+        self.repartition_by_id = {}
+        self.repartition_by_text = []
+        for node in self.soup.select('.repartitionvotes'):
+            if node.has_attr('id'):
+                self.repartition_by_id.setdefault(node['id'], node)
+            self.repartition_by_text.append((node.text, node))
 
     def parse(self):
         return ScrutinSynthese(
@@ -165,18 +191,12 @@ class ScrutinSyntheseParser(object):
         return int(soup.b.text) if soup.b else None
 
     def get_number_by_id(self, id):
-        def match(node):
-            return node.has_attr('id') and node['id'] == id
-
-        return self.get_number(
-            next(filter(match, self.soup.select('.repartitionvotes'))))
+        return self.get_number(self.repartition_by_id[id])
 
     def get_number_by_text(self, text):
-        def match(node):
-            return node.text.startswith(text)
-
-        return self.get_number(
-            next(filter(match, self.soup.select('.repartitionvotes'))))
+        return self.get_number(next(
+            node for node_text, node in self.repartition_by_text
+            if node_text.startswith(text)))
 
     def parse_votants(self):
         return self.get_number_by_id('total')
@@ -205,11 +225,21 @@ class ScrutinSyntheseParser(object):
 
 class ScrutinGroupeParser(object):
     RE_NOM = re.compile(r'(.*) \(\d+ membres?\)')
-    RE_DEPUTE = re.compile(r'([^> ]+(?: d(?:e|u|es))?) <b>([^<]+)</b>')
+    # first name at the end of the text preceding the <b>last name</b>
+    RE_PRENOM = re.compile(r'([^> ]+(?: d(?:e|u|es))?) $')
+
+    # class of the block holding a list -> ScrutinGroupe vote
+    VOTE_CLASSES = {
+        'Pour': ScrutinGroupe.VOTE_POUR,
+        'Contre': ScrutinGroupe.VOTE_CONTRE,
+        'Abstention': ScrutinGroupe.VOTE_ABSTENTION,
+        'Non-votants': ScrutinGroupe.VOTE_NON_VOTANT,
+    }
 
     def __init__(self, url, soup):
         self.url = url
         self.soup = soup
+        self._listes = None
 
     def parse(self):
         return ScrutinGroupe(
@@ -228,28 +258,49 @@ class ScrutinGroupeParser(object):
         m = self.RE_NOM.match(node[0].text)
         return m.group(1) if m else None
 
-    def parse_liste_deputes(self, selector):
-        ul = self.soup.select(selector)
-
-        if len(ul):
-            # Parsing html direct car dans certains cas le <ul class="deputes">
-            # ne contient que du texte, pas de <li>.
-            html = str(ul[0]).replace('\xa0', ' ')
-            return [
-                '%s %s' % nom
-                for nom in self.RE_DEPUTE.findall(html)
-            ]
-
-        return []
+    def parse_listes_deputes(self):
+        """
+        dict vote -> deputes of the group, the four lists are read in a
+        single pass over the first <ul class="deputes"> of each vote block
+        """
+        if self._listes is None:
+            self._listes = {}
+            for ul in self.soup.find_all('ul', class_='deputes'):
+                vote = self.find_vote(ul)
+                if vote is not None and vote not in self._listes:
+                    self._listes[vote] = self.parse_liste_deputes(ul)
+        return self._listes
+
+    def find_vote(self, ul):
+        for parent in ul.parents:
+            for css_class in parent.get('class') or ():
+                if css_class in self.VOTE_CLASSES:
+                    return self.VOTE_CLASSES[css_class]
+            if parent is self.soup:
+                return None
+
+    def parse_liste_deputes(self, ul):
+        # the names are read from the text nodes: in some cases the
+        # <ul class="deputes"> only contains text, no <li>
+        deputes = []
+        for nom in ul.find_all('b'):
+            prenom = nom.previous_sibling
+            if type(prenom) is not NavigableString or len(nom.contents) != 1 \
+                    or type(nom.contents[0]) is not NavigableString:
+                continue
+            m = self.RE_PRENOM.search(prenom.replace('\xa0', ' '))
+            if m:
+                deputes.append('%s %s' % (m.group(1), nom.contents[0].replace('\xa0', ' ')))
+        return deputes
 
     def parse_pour(self):
-        return self.parse_liste_deputes('.Pour ul.deputes')
+        return self.parse_listes_deputes().get(ScrutinGroupe.VOTE_POUR, [])
 
     def parse_contre(self):
-        return self.parse_liste_deputes('.Contre ul.deputes')
+        return self.parse_listes_deputes().get(ScrutinGroupe.VOTE_CONTRE, [])
 
     def parse_abstentions(self):
-        return self.parse_liste_deputes('.Abstention ul.deputes')
+        return self.parse_listes_deputes().get(ScrutinGroupe.VOTE_ABSTENTION, [])
 
     def parse_nonvotants(self):
-        return self.parse_liste_deputes('.Non-votants ul.deputes')
+        return self.parse_listes_deputes().get(ScrutinGroupe.VOTE_NON_VOTANT, [])
@@ -1,46 +1,87 @@
-import json
-
+import itertools
 from urllib.parse import urljoin
-import requests
+
 from bs4 import BeautifulSoup
 
-URL_TEMPLATE = "http://www2.assemblee-nationale.fr/scrutins/liste/(offset)/{offset}/(legislature)/15/(type)/TOUS/(idDossier)/TOUS"
+from anpy.scrutin import download_scrutins
+from anpy.transport import get_default_transport
+from anpy.utils import concurrent_map
+
+URL_TEMPLATE = "http://www2.assemblee-nationale.fr/scrutins/liste/(offset)/{offset}/(legislature)/{legislature}/(type)/TOUS/(idDossier)/TOUS"
+
+PAGE_SIZE = 100
+
+
+def parse_tableau_page(url, html):
+    """scrutins of a page of the table, most recent first"""
+    soup = BeautifulSoup(html, 'lxml')
+    scrutins = []
+    for line in soup.select('#listeScrutins tbody tr'):
+        cells = list(line.select("td"))
+        links = list(cells[2].select('a'))
+        link_dos = None
+        if len(links) == 2:
+            link_dos = urljoin(url, links[0]["href"])
+            link_scrutin = urljoin(url, links[1]["href"])
+        else:
+            link_scrutin = urljoin(url, links[0]["href"])
+        scrutins.append({
+            "numero": int(cells[0].text.strip().replace('*', '')),
+            "date": cells[1].text.strip(),
+            "objet": cells[2].text.replace('[dossier] [analyse du scrutin]', '').strip(),
+            "pour": int(cells[3].text.strip()),
+            "contre": int(cells[4].text.strip()),
+            "abstention": int(cells[5].text.strip()),
+            "url_dossier": link_dos,
+            "url_scrutin": link_scrutin,
+        })
+    return scrutins
 
 
-def parse_tableau_scrutins():
-    num = None
+def parse_tableau_scrutins(legislature=15, since=None, concurrency=1, transport=None):
+    """
+    Yield a dict per scrutin of the table of `legislature`, most recent
+    first. The table has no end: past the last page, the site serves a page
+    already seen, the crawl stops at the first numero seen twice.
+
+    :param since: last numero already known, the crawl stops when it reaches
+                  it so an update only fetches the pages of the new scrutins
+    :param concurrency: number of pages fetched in parallel during a full
+                        crawl (`since` is None), the incremental updates
+                        fetch one page at a time
+    """
+    transport = transport or get_default_transport()
+    if since is not None:
+        concurrency = 1
+
+    def fetch(offset):
+        url = URL_TEMPLATE.format(offset=offset, legislature=legislature)
+        return parse_tableau_page(url, transport.get(url).text)
+
     nums = set()
-    offset = 0
-    while True:
-        url = URL_TEMPLATE.format(offset=offset)
-        resp = requests.get(url)
-        soup = BeautifulSoup(resp.text, 'lxml')
-        should_break = False
-        for line in soup.select('#listeScrutins tbody tr'):
-            cells = list(line.select("td"))
-            links = list(cells[2].select('a'))
-            link_dos = None
-            if len(links) == 2:
-                link_dos = urljoin(url, links[0]["href"])
-                link_scrutin = urljoin(url, links[1]["href"])
-            else:
-                link_scrutin = urljoin(url, links[0]["href"])
-            num = int(cells[0].text.strip().replace('*', ''))
-            if num in nums:
-                should_break = True
-                break
+    for page in concurrent_map(fetch, itertools.count(0, PAGE_SIZE), concurrency=concurrency):
+        for scrutin in page:
+            num = scrutin["numero"]
+            if num in nums or (since is not None and num <= since):
+                return
             nums.add(num)
-            data = {
-                "numero": num,
-                "date": cells[1].text.strip(),
-                "objet": cells[2].text.replace('[dossier] [analyse du scrutin]', '').strip(),
-                "pour": int(cells[3].text.strip()),
-                "contre": int(cells[4].text.strip()),
-                "abstention": int(cells[5].text.strip()),
-                "url_dossier": link_dos,
-                "url_scrutin": link_scrutin,
-            }
-            print(json.dumps(data, ensure_ascii=False))
-        if should_break:
-            break
-        offset += 100
+            yield scrutin
+        if not page:
+            return
+
+
+def download_tableau_scrutins(legislature=15, skip=(), concurrency=1, transport=None,
+                              io_workers=8, cpu_workers=None):
+    """
+    Build the `Scrutin` of every scrutin of the table of `legislature`: the
+    urls are streamed from the table to `download_scrutins` as its pages are
+    read, yields a `BulkResult` per scrutin as soon as it is ready.
+
+    :param skip: numeros of the scrutins not to download (already done)
+    :param concurrency: number of table pages fetched in parallel
+    """
+    transport = transport or get_default_transport()
+    urls = (scrutin["url_scrutin"]
+            for scrutin in parse_tableau_scrutins(legislature=legislature, concurrency=concurrency, transport=transport)
+            if scrutin["numero"] not in skip)
+    return download_scrutins(urls, transport=transport, io_workers=io_workers, cpu_workers=cpu_workers)
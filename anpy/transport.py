@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP transports used by every scraper of the package.
+
+All the services and `download_and_build` constructors accept a `transport`
+argument, when none is given they share the module default transport so that
+consecutive requests to assemblee-nationale.fr reuse the same connections.
+
+`requests` is only imported when a transport is used, so the parsers can be
+imported (in the parsing processes for instance) without paying for it.
+"""
+import io
+import os
+
+# (connect timeout, read timeout) in seconds
+DEFAULT_TIMEOUT = (10, 60)
+
+
+class Transport(object):
+    """
+    Keep-alive transport backed by a `requests.Session`.
+
+    :param timeout: default timeout of each request, see `requests` docs
+    :param pool_connections: number of per-host pools to keep around
+    :param pool_maxsize: maximum number of connections kept open per host
+    :param pool_block: when True, never open more than `pool_maxsize`
+                       connections to the same host and wait for a free one
+    :param max_retries: number of retries on connection errors
+    :param headers: headers sent with every request
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, max_retries=0,
+                 headers=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block,
+                              max_retries=max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FileTransport(Transport):
+    """
+    Offline transport answering requests with local files, useful to run or
+    benchmark the scrapers against the fixtures of `tests/resources`.
+
+    :param routes: dict mapping an url (query string included) to a file path,
+                   unknown urls get an empty 404 response
+    :param encoding: encoding of the files, guessed by `requests` if None
+    """
+    def __init__(self, routes, encoding=None):
+        self.routes = routes
+        self.encoding = encoding
+
+    def request(self, method, url, params=None, **kwargs):
+        import requests
+
+        prepared = requests.Request(method, url, params=params).prepare()
+
+        response = requests.Response()
+        response.url = prepared.url
+        response.request = prepared
+        response.encoding = self.encoding
+        response.raw = io.BytesIO()
+
+        path = self.routes.get(prepared.url)
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                response._content = f.read()
+            response.status_code = 200
+        else:
+            response._content = b''
+            response.status_code = 404
+        response._content_consumed = True
+
+        return response
+
+    def close(self):
+        pass
+
+
+_default_transport = None
+_default_transport_is_set = False
+
+
+def get_default_transport():
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
+
+
+def set_default_transport(transport):
+    global _default_transport, _default_transport_is_set
+    _default_transport = transport
+    _default_transport_is_set = transport is not None
+
+
+def get_configured_transport():
+    """
+    Default transport given to `set_default_transport` (a `CachingTransport`
+    for instance), None if it was not set
+    """
+    return _default_transport if _default_transport_is_set else None
@@ -1,20 +1,75 @@
 # -*- coding: utf-8 -*-
 from builtins import str
+import gc
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 
-import dateparser
 import re
+import threading
 
 hours_with_minutes_re = re.compile(' heures ')
 hours_without_minutes = re.compile(' heures$')
 
+FRENCH_MONTHS = {
+    'janvier': 1, 'février': 2, 'fevrier': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6, 'juillet': 7,
+    'août': 8, 'aout': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12, 'decembre': 12,
+}
+
+# "mardi 1er décembre 2015 à 15:30", the weekday and the time are optional
+FRENCH_DATE_RE = re.compile(
+    r'^(?:(?:lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche)\s+)?(\d{1,2})(?:er)?\s+(%s)\s+(\d{4})'
+    r'(?:\s+(?:à\s+)?(\d{1,2})[:h](\d{2}))?$' % '|'.join(FRENCH_MONTHS), re.IGNORECASE)
+
+# "12/03/2015"
+NUMERIC_DATE_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+
+@lru_cache(maxsize=4096)
+def _parse_known_french_date(text):
+    """datetime of the formats found in the AN pages, None for the other ones"""
+    match = FRENCH_DATE_RE.match(text.strip())
+    try:
+        if match:
+            day, month, year, hour, minute = match.groups()
+            return datetime(int(year), FRENCH_MONTHS[month.lower()], int(day), int(hour or 0), int(minute or 0))
+
+        match = NUMERIC_DATE_RE.match(text.strip())
+        if match:
+            day, month, year = match.groups()
+            return datetime(int(year), int(month), int(day))
+    except ValueError:
+        pass  # invalid date, like "31 février 2015"
+    return None
+
+
+def parse_french_date(text):
+    """
+    Same as `dateparser.parse(text, languages=['fr'])` but the formats found
+    in the AN pages are parsed directly (and cached), dateparser is only used
+    for the other ones, never cached since they can be relative to now
+    ("hier", "15:30")
+
+    >>> parse_french_date('mardi 1er décembre 2015 à 15:30')
+    datetime.datetime(2015, 12, 1, 15, 30)
+    """
+    parsed = _parse_known_french_date(text)
+    if parsed is not None:
+        return parsed
+
+    import dateparser  # slow to import, only needed for the unusual formats
+    return dateparser.parse(text, languages=['fr'])
+
 
 def extract_datetime(text):
     text = hours_with_minutes_re.sub(':', text.strip())
     text = hours_without_minutes.sub(':00', text)
 
-    return dateparser.parse(text, languages=['fr'])
+    return parse_french_date(text)
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -58,3 +113,76 @@ def convert_camelcase_to_underscore(name):
     # thx to http://stackoverflow.com/questions/1175208/elegant-python-function-to-convert-camelcase-to-camel-case  # noqa
     s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def concurrent_map(func, iterable, concurrency=1, executor=None):
+    """
+    Lazy equivalent of `map(func, iterable)` running `func` in a pool of
+    `concurrency` threads.
+
+    Results are yielded in the order of `iterable` and no more than
+    `concurrency` calls are pending at any time, so `iterable` can be
+    infinite as long as the consumer stops iterating at some point.
+
+    :param executor: executor running the calls (a process pool for
+                     instance) instead of a new pool of threads, it is not
+                     shut down
+    """
+    if executor is not None:
+        yield from _executor_map(executor, func, iterable, max(concurrency, 1))
+        return
+
+    if concurrency <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        yield from _executor_map(executor, func, iterable, concurrency)
+
+
+def _executor_map(executor, func, iterable, concurrency):
+    iterator = iter(iterable)
+    pending = deque(executor.submit(func, item)
+                    for item in islice(iterator, concurrency))
+    try:
+        while pending:
+            result = pending.popleft().result()
+            for item in islice(iterator, 1):
+                pending.append(executor.submit(func, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# number of `gc_paused` blocks running, in any thread
+_gc_paused_depth = 0
+_gc_paused_was_enabled = False
+_gc_paused_lock = threading.Lock()
+
+
+@contextmanager
+def gc_paused():
+    """
+    Disable the cyclic garbage collector while building a large tree of
+    objects (like a decoded open data export): with the collector on, each
+    collection walks the whole growing tree and dominates the run time.
+
+    The collector is disabled for the whole process, other threads included.
+    The nested or concurrent blocks share the pause: the collector is turned
+    back on (if it was on before the first one) when the last one exits.
+    """
+    global _gc_paused_depth, _gc_paused_was_enabled
+    with _gc_paused_lock:
+        if _gc_paused_depth == 0:
+            _gc_paused_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_paused_depth += 1
+    try:
+        yield
+    finally:
+        with _gc_paused_lock:
+            _gc_paused_depth -= 1
+            if _gc_paused_depth == 0 and _gc_paused_was_enabled:
+                gc.enable()
@@ -1,40 +1,154 @@
-import json
+import hashlib
+import itertools
+import os
+import struct
 import sys
+import tempfile
+from array import array
 
 from urllib.parse import urljoin
-import requests
 from bs4 import BeautifulSoup
 
+from anpy.transport import get_default_transport
+from anpy.utils import concurrent_map
+
 URL_TEMPLATE_SEANCE = "http://videos.assemblee-nationale.fr/seance-publique.p{page}"
 URL_TEMPLATE_COMMISSION = "http://videos.assemblee-nationale.fr/commissions.p{page}"
 
 
-def _extract_from_template(url_template, type):
-    page = 1
-    urls = set()
-    prev_len_urls = 0
-    while True:
+class SeenSet(object):
+    """
+    Set of the urls already crawled, stored on disk as a sorted array of
+    their 64 bits hashes (8 bytes per url, no false positive in practice
+    unlike a Bloom filter, which could hide a new video)
+
+    :param complete: True once a full crawl went through all the pages, until
+                     then the crawls don't stop at the first page already
+                     seen, so an interrupted full crawl is resumed
+    """
+    # magic and flags written before the hashes
+    HEADER = struct.Struct('<4sI')
+    MAGIC = b'SEEN'
+    FLAG_COMPLETE = 1
+
+    def __init__(self, hashes=(), complete=False):
+        self.hashes = set(hashes)
+        self.complete = complete
+
+    @staticmethod
+    def hash(url):
+        return int.from_bytes(hashlib.sha1(url.encode('utf-8')).digest()[:8], 'little')
+
+    @classmethod
+    def load(cls, path):
+        """Set saved in `path`, an empty one if there is none"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError('%s is not a file of seen videos' % path)
+        _, flags = cls.HEADER.unpack_from(data)
+        hashes = array('Q')
+        hashes.frombytes(data[cls.HEADER.size:])
+        if sys.byteorder == 'big':
+            hashes.byteswap()
+        return cls(hashes, complete=bool(flags & cls.FLAG_COMPLETE))
+
+    def save(self, path):
+        hashes = array('Q', sorted(self.hashes))
+        if sys.byteorder == 'big':
+            hashes.byteswap()
+        flags = self.FLAG_COMPLETE if self.complete else 0
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, flags))
+            f.write(hashes.tobytes())
+        os.replace(tmp_path, path)
+
+    def add(self, url):
+        """Add `url`, return False if it was already in the set"""
+        url_hash = self.hash(url)
+        if url_hash in self.hashes:
+            return False
+        self.hashes.add(url_hash)
+        return True
+
+    def __contains__(self, url):
+        return self.hash(url) in self.hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+def _parse_videos_page(url, html):
+    soup = BeautifulSoup(html, 'lxml')
+    return [urljoin(url, video_el.select_one('.vl')['href'])
+            for video_el in soup.select('#myCarousel-contenu .span4')]
+
+
+def _extract_from_template(url_template, type, seen=None, full_crawl=False, concurrency=1, transport=None):
+    """
+    Yield the videos of the pages of `url_template` not in `seen`, most
+    recent first.
+
+    :param seen: `SeenSet` of the videos already known, updated with the
+                 new ones
+    :param full_crawl: go through all the pages, until one only holds
+                       videos of the previous pages (the pages past the
+                       end repeat the last one), instead of stopping at the
+                       first page without any new video
+    :param concurrency: number of pages fetched in parallel
+    """
+    transport = transport or get_default_transport()
+    if seen is None:
+        seen = SeenSet()
+    crawled = set()
+
+    def fetch(page):
         print(type, "page", page, file=sys.stderr)
         url = url_template.format(page=page)
-        resp = requests.get(url)
-        soup = BeautifulSoup(resp.text, 'lxml')
-        should_break = False
-        for video_el in soup.select('#myCarousel-contenu .span4'):
-            url = urljoin(url, video_el.select_one('.vl')['href'])
-            print(json.dumps({
-                'type': type,
-                'url': url,
-            }))
-            if url in urls:
-                should_break = True
-                break
-            urls.add(url)
-        if should_break or len(urls) == prev_len_urls:
-            break
-        page += 1
-        prev_len_urls = len(urls)
-
-
-def parse_videos_list():
-    _extract_from_template(URL_TEMPLATE_SEANCE, 'seance')
-    _extract_from_template(URL_TEMPLATE_COMMISSION, 'commission')
+        return _parse_videos_page(url, transport.get(url).text)
+
+    for urls in concurrent_map(fetch, itertools.count(1), concurrency=concurrency):
+        has_new_videos = False
+        for url in urls:
+            if full_crawl:
+                url_hash = SeenSet.hash(url)
+                if url_hash not in crawled:
+                    crawled.add(url_hash)
+                    has_new_videos = True
+            # added just before being yielded: a video is only marked seen
+            # once it has been emitted
+            if seen.add(url):
+                has_new_videos = True
+                yield {
+                    'type': type,
+                    'url': url,
+                }
+        if not has_new_videos:
+            return
+
+
+def parse_videos_list(seen=None, concurrency=1, transport=None):
+    """
+    Yield the new videos of the seances then of the commissions, see
+    `_extract_from_template`
+
+    Until `seen` is complete, all the pages are crawled and it is marked
+    complete at the end, the next crawls stop at the first page without any
+    new video.
+
+    :param concurrency: number of pages fetched in parallel during a full
+                        crawl, the incremental updates fetch one page at a
+                        time
+    """
+    if seen is None:
+        seen = SeenSet()
+    full_crawl = not seen.complete
+    for url_template, type in ((URL_TEMPLATE_SEANCE, 'seance'), (URL_TEMPLATE_COMMISSION, 'commission')):
+        yield from _extract_from_template(url_template, type, seen=seen, full_crawl=full_crawl,
+                                          concurrency=concurrency if full_crawl else 1,
+                                          transport=transport)
+    seen.complete = True
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Deputes x scrutins vote matrix.
+
+Each depute name, groupe and scrutin gets a stable integer id in the order
+they are first seen, and the votes are stored as int8 codes in a compact
+grid filled incrementally as the scrutins are parsed: a NumPy array when
+NumPy is installed, an `array('b')` otherwise. A whole legislature (about
+4,000 scrutins x 600 deputes) takes a few MB.
+
+    >>> matrix = VoteMatrix()
+    >>> for url in urls:
+    ...     matrix.add(Scrutin.download_and_build(url))
+    >>> matrix.cohesion('Socialiste, républicain et citoyen')
+    >>> matrix.agreement('Claude Bartolone', 'David Habib')
+"""
+from array import array
+
+from .scrutin import ScrutinGroupe
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+ABSENT = 0
+POUR = 1
+CONTRE = -1
+ABSTENTION = 2
+NON_VOTANT = 3
+
+# ScrutinGroupe vote -> int8 code in the matrix
+VOTE_CODES = {
+    ScrutinGroupe.VOTE_POUR: POUR,
+    ScrutinGroupe.VOTE_CONTRE: CONTRE,
+    ScrutinGroupe.VOTE_ABSTENTION: ABSTENTION,
+    ScrutinGroupe.VOTE_NON_VOTANT: NON_VOTANT,
+}
+
+# codes of the deputes who took part in the vote
+EXPRIMED_CODES = (POUR, CONTRE, ABSTENTION)
+
+
+def scrutin_key(scrutin):
+    if scrutin.numero is None:
+        return scrutin.url
+    return (scrutin.legislature, scrutin.numero)
+
+
+def _grown(size, needed):
+    """size of a grid dimension holding `needed` items, doubled when it grows"""
+    return size if needed <= size else max(needed, 2 * size)
+
+
+class _ArrayGrid(object):
+    """int8 rows x cols grid in an `array('b')`, growing by doubling"""
+    def __init__(self, rows=0, cols=0):
+        self.rows = rows
+        self.cols = cols
+        self.data = array('b', bytes(rows * cols))
+
+    def reserve(self, rows, cols):
+        if rows <= self.rows and cols <= self.cols:
+            return
+        new_rows, new_cols = _grown(self.rows, rows), _grown(self.cols, cols)
+        data = array('b', bytes(new_rows * new_cols))
+        for i in range(self.rows):
+            data[i * new_cols:i * new_cols + self.cols] = self.data[i * self.cols:(i + 1) * self.cols]
+        self.rows, self.cols, self.data = new_rows, new_cols, data
+
+    def row(self, i, cols):
+        return self.data[i * self.cols:i * self.cols + cols]
+
+    def set_row(self, i, values):
+        start = i * self.cols
+        self.data[start:start + self.cols] = array('b', bytes(self.cols))
+        for j, value in values:
+            self.data[start + j] = value
+
+    def get(self, i, j):
+        return self.data[i * self.cols + j]
+
+    def column(self, j, rows):
+        return array('b', self.data[j:rows * self.cols:self.cols])
+
+    @property
+    def nbytes(self):
+        return len(self.data) * self.data.itemsize
+
+
+class _NumpyGrid(object):
+    """int8 rows x cols grid in a NumPy array, growing by doubling"""
+    def __init__(self, rows=0, cols=0):
+        self.data = numpy.zeros((rows, cols), dtype=numpy.int8)
+
+    @property
+    def rows(self):
+        return self.data.shape[0]
+
+    @property
+    def cols(self):
+        return self.data.shape[1]
+
+    def reserve(self, rows, cols):
+        if rows <= self.rows and cols <= self.cols:
+            return
+        data = numpy.zeros((_grown(self.rows, rows), _grown(self.cols, cols)), dtype=numpy.int8)
+        data[:self.rows, :self.cols] = self.data
+        self.data = data
+
+    def row(self, i, cols):
+        return self.data[i, :cols]
+
+    def set_row(self, i, values):
+        self.data[i] = 0
+        if values:
+            cols, codes = zip(*values)
+            self.data[i, list(cols)] = codes
+
+    def get(self, i, j):
+        return int(self.data[i, j])
+
+    def column(self, j, rows):
+        return self.data[:rows, j]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+class VoteMatrix(object):
+    """
+    :param use_numpy: store the votes in a NumPy array, by default when
+                      NumPy is installed
+
+    The grids have a row per scrutin and a column per depute: `votes` holds
+    the vote codes (`POUR`, `CONTRE`, `ABSTENTION`, `NON_VOTANT`, `ABSENT`)
+    and `groupes` the groupe id + 1 of the depute in this scrutin (0 when
+    the depute is in none of its lists).
+    """
+    def __init__(self, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ImportError('numpy is required to use a NumPy VoteMatrix')
+        self.use_numpy = use_numpy
+        grid = _NumpyGrid if use_numpy else _ArrayGrid
+        self.votes = grid()
+        self.groupes = grid()
+
+        self.deputes = []
+        self.depute_ids = {}
+        self.groupe_names = []
+        self.groupe_ids = {}
+        self.scrutins = []
+        self.scrutin_ids = {}
+
+    @classmethod
+    def from_scrutins(cls, scrutins, use_numpy=None):
+        matrix = cls(use_numpy=use_numpy)
+        for scrutin in scrutins:
+            matrix.add(scrutin)
+        return matrix
+
+    @property
+    def shape(self):
+        """(number of deputes, number of scrutins)"""
+        return len(self.deputes), len(self.scrutins)
+
+    @property
+    def nbytes(self):
+        return self.votes.nbytes + self.groupes.nbytes
+
+    def _id(self, names, ids, name):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def depute_id(self, name):
+        return self._id(self.deputes, self.depute_ids, name)
+
+    def groupe_id(self, name):
+        return self._id(self.groupe_names, self.groupe_ids, name)
+
+    def add(self, scrutin):
+        """
+        Add the votes of a `Scrutin`, a scrutin already in the matrix is
+        replaced, return its id
+
+        :param scrutin: `Scrutin` or anything with `url`, `legislature`,
+                        `numero` and `groupes` attributes
+        """
+        key = scrutin_key(scrutin)
+        scrutin_id = self._id(self.scrutins, self.scrutin_ids, key)
+
+        votes, groupes = [], []
+        for groupe in scrutin.groupes:
+            groupe_code = self.groupe_id(groupe.groupe) + 1
+            if groupe_code > 127:
+                raise ValueError('a VoteMatrix holds at most 127 groupes')
+            for vote, deputes in ((ScrutinGroupe.VOTE_POUR, groupe.pour),
+                                  (ScrutinGroupe.VOTE_CONTRE, groupe.contre),
+                                  (ScrutinGroupe.VOTE_ABSTENTION, groupe.abstention),
+                                  (ScrutinGroupe.VOTE_NON_VOTANT, groupe.nonvotants)):
+                for depute in deputes:
+                    depute_id = self.depute_id(depute)
+                    votes.append((depute_id, VOTE_CODES[vote]))
+                    groupes.append((depute_id, groupe_code))
+
+        for grid in (self.votes, self.groupes):
+            grid.reserve(scrutin_id + 1, len(self.deputes))
+        self.votes.set_row(scrutin_id, votes)
+        self.groupes.set_row(scrutin_id, groupes)
+        return scrutin_id
+
+    def vote(self, depute, scrutin):
+        """vote code of `depute` in the scrutin of key `scrutin`"""
+        if depute not in self.depute_ids:
+            return ABSENT
+        return self.votes.get(self.scrutin_ids[scrutin], self.depute_ids[depute])
+
+    def depute_votes(self, depute):
+        """
+        vote codes of `depute`, in the order of `scrutins`, all `ABSENT` for
+        a depute who is in none of them (like `vote`)
+        """
+        if depute not in self.depute_ids:
+            if self.use_numpy:
+                return numpy.full(len(self.scrutins), ABSENT, dtype=numpy.int8)
+            return array('b', [ABSENT]) * len(self.scrutins)
+        return self.votes.column(self.depute_ids[depute], len(self.scrutins))
+
+    def to_numpy(self):
+        """deputes x scrutins int8 NumPy array of the vote codes"""
+        if numpy is None:
+            raise ImportError('numpy is required to use VoteMatrix.to_numpy')
+        rows, cols = len(self.scrutins), len(self.deputes)
+        if self.use_numpy:
+            return self.votes.data[:rows, :cols].T.copy()
+        data = numpy.frombuffer(self.votes.data, dtype=numpy.int8).reshape(self.votes.rows, self.votes.cols)
+        return data[:rows, :cols].T.copy()
+
+    def cohesion(self, groupe):
+        """
+        Agreement index of `groupe` in each scrutin, in the order of
+        `scrutins`: (M - (T - M) / 2) / T with T the number of pour, contre
+        and abstention of the groupe and M the largest of the three. 1 when
+        the whole groupe voted alike, 0 when it split evenly between the
+        three, None (NaN with NumPy) when none of its deputes took part in
+        the vote.
+        """
+        groupe_code = self.groupe_ids[groupe] + 1
+        rows, cols = len(self.scrutins), len(self.deputes)
+
+        if self.use_numpy:
+            votes = self.votes.data[:rows, :cols]
+            members = self.groupes.data[:rows, :cols] == groupe_code
+            counts = numpy.stack([(members & (votes == code)).sum(axis=1) for code in EXPRIMED_CODES])
+            total = counts.sum(axis=0)
+            highest = counts.max(axis=0)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                return (1.5 * highest - 0.5 * total) / total
+
+        cohesion = []
+        for i in range(rows):
+            votes, groupes = self.votes.row(i, cols), self.groupes.row(i, cols)
+            counts = [0, 0, 0]
+            for vote, code in zip(votes, groupes):
+                if code == groupe_code and vote in EXPRIMED_CODES:
+                    counts[EXPRIMED_CODES.index(vote)] += 1
+            total = sum(counts)
+            cohesion.append((1.5 * max(counts) - 0.5 * total) / total if total else None)
+        return cohesion
+
+    def agreement(self, depute_a, depute_b):
+        """
+        Share of the scrutins in which both deputes took part where they
+        voted alike, None when they never voted in the same scrutin
+        """
+        votes_a, votes_b = self.depute_votes(depute_a), self.depute_votes(depute_b)
+
+        if self.use_numpy:
+            both = numpy.isin(votes_a, EXPRIMED_CODES) & numpy.isin(votes_b, EXPRIMED_CODES)
+            count = int(both.sum())
+            return float((votes_a[both] == votes_b[both]).sum()) / count if count else None
+
+        both = alike = 0
+        for vote_a, vote_b in zip(votes_a, votes_b):
+            if vote_a in EXPRIMED_CODES and vote_b in EXPRIMED_CODES:
+                both += 1
+                alike += vote_a == vote_b
+        return float(alike) / both if both else None
+
+    def agreement_matrix(self):
+        """
+        deputes x deputes NumPy array of the pairwise `agreement` (NaN for
+        the pairs who never voted in the same scrutin), requires NumPy
+        """
+        if numpy is None:
+            raise ImportError('numpy is required to use VoteMatrix.agreement_matrix')
+        votes = self.to_numpy().T
+        both = numpy.isin(votes, EXPRIMED_CODES).astype(numpy.float32)
+        alike = numpy.zeros((votes.shape[1], votes.shape[1]), dtype=numpy.float32)
+        for code in EXPRIMED_CODES:
+            voted = (votes == code).astype(numpy.float32)
+            alike += voted.T @ voted
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return alike / (both.T @ both)
@@ -0,0 +1,36 @@
+"""
+Per-page parse time of `parse_amendement` for each parser engine
+
+  python benchmarks/bench_amendement_parsing.py [number]
+"""
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from anpy.amendement import PARSER_ENGINES, parse_amendement  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources')
+
+
+def main(number=20):
+    for path in sorted(glob.glob(os.path.join(RESOURCES, 'amendements', '*.html'))):
+        with open(path, 'rb') as f:
+            html = f.read()
+        print(os.path.basename(path), '(%d bytes)' % len(html))
+
+        reference = None
+        for engine in PARSER_ENGINES:
+            amendement = parse_amendement('', html, engine=engine)
+            if reference is None:
+                reference = amendement
+            same = 'identical' if amendement == reference else 'DIFFERENT'
+
+            duration = timeit.timeit(lambda: parse_amendement('', html, engine=engine), number=number) / number
+            print('  %-10s %7.2f ms/page  %s' % (engine, duration * 1000, same))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
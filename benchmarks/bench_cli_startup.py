@@ -0,0 +1,65 @@
+"""
+Import time of each `anpy-cli` subcommand, as reported by
+`python -X importtime`: the CLI itself plus the imports done by the command
+before it starts working (offline, the commands are not run)
+
+  python benchmarks/bench_cli_startup.py [number]
+"""
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CLI = os.path.join(ROOT, 'bin', 'anpy-cli')
+
+
+def command_imports():
+    """dict command name -> source of the imports its function starts with"""
+    with open(CLI) as f:
+        source = f.read()
+    commands = {}
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        if not any('command' in ast.unparse(decorator) for decorator in node.decorator_list):
+            continue
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+            body = body[1:]  # docstring
+        imports = []
+        for statement in body:
+            if not isinstance(statement, (ast.Import, ast.ImportFrom)):
+                break
+            imports.append(ast.unparse(statement))
+        commands[node.name] = '\n'.join(imports)
+    return commands
+
+
+def import_time(code):
+    """total import time in ms and the 3 heaviest top level imports"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True).stderr
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not name[1:].startswith(' '):
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    heaviest = sorted(top_level, reverse=True)[:3]
+    return sum(duration for duration, _ in top_level), heaviest
+
+
+def main(number=3):
+    startup = 'import runpy; runpy.run_path(%r)' % CLI
+    rows = [('(startup)', '')] + sorted(command_imports().items())
+    for command, imports in rows:
+        results = [import_time(startup + '\n' + imports) for _ in range(number)]
+        total, heaviest = min(results)
+        print('%-26s %7.1f ms  %s' % (command, total, ', '.join('%s %.0f' % (name, duration) for duration, name in heaviest)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,69 @@
+"""
+Time to parse the dates found in the test fixtures with dateparser and with
+`parse_french_date`, cold (empty memo) and warm
+
+  python benchmarks/bench_date_parsing.py [number]
+"""
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import dateparser  # noqa: E402
+
+from anpy.utils import FRENCH_MONTHS, _parse_known_french_date, parse_french_date  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources')
+
+DATE_RE = re.compile(r'(?:(?:lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche) )?\d{1,2}(?:er)? (?:%s) \d{4}'
+                     r'|\d\d/\d\d/\d{4}' % '|'.join(FRENCH_MONTHS), re.IGNORECASE)
+
+
+def fixture_dates():
+    dates = []
+    for path in sorted(glob.glob(os.path.join(RESOURCES, '*', '*'))):
+        with open(path, 'rb') as f:
+            content = f.read()
+        try:
+            text = content.decode('utf-8')
+        except UnicodeDecodeError:
+            text = content.decode('iso-8859-1')
+        dates += DATE_RE.findall(re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', text)))
+    return dates
+
+
+def timed(label, func, dates, number):
+    durations = []
+    for _ in range(number):
+        start = time.time()
+        func()
+        durations.append(time.time() - start)
+    duration = min(durations)
+    print('  %-24s %8.2f ms  %6.2f us/date' % (label, duration * 1000, duration * 1e6 / len(dates)))
+
+
+def main(number=3):
+    dates = fixture_dates()
+    print('%d dates (%d distinct) in the fixtures' % (len(dates), len(set(dates))))
+
+    start = time.time()
+    dateparser.parse(dates[0], languages=['fr'])
+    print('  %-24s %8.2f ms' % ('dateparser first call', (time.time() - start) * 1000))
+
+    expected = [dateparser.parse(date, languages=['fr']) for date in dates]
+    assert [parse_french_date(date) for date in dates] == expected
+
+    timed('dateparser', lambda: [dateparser.parse(date, languages=['fr']) for date in dates], dates, number)
+
+    def cold():
+        _parse_known_french_date.cache_clear()
+        [parse_french_date(date) for date in dates]
+    timed('parse_french_date cold', cold, dates, number)
+    timed('parse_french_date warm', lambda: [parse_french_date(date) for date in dates], dates, number)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
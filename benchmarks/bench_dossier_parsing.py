@@ -0,0 +1,43 @@
+"""
+Per-page time of `DossierParser` with the legacy markdown round trip and the
+direct html normalization
+
+  python benchmarks/bench_dossier_parsing.py [number]
+"""
+import codecs
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from anpy.dossier import DossierParser, clean_html, normalize_html  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources')
+ENGINES = ('markdown', 'direct')
+
+
+def main(number=5):
+    for path in sorted(glob.glob(os.path.join(RESOURCES, 'dossiers', '14_*.html'))):
+        with codecs.open(path, encoding='iso-8859-1') as f:
+            html = f.read()
+        print(os.path.basename(path), '(%d chars)' % len(html))
+
+        for name, normalize in (('clean_html', clean_html), ('normalize_html', normalize_html)):
+            duration = timeit.timeit(lambda: normalize(html), number=number) / number
+            print('  %-16s %7.1f ms/page' % (name, duration * 1000))
+
+        reference = None
+        for engine in ENGINES:
+            dossier = DossierParser('', html, engine=engine).parse().to_dict()
+            if reference is None:
+                reference = dossier
+            same = 'identical' if dossier == reference else 'DIFFERENT'
+
+            duration = timeit.timeit(lambda: DossierParser('', html, engine=engine).parse(), number=number) / number
+            print('  parse %-10s %7.1f ms/page  %s' % (engine, duration * 1000, same))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""
+Time to decode an open data doslegs zip with `convert_dossiers_open_data_file`
+for each JSON backend and number of decoding processes. The zip is a
+synthetic export with the shape of Dossiers_Legislatifs_XV.json.zip
+
+  python benchmarks/bench_opendata_decoding.py [dossiers] [documents]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import anpy.dossier_from_opendata as opendata  # noqa: E402
+
+
+def synthetic_acte(uid, depth):
+    acte = {
+        '@xsi:type': 'Etape_Type',
+        'uid': uid,
+        'codeActe': 'AN1-DEPOT',
+        'libelleActe': {'nomCanonique': 'Dépôt d\'un projet de loi', 'libelleCourt': 'Dépôt'},
+        'organeRef': 'PO717460',
+        'dateActe': '2017-07-03T00:00:00.000+02:00',
+        'texteAssocie': 'PRJLANR5L15B0001',
+    }
+    if depth:
+        acte['actesLegislatifs'] = {'acteLegislatif': [synthetic_acte('%s-%d' % (uid, i), depth - 1) for i in range(3)]}
+    return acte
+
+
+def synthetic_zip(path, dossiers, documents):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as data_zip:
+        for i in range(dossiers):
+            uid = 'DLR5L15N%d' % i
+            data_zip.writestr('json/dossierParlementaire/%s.json' % uid, json.dumps({'dossierParlementaire': {
+                '@xsi:type': 'DossierLegislatif_Type',
+                'uid': uid,
+                'legislature': '15',
+                'titreDossier': {'titre': 'Dossier %d' % i, 'titreChemin': 'dossier_%d' % i, 'senatChemin': None},
+                'procedureParlementaire': {'code': '2', 'libelle': 'Projet de loi ordinaire'},
+                'actesLegislatifs': {'acteLegislatif': [synthetic_acte('L15-%d-%d' % (i, j), 3) for j in range(4)]},
+            }}))
+        for i in range(documents):
+            uid = 'PIONANR5L15B%04d' % i
+            data_zip.writestr('json/document/%s.json' % uid, json.dumps({'document': {
+                'uid': uid,
+                'legislature': '15',
+                'classification': {'type': {'code': 'PION', 'libelle': 'Proposition de loi'}},
+                'titres': {'titrePrincipal': 'Proposition de loi %d' % i * 4},
+                'auteurs': {'auteur': [{'acteur': {'acteurRef': 'PA%d' % j, 'qualite': 'auteur'}} for j in range(20)]},
+            }}))
+
+
+def timed(label, func, reference=None):
+    start = time.time()
+    result = func()
+    duration = time.time() - start
+    same = '' if reference is None else ('identical' if result == reference else 'DIFFERENT')
+    print('  %-28s %6.2f s  %s' % (label, duration, same))
+    return result
+
+
+def main(dossiers=1000, documents=10000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Dossiers_Legislatifs_XV.json.zip')
+        synthetic_zip(path, dossiers, documents)
+        print('%d dossiers, %d documents, %.1f MB zip' % (dossiers, documents, os.path.getsize(path) / 1e6))
+
+        def convert(workers=0):
+            with zipfile.ZipFile(path) as data_zip:
+                return opendata.convert_dossiers_open_data_file(data_zip, workers=workers)
+
+        fast_json = opendata.fast_json
+        opendata.fast_json = None
+        reference = timed('json, 1 process', convert)
+        opendata.fast_json = fast_json
+
+        if fast_json is not None:
+            timed('%s, 1 process' % fast_json.__name__, convert, reference)
+        for workers in sorted({2, os.cpu_count() or 1}):
+            timed('%s, %d workers' % (fast_json.__name__ if fast_json else 'json', workers),
+                  lambda: convert(workers), reference)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
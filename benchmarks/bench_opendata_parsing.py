@@ -0,0 +1,74 @@
+"""
+Time to parse every dossier of a synthetic open data export with
+`dossier_from_opendata.parse`, with the memoised `classify_code_acte` and
+with the classification computed again for each acte
+
+  python benchmarks/bench_opendata_parsing.py [dossiers]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import anpy.dossier_from_opendata as opendata  # noqa: E402
+
+STAGES = ['AN1', 'SN1', 'AN2', 'SN2', 'CMP', 'ANNLEC', 'SNNLEC', 'ANLDEF']
+LEAF_CODES = ['DEPOT', 'COM-FOND-SAISIE', 'COM-FOND-RAPPORT', 'COM-AVIS-RAPPORT', 'DEBATS-SEANCE', 'DEBATS-DEC']
+
+
+def synthetic_dossier(i, documents):
+    etapes = []
+    for j, stage in enumerate(STAGES):
+        actes = []
+        for k, code in enumerate(LEAF_CODES):
+            acte = {
+                '@xsi:type': 'Etape_Type',
+                'uid': 'L15-%d-%s-%d' % (i, stage, k),
+                'codeActe': '%s-%s' % (stage, code),
+                'dateActe': '2018-%02d-%02dT00:00:00.000+01:00' % (j + 1, k + 1),
+            }
+            if code in ('DEPOT', 'DEBATS-DEC'):
+                acte['texteAdopte'] = documents[(i + j + k) % len(documents)]['uid']
+            actes.append(acte)
+        etapes.append({'@xsi:type': 'Etape_Type', 'codeActe': stage, 'uid': 'L15-%d-%s' % (i, stage),
+                       'actesLegislatifs': {'acteLegislatif': actes}})
+    return {'dossierParlementaire': {
+        '@xsi:type': 'DossierLegislatif_Type',
+        'uid': 'DLR5L15N%d' % i,
+        'legislature': '15',
+        'titreDossier': {'titre': 'Dossier %d' % i, 'titreChemin': 'dossier_%d' % i, 'senatChemin': None},
+        'procedureParlementaire': {'libelle': 'Projet de loi ordinaire'},
+        'actesLegislatifs': {'acteLegislatif': etapes},
+    }}
+
+
+def parse_all(store, dossiers):
+    for i in range(dossiers):
+        opendata.parse('http://www.assemblee-nationale.fr/dyn/15/dossiers/dossier_%d' % i, logfile=io.StringIO(), store=store)
+
+
+def main(dossiers=2000):
+    documents = [{'uid': 'PRJLANR5L15B%04d' % i, 'classification': {'type': {'code': 'PRJL'}}} for i in range(500)]
+    export = {15: {'export': {
+        'dossiersLegislatifs': {'dossier': [synthetic_dossier(i, documents) for i in range(dossiers)]},
+        'textesLegislatifs': {'document': documents},
+    }}}
+    store = opendata.OpenDataStore(cache=export)
+    store.url_index(15)
+    print('%d dossiers, %d actes' % (dossiers, dossiers * len(STAGES) * len(LEAF_CODES)))
+
+    classify_code_acte = opendata.classify_code_acte
+    for label, classifier in (('uncached classifier', classify_code_acte.__wrapped__), ('memoised classifier', classify_code_acte)):
+        opendata.classify_code_acte = classifier
+        start = time.time()
+        parse_all(store, dossiers)
+        duration = time.time() - start
+        print('  %-20s %6.2f s  %5.2f ms/dossier' % (label, duration, duration * 1000 / dossiers))
+    opendata.classify_code_acte = classify_code_acte
+    print('  %s' % (classify_code_acte.cache_info(),))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
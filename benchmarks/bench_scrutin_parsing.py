@@ -0,0 +1,39 @@
+"""
+Parse time of a scrutin page, compared with the former pipeline which
+parsed the page a second time to build the synthese
+
+  python benchmarks/bench_scrutin_parsing.py [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from anpy.scrutin import ScrutinSyntheseParser, parse_scrutin  # noqa: E402
+
+URL = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212'
+PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources', 'scrutins', '14_num_1212.html')
+
+
+def double_parse(url, html):
+    scrutin = parse_scrutin(url, html)
+    scrutin.synthese = ScrutinSyntheseParser(url, html).parse()
+    return scrutin
+
+
+def main(number=10):
+    with open(PATH, 'rb') as f:
+        html = f.read()
+
+    single = timeit.timeit(lambda: parse_scrutin(URL, html), number=number) / number
+    double = timeit.timeit(lambda: double_parse(URL, html), number=number) / number
+
+    print('%s (%d bytes)' % (os.path.basename(PATH), len(html)))
+    print('  single parse   %7.2f ms/page' % (single * 1000))
+    print('  double parse   %7.2f ms/page' % (double * 1000))
+    print('  speed-up       %7.2fx' % (double / single))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,59 @@
+"""
+Memory and time of a `VoteMatrix` for a synthetic legislature (600 deputes
+in 8 groupes), with NumPy when it is installed and with `array('b')`
+
+  python benchmarks/bench_vote_matrix.py [scrutins]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from anpy.scrutin import Scrutin, ScrutinGroupe  # noqa: E402
+from anpy.vote_matrix import VoteMatrix, numpy  # noqa: E402
+
+DEPUTES = 600
+GROUPES = 8
+
+
+def synthetic_scrutin(numero, rng):
+    groupes = []
+    for g in range(GROUPES):
+        lists = {'pour': [], 'contre': [], 'abstention': [], 'nonvotants': []}
+        line = rng.choice(['pour', 'contre', 'abstention'])
+        for d in range(g, DEPUTES, GROUPES):
+            if rng.random() < 0.6:
+                continue  # absent
+            vote = line if rng.random() < 0.9 else rng.choice(list(lists))
+            lists[vote].append('depute %d' % d)
+        groupes.append(ScrutinGroupe(groupe='groupe %d' % g, **lists))
+    return Scrutin(legislature=15, numero=numero, groupes=groupes)
+
+
+def timed(label, func):
+    start = time.time()
+    result = func()
+    print('  %-22s %8.2f ms' % (label, (time.time() - start) * 1000))
+    return result
+
+
+def main(scrutins=4000):
+    rng = random.Random(0)
+    parsed = [synthetic_scrutin(numero, rng) for numero in range(1, scrutins + 1)]
+    print('%d scrutins, %d deputes' % (scrutins, DEPUTES))
+
+    for use_numpy in ([True, False] if numpy is not None else [False]):
+        print('numpy' if use_numpy else 'array')
+        matrix = timed('build', lambda: VoteMatrix.from_scrutins(parsed, use_numpy=use_numpy))
+        print('  %-22s %8.2f MB' % ('size', matrix.nbytes / 1e6))
+        depute_a, depute_b = matrix.deputes[:2]
+        timed('cohesion (1 groupe)', lambda: matrix.cohesion(matrix.groupe_names[0]))
+        timed('agreement (1 pair)', lambda: matrix.agreement(depute_a, depute_b))
+        if use_numpy:
+            timed('agreement_matrix', matrix.agreement_matrix)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -46,6 +46,11 @@ setup(
     packages=['anpy'],
 
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp'],
+        'fast-json': ['orjson'],
+        'vote-matrix': ['numpy'],
+    },
 
     scripts=['bin/anpy-cli'],
 )
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+import sys
+
+# anpy.aio and its tests use asynchronous generators and comprehensions,
+# a SyntaxError before Python 3.6
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_aio.py')
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from anpy.aio import (AsyncAmendementSearchService, AsyncFileTransport, AsyncQuestionSearchService,
+                      download_and_build_amendement, download_and_build_scrutin)
+from anpy.amendement import parse_amendement
+from anpy.utils import json_dumps, json_loads
+
+from tests.test_amendement_service import FakeSearchTransport
+from tests.test_question_service import FakeQuestionSearchTransport
+
+AMENDEMENT_URL = 'http://www.assemblee-nationale.fr/14/amendements/0996/CION_LOIS/CL4.asp'
+AMENDEMENT_PATH = 'tests/resources/amendements/14_amendements_0996_CION_LOIS_CL4.html'
+SCRUTIN_URL = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212'
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_download_and_build_amendement():
+    transport = AsyncFileTransport({AMENDEMENT_URL: AMENDEMENT_PATH})
+    html = codecs.open(AMENDEMENT_PATH, encoding='utf-8').read()
+
+    amendement = run(download_and_build_amendement(AMENDEMENT_URL, transport))
+    assert amendement == parse_amendement(AMENDEMENT_URL, html)
+
+
+def test_download_and_build_scrutin():
+    transport = AsyncFileTransport({SCRUTIN_URL: 'tests/resources/scrutins/14_num_1212.html'})
+
+    with ThreadPoolExecutor(2) as executor:
+        scrutin = run(download_and_build_scrutin(SCRUTIN_URL, transport, executor=executor))
+
+    expected = json_loads(codecs.open('tests/resources/scrutins/14_num_1212.json', encoding='utf-8').read())
+    assert json_loads(json_dumps(scrutin.to_dict())) == expected
+
+
+class AsyncFakeSearchTransport(FakeSearchTransport):
+    async def get(self, url, params=None):
+        await asyncio.sleep(0)
+        return super(AsyncFakeSearchTransport, self).get(url, params=params)
+
+
+def test_async_get_order():
+    service = AsyncAmendementSearchService(transport=AsyncFakeSearchTransport(95), concurrency=4)
+    assert run(service.get_order(rows=10)) == [str(num) for num in range(1, 96)]
+    assert run(service.total_count(rows=10)) == 95
+
+
+class AsyncFakeQuestionSearchTransport(FakeQuestionSearchTransport):
+    async def post(self, url, data=None):
+        return super(AsyncFakeQuestionSearchTransport, self).post(url, data=data)
+
+    async def get(self, url):
+        await asyncio.sleep(0)
+        return super(AsyncFakeQuestionSearchTransport, self).get(url)
+
+
+def test_async_question_iter():
+    service = AsyncQuestionSearchService(transport=AsyncFakeQuestionSearchTransport(23), concurrency=3)
+
+    async def numeros():
+        return [int(question.numero) async for page in service.iter(legislature=15, size=5) for question in page.results]
+    assert run(numeros()) == list(range(1, 24))
+
+
+def test_async_service_closes_its_transport():
+    pytest.importorskip('aiohttp')
+
+    async def open_session():
+        async with AsyncQuestionSearchService() as service:
+            return service.transport.session
+    assert run(open_session()).closed
+
+    transport = AsyncFileTransport({})
+    closed = []
+
+    async def close():
+        closed.append(transport)
+    transport.close = close
+
+    async def given_transport():
+        async with AsyncAmendementSearchService(transport=transport):
+            pass
+    run(given_transport())
+    assert closed == []
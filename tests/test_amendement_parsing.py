@@ -6,7 +6,7 @@ import codecs
 import attr
 from bs4 import BeautifulSoup
 
-from anpy.amendement import parse_amendements_summary, parse_amendement, remove_inline_css_and_invalid_tags
+from anpy.amendement import parse_amendements_summary, parse_amendement, remove_inline_css_and_invalid_tags, PARSER_ENGINES
 
 
 def test_remove_inline_css_and_invalid_tags():
@@ -98,4 +98,12 @@ def test_if_comments_are_removed():
     html = codecs.open('tests/resources/amendements/14_amendements_0922_AN_406.html', encoding='utf-8').read()
     data = parse_amendement('http://www.assemblee-nationale.fr/14/amendements/0922/AN/406.asp', html)
 
-    assert data.dispositif == '<p></p><p>Supprimer le mot :</p><p></p><p>« républicaine ».</p><p></p>'
\ No newline at end of file
+    assert data.dispositif == '<p></p><p>Supprimer le mot :</p><p></p><p>« républicaine ».</p><p></p>'
+
+
+def test_parser_engines():
+    for filename in ['14_amendements_0996_CION_LOIS_CL4', '14_amendements_0922_AN_406']:
+        html = open('tests/resources/amendements/%s.html' % filename, 'rb').read()
+        expected = parse_amendement('', html)
+        for engine in PARSER_ENGINES:
+            assert parse_amendement('', html, engine=engine) == expected
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import time
+
 from anpy.amendement import AmendementSearchService
 
 
@@ -28,3 +30,42 @@ def test_get_order():
     service = AmendementSearchService()
     order = service.get_order(idDossierLegislatif=31515, idExamen=3295, rows=2)
     assert order == ['CD4', 'CD13', 'CD1', 'CD3', 'CD2']
+
+
+class FakeSearchTransport(object):
+    """Serves `total_count` fake amendements, later pages answer faster"""
+    def __init__(self, total_count):
+        self.total_count = total_count
+
+    def get(self, url, params=None):
+        start = params['start'] or 1
+        rows = params['rows']
+        time.sleep(0.05 / start)
+        nums = range(start, min(start + rows, self.total_count + 1))
+        return FakeResponse(url, {
+            'infoGenerales': {
+                'nb_resultats': self.total_count,
+                'debut': start,
+                'nb_docs': len(nums),
+                'description_schema': 'numAmend|urlAmend',
+            },
+            'data_table': ['%d|http://www.assemblee-nationale.fr/15/amendements/%d.asp' % (num, num) for num in nums],
+        })
+
+
+class FakeResponse(object):
+    def __init__(self, url, data):
+        self.url = url
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def test_concurrent_get_order():
+    service = AmendementSearchService(transport=FakeSearchTransport(95), concurrency=4)
+    order = service.get_order(rows=10)
+    assert order == [str(num) for num in range(1, 96)]
+
+    pages = list(service.iterator(rows=10, concurrency=1))
+    assert [page.start for page in pages] == list(range(1, 96, 10))
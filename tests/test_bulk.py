@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import codecs
+
+from anpy.amendement import download_amendements, parse_amendement
+from anpy.bulk import resume_jsonl
+from anpy.scrutin import parse_scrutin
+from anpy.tableau_scrutins import URL_TEMPLATE, download_tableau_scrutins
+from anpy.transport import FileTransport
+
+ROUTES = {
+    'http://www.assemblee-nationale.fr/14/amendements/0996/CION_LOIS/CL4.asp':
+        'tests/resources/amendements/14_amendements_0996_CION_LOIS_CL4.html',
+    'http://www.assemblee-nationale.fr/14/amendements/0922/AN/406.asp':
+        'tests/resources/amendements/14_amendements_0922_AN_406.html',
+}
+MISSING_URL = 'http://www.assemblee-nationale.fr/14/amendements/0922/AN/1.asp'
+SCRUTIN_PATH = 'tests/resources/scrutins/14_num_1212.html'
+
+
+def expected_amendements():
+    return {
+        url: parse_amendement(url, codecs.open(path, encoding='utf-8').read())
+        for url, path in ROUTES.items()
+    }
+
+
+def check_results(results):
+    results = {result.url: result for result in results}
+
+    assert set(results) == set(ROUTES) | {MISSING_URL}
+    assert results[MISSING_URL].value is None
+    assert results[MISSING_URL].error is not None
+    assert {url: results[url].value for url in ROUTES} == expected_amendements()
+
+
+def test_download_amendements_in_threads():
+    urls = list(ROUTES) + [MISSING_URL]
+    check_results(download_amendements(urls, transport=FileTransport(ROUTES), io_workers=2, cpu_workers=0))
+
+
+def test_download_amendements_in_processes():
+    urls = iter(list(ROUTES) + [MISSING_URL])
+    check_results(download_amendements(urls, transport=FileTransport(ROUTES), io_workers=2, cpu_workers=2))
+
+
+def test_resume_jsonl(tmp_path):
+    path = str(tmp_path / 'scrutins.jsonl')
+    assert resume_jsonl(path, 'numero') == set()
+
+    with open(path, 'w') as f:
+        f.write('{"numero": 1}\n{"numero": 2}\n{"numero": 3, "tit')
+    assert resume_jsonl(path, 'numero') == {1, 2}
+    with open(path) as f:
+        assert f.read() == '{"numero": 1}\n{"numero": 2}\n'
+    assert resume_jsonl(path, 'numero') == {1, 2}
+
+    # only a last line without newline is dropped
+    with open(path, 'w') as f:
+        f.write('{"numero": 1}\n{"numero": 2, "tit\n{"titre": "x"}\n[3]\n{"numero": 4}\n')
+    assert resume_jsonl(path, 'numero') == {1, 4}
+    with open(path) as f:
+        assert f.read().endswith('{"numero": 4}\n')
+
+
+def test_download_tableau_scrutins(tmp_path):
+    detail_url = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/%d'
+    rows = ''.join('<tr><td>%d</td><td>26/01/2016</td><td>Objet <a href="%s">[analyse du scrutin]</a></td>'
+                   '<td>1</td><td>0</td><td>0</td></tr>' % (num, detail_url % num) for num in (1214, 1213, 1212))
+    page = tmp_path / 'liste.html'
+    page.write_text('<table id="listeScrutins"><tbody>%s</tbody></table>' % rows)
+
+    routes = {URL_TEMPLATE.format(offset=offset, legislature=14): str(page) for offset in (0, 100)}
+    routes.update({detail_url % num: SCRUTIN_PATH for num in (1214, 1213, 1212)})
+
+    results = list(download_tableau_scrutins(legislature=14, skip={1213}, transport=FileTransport(routes),
+                                             io_workers=2, cpu_workers=2))
+
+    assert sorted(result.value.numero for result in results) == [1212, 1214]
+    with open(SCRUTIN_PATH, 'rb') as f:
+        expected = parse_scrutin(detail_url % 1212, f.read()).to_dict()
+    assert [result.value.to_dict() for result in results if result.value.numero == 1212] == [expected]
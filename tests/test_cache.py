@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+
+import requests
+
+from anpy.cache import CachingTransport, find_legislature, legislature_ttl
+from anpy.scrutin import Scrutin
+from anpy.transport import FileTransport
+
+SCRUTIN_URL = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212'
+CURRENT_URL = 'http://www.assemblee-nationale.fr/15/amendements/0996/CION_LOIS/CL4.asp'
+
+
+class FakeOrigin(object):
+    """Server answering `304 Not Modified` to a request with the right ETag"""
+    def __init__(self, content=b'<html>v1</html>', etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        self.requests.append((method, url, headers or {}))
+
+        response = requests.Response()
+        response.url = url
+        response.raw = io.BytesIO()
+        if (headers or {}).get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = self.etag
+            if kwargs.get('stream'):
+                response.raw = io.BytesIO(self.content)
+                response._content = False
+            else:
+                response._content = self.content
+        return response
+
+    def close(self):
+        pass
+
+
+def test_find_legislature():
+    assert find_legislature(SCRUTIN_URL) == 14
+    assert find_legislature(CURRENT_URL) == 15
+    assert find_legislature('http://www.assemblee-nationale.fr/dyn/15/dossiers/alimentation') == 15
+    assert find_legislature('http://questions.assemblee-nationale.fr/q14/14-98895QE.htm') == 14
+    assert find_legislature('http://www2.assemblee-nationale.fr/documents/liste/(ajax)/1/(offset)/10/(limit)/10/(legis)/13/') == 13
+    assert find_legislature('http://videos.assemblee-nationale.fr/seance-publique.p1') is None
+
+    assert legislature_ttl(SCRUTIN_URL) is None
+    assert legislature_ttl(CURRENT_URL) == 3600
+
+
+def test_closed_legislature_never_expires(tmpdir):
+    origin = FileTransport({SCRUTIN_URL: 'tests/resources/scrutins/14_num_1212.html'})
+    transport = CachingTransport(origin, directory=str(tmpdir))
+    expected = Scrutin.download_and_build(SCRUTIN_URL, transport=origin).to_dict()
+
+    assert transport.get(SCRUTIN_URL).from_cache is False
+    origin.routes = {}
+    response = transport.get(SCRUTIN_URL)
+    assert response.from_cache is True
+    assert response.status_code == 200
+    assert Scrutin.download_and_build(SCRUTIN_URL, transport=transport).to_dict() == expected
+
+
+def test_revalidation(tmpdir):
+    origin = FakeOrigin()
+    transport = CachingTransport(origin, directory=str(tmpdir), ttl=lambda url: 0)
+
+    assert transport.get(CURRENT_URL).content == b'<html>v1</html>'
+    assert 'If-None-Match' not in origin.requests[-1][2]
+
+    response = transport.get(CURRENT_URL)
+    assert origin.requests[-1][2]['If-None-Match'] == '"v1"'
+    assert response.from_cache is True
+    assert response.content == b'<html>v1</html>'
+
+    origin.content, origin.etag = b'<html>v2</html>', '"v2"'
+    response = transport.get(CURRENT_URL)
+    assert response.from_cache is False
+    assert response.content == b'<html>v2</html>'
+    assert transport.get(CURRENT_URL).from_cache is True
+    assert len(origin.requests) == 4
+
+
+def test_post_is_not_cached(tmpdir):
+    origin = FakeOrigin()
+    transport = CachingTransport(origin, directory=str(tmpdir))
+
+    transport.post(CURRENT_URL)
+    transport.post(CURRENT_URL)
+    assert [method for method, _, _ in origin.requests] == ['POST', 'POST']
+    assert not tmpdir.listdir()
+
+
+def test_stream_is_served_from_the_cached_file(tmpdir):
+    origin = FakeOrigin(content=b'PK' * 100000)
+    transport = CachingTransport(origin, directory=str(tmpdir))
+
+    response = transport.get(CURRENT_URL, stream=True)
+    assert response.from_cache is False
+    assert b''.join(response.iter_content(chunk_size=4096)) == origin.content
+    response.close()
+
+    response = transport.get(CURRENT_URL, stream=True)
+    assert response.from_cache is True
+    assert b''.join(response.iter_content(chunk_size=4096)) == origin.content
+    response.close()
+    assert len(origin.requests) == 1
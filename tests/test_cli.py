@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import os
+import runpy
+import subprocess
+import sys
+
+from anpy.amendement import PARSER_ENGINES
+
+CLI = os.path.join(os.path.dirname(__file__), '..', 'bin', 'anpy-cli')
+
+
+def test_cli_parser_engines():
+    assert runpy.run_path(CLI)['PARSER_ENGINES'] == PARSER_ENGINES
+
+
+def test_cli_startup_imports():
+    # the commands import their parsers themselves, loading the cli must not
+    code = 'import runpy, sys; runpy.run_path(%r); print(" ".join(sorted(sys.modules)))' % CLI
+    modules = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).split()
+    assert not [module for module in modules if module.startswith('anpy') or module in ('bs4', 'requests', 'dateparser', 'lxml')]
+
+
+def test_cli_parse_many_disable_cache(tmp_path):
+    from click.testing import CliRunner
+    from anpy.cache import CachingTransport
+    from anpy.transport import get_configured_transport, set_default_transport
+
+    cli = runpy.run_path(CLI)['cli']
+    try:
+        result = CliRunner().invoke(cli, ['--cache-dir', str(tmp_path / 'cache'), 'parse-many', '--disable-cache',
+                                          str(tmp_path / 'doslegs')], input='')
+        assert result.exit_code == 0, result.output
+        transport = get_configured_transport()
+        assert transport is not None and not isinstance(transport, CachingTransport)
+    finally:
+        set_default_transport(None)
@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 
 from datetime import datetime
 
-from anpy.utils import extract_datetime
+from anpy.utils import extract_datetime, parse_french_date
 
 
 def test_extract_date():
@@ -11,3 +11,22 @@ def test_extract_date():
     assert extract_datetime('lundi 17 juin 2013') == datetime(2013, 6, 17)
     assert extract_datetime('mercredi 11 septembre 2013') == datetime(2013, 9, 11)
     assert extract_datetime('24 mars 2015 à 17 heures') == datetime(2015, 3, 24, 17, 0)
+
+
+def test_parse_french_date():
+    assert parse_french_date('mardi 1er décembre 2015') == datetime(2015, 12, 1)
+    assert parse_french_date('Jeudi 17 Décembre 2015 à 9:05') == datetime(2015, 12, 17, 9, 5)
+    assert parse_french_date('26/01/2016') == datetime(2016, 1, 26)
+    assert parse_french_date('31 février 2015') is None
+    # the other formats are parsed by dateparser
+    assert parse_french_date('16 avr. 2010') == datetime(2010, 4, 16)
+
+
+def test_parse_french_date_fallback_is_not_cached(monkeypatch):
+    import dateparser
+
+    now = [datetime(2018, 1, 1)]
+    monkeypatch.setattr(dateparser, 'parse', lambda text, languages: now[0])
+    assert parse_french_date('hier') == datetime(2018, 1, 1)
+    now[0] = datetime(2018, 1, 2)
+    assert parse_french_date('hier') == datetime(2018, 1, 2)
@@ -2,8 +2,12 @@
 from __future__ import unicode_literals
 
 import codecs
+import io
+import json
+import zipfile
 from datetime import datetime
 
+import pytest
 from bs4 import BeautifulSoup
 
 from anpy.dossier import (
@@ -24,9 +28,24 @@ from anpy.dossier import (
     DecisionStatus)
 from anpy.utils import json_dumps, json_loads
 
-from anpy.dossier_like_senapy import historic_doslegs_parse as historic_parse_like_senapy
+from anpy.dossier_like_senapy import HtmlLine, historic_doslegs_parse as historic_parse_like_senapy
 
-from anpy.dossier_like_senapy import parse as parse_dossier_like_senapy
+from anpy.dossier_like_senapy import parse as parse_dossier_like_senapy, parse_many as parse_many_like_senapy
+
+from anpy.dossier_from_opendata import (
+    OPEN_DATA_DOSLEGS_FILES,
+    OPEN_DATA_REUNIONS_URL,
+    OpenDataStore,
+    TextUrlResolver,
+    classify_code_acte,
+    convert_dossiers_open_data_file,
+    find_in_open_data_zip,
+    find_texts_discussed_after,
+    open_data_doslegs_zip,
+    parse as parse_opendata,
+    yield_leafs)
+from anpy.opendata_snapshot import OpenDataChanges, OpenDataSnapshot
+from anpy.transport import FileTransport
 
 
 
@@ -328,6 +347,45 @@ def test_dossiers():
             codecs.open('tests/resources/dossiers/%s.senapy.json' % filename, encoding='utf-8').read())
         assert dossier_data == expected_data
 
+
+def test_dossiers_direct_engine():
+    for filename in ['14_dossiers_sante', '14_dossiers_republique_numerique', '14_dossiers_art11_Constitution_pl']:
+        url = 'http://www.assemblee-nationale.fr/%s.asp' % filename.replace('_', '/', 2)
+        html = codecs.open('tests/resources/dossiers/%s.html' % filename, encoding='iso-8859-1').read()
+        dossier = DossierParser(url, html, engine='direct').parse()
+        expected_data = json_loads(
+            codecs.open('tests/resources/dossiers/%s.json' % filename, encoding='utf-8').read())
+        assert json_loads(json_dumps(dossier.to_dict())) == expected_data
+
+
+def test_html_normalization_engines():
+    html = '<div> first <b>part</b> <br><br> second part<p>third<sup>e</sup>&nbsp;part</p></div>'
+
+    assert [p.get_text() for p in DossierParser('', html, engine='direct').soup.find_all('p')] == \
+        ['first part', 'second part', 'thirde part']
+    with pytest.raises(ValueError):
+        DossierParser('', html, engine='unknown')
+
+    # the direct engine gives the parser the same links and the same dossier
+    # as the markdown one
+    for filename in ['14_dossiers_sante', '14_dossiers_republique_numerique', '14_dossiers_art11_Constitution_pl']:
+        url = 'http://www.assemblee-nationale.fr/%s.asp' % filename.replace('_', '/', 2)
+        html = codecs.open('tests/resources/dossiers/%s.html' % filename, encoding='iso-8859-1').read()
+        markdown, direct = DossierParser(url, html), DossierParser(url, html, engine='direct')
+        assert [a['href'] for a in direct.soup.find_all('a')] == [a['href'] for a in markdown.soup.find_all('a')]
+        assert direct.parse().to_dict() == markdown.parse().to_dict()
+
+
+def test_html_line():
+    for filename in ['14_dossiers_sante', '14_dossiers_republique_numerique', '14_dossiers_art11_Constitution_pl']:
+        html = codecs.open('tests/resources/dossiers/%s.html' % filename, encoding='iso-8859-1').read()
+        for line in html.split('\n'):
+            soup = BeautifulSoup(line, 'lxml')
+            parsed_line = HtmlLine(line)
+            assert parsed_line.text == soup.text.strip()
+            assert parsed_line.hrefs == [a.attrs.get('href') for a in soup.select('a')]
+
+
 def test_opendata_dossiers():
     url = 'http://www.assemblee-nationale.fr/dyn/15/dossiers/Violences_faites_aux_femmes'
     filename = '15_dossiers_Violences_faites_aux_femmes'
@@ -336,3 +394,265 @@ def test_opendata_dossiers():
         codecs.open('tests/resources/dossiers/%s.senapy.json' % filename, encoding='utf-8').read())
     assert dossier_data == expected_data
 
+
+def test_parse_many(tmpdir):
+    transport = opendata_transport(tmpdir)
+    urls = ['http://www.assemblee-nationale.fr/dyn/15/dossiers/%s' % slug for slug in ('depot', 'enquete', 'inconnu')]
+    expected = {url: parse_dossier_like_senapy(url, transport=transport, logfile=io.StringIO()) for url in urls[:2]}
+    assert expected[urls[0]][0]['assemblee_id'] == '15-depot'
+
+    for jobs, ordered in ((1, False), (2, True), (2, False)):
+        store = OpenDataStore(transport=transport)
+        results = list(parse_many_like_senapy(urls, logfile=io.StringIO(), transport=transport, store=store,
+                                              jobs=jobs, ordered=ordered))
+        # not in the XV export, the XIV one is missing from the transport
+        assert [result.url for result in results if result.error is not None] == [urls[2]]
+        assert {result.url: result.value for result in results if result.error is None} == expected
+        if ordered:
+            assert [result.url for result in results] == urls
+        if jobs > 1:
+            assert list(store.cache) == [15]
+
+
+def test_parse_many_without_fork(tmpdir, monkeypatch):
+    import multiprocessing
+
+    # spawned workers do not inherit the transport, it is given to them
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    monkeypatch.setattr(multiprocessing, 'get_context', lambda method=None: get_context(method or 'spawn'))
+    transport = opendata_transport(tmpdir)
+    url = 'http://www.assemblee-nationale.fr/dyn/15/dossiers/depot'
+    expected = parse_dossier_like_senapy(url, transport=transport, logfile=io.StringIO())
+
+    results = list(parse_many_like_senapy([url], logfile=io.StringIO(), transport=transport, jobs=2))
+    assert [(result.value, result.error) for result in results] == [(expected, None)]
+
+
+def opendata_dossier(uid, legislature, titreChemin, type='DossierLegislatif_Type'):
+    return {'dossierParlementaire': {
+        '@xsi:type': type,
+        'uid': uid,
+        'legislature': legislature,
+        'titreDossier': {'titre': titreChemin, 'titreChemin': titreChemin, 'senatChemin': None},
+        'procedureParlementaire': {'libelle': 'Projet de loi ordinaire'},
+        'actesLegislatifs': {'acteLegislatif': {'@xsi:type': 'ProcedureAccelere_Type', 'dateActe': '2017-07-03T00:00:00'}},
+    }}
+
+
+def test_opendata_store():
+    export = {15: {'export': {
+        'dossiersLegislatifs': {'dossier': [
+            opendata_dossier('DLR5L15N1', '15', 'enquete', type='DossierCommissionEnquete_Type'),
+            opendata_dossier('DLR5L15N2', '15', 'enquete'),
+            opendata_dossier('DLR5L14N3', '14', 'ancien'),
+            opendata_dossier('DLR5L15N4', '15', 'enquete'),
+        ]},
+        'textesLegislatifs': {'document': []},
+    }}}
+    store = OpenDataStore(cache=export)
+
+    assert store.find('http://www.assemblee-nationale.fr/dyn/15/dossiers/enquete', 15)['uid'] == 'DLR5L15N2'
+    assert store.find('http://www.assemblee-nationale.fr/dyn/15/dossiers/ancien', 15)['uid'] == 'DLR5L14N3'
+    assert store.find('http://www.assemblee-nationale.fr/dyn/15/dossiers/DLR5L15N4', 15)['uid'] == 'DLR5L15N4'
+    assert store.find('http://www.assemblee-nationale.fr/15/dossiers/DLR5L15N4.asp', 15)['uid'] == 'DLR5L15N4'
+    assert store.find('http://www.assemblee-nationale.fr/dyn/15/dossiers/DLR5L15N1', 15) is None
+    assert store.find('http://www.assemblee-nationale.fr/dyn/15/dossiers/inconnu', 15) is None
+    assert list(store.dossiers(15)) == ['DLR5L15N1', 'DLR5L15N2', 'DLR5L14N3', 'DLR5L15N4']
+
+    data = parse_opendata('http://www.assemblee-nationale.fr/dyn/15/dossiers/DLR5L15N4', store=store, logfile=io.StringIO())
+    assert data['assemblee_id'] == '15-enquete'
+    assert data['urgence']
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as data_zip:
+        for name, data in members.items():
+            data_zip.writestr(name, json.dumps(data))
+    return path
+
+
+def opendata_transport(tmpdir):
+    depot = opendata_dossier('DLR5L15N5', '15', 'depot')
+    depot['dossierParlementaire']['actesLegislatifs'] = {'acteLegislatif': {
+        '@xsi:type': 'Etape_Type', 'codeActe': 'AN1', 'actesLegislatifs': {'acteLegislatif': {
+            '@xsi:type': 'DepotInitiative_Type', 'codeActe': 'AN1-DEPOT', 'uid': 'L15-AN1-DEPOT',
+            'dateActe': '2017-07-03T00:00:00', 'texteAssocie': 'PRJLANR5L14B0042'}}}}
+    documents = [
+        {'uid': 'PRJLANR5L14B0042', 'classification': {'type': {'code': 'PRJL'}}},
+        {'uid': 'PIONANR5L15B0001', 'classification': {'type': {'code': 'PION'}}},
+    ]
+    doslegs = {'json/dossierParlementaire/%s.json' % dossier['dossierParlementaire']['uid']: dossier
+               for dossier in (opendata_dossier('DLR5L15N2', '15', 'enquete'), depot)}
+    doslegs.update({'json/document/%s.json' % doc['uid']: {'document': doc} for doc in documents})
+    reunions = {
+        'json/reunion/RUANR5L15S2018IDS1.json': {'reunion': {
+            'timeStampDebut': '2018-01-10T09:30:00.000+01:00',
+            'ODJ': {'pointsODJ': {'pointODJ': {'dossiersLegislatifsRefs': {'dossierRef': 'DLR5L15N5'}}}}}},
+        'json/reunion/RUANR5L15S2017IDS1.json': {'reunion': {
+            'timeStampDebut': '2017-10-10T09:30:00.000+01:00',
+            'ODJ': {'pointsODJ': {'pointODJ': {'dossiersLegislatifsRefs': {'dossierRef': 'DLR5L15N2'}}}}}},
+    }
+    return FileTransport({
+        OPEN_DATA_DOSLEGS_FILES[15][1]: write_zip(str(tmpdir.join('doslegs.zip')), doslegs),
+        OPEN_DATA_REUNIONS_URL: write_zip(str(tmpdir.join('reunions.zip')), reunions),
+    })
+
+
+def test_opendata_zip(tmpdir):
+    transport = opendata_transport(tmpdir)
+
+    with open_data_doslegs_zip(15, transport=transport) as data_zip:
+        assert [dossier['uid'] for dossier in data_zip.dossiers()] == ['DLR5L15N2', 'DLR5L15N5']
+        assert [doc['uid'] for doc in data_zip.documents()] == ['PRJLANR5L14B0042', 'PIONANR5L15B0001']
+
+    url = 'http://www.assemblee-nationale.fr/dyn/15/dossiers/depot'
+    data = parse_opendata(url, transport=transport, logfile=io.StringIO())
+    assert data == parse_opendata(url, store=OpenDataStore(transport=transport), logfile=io.StringIO())
+    assert data['steps'][0]['source_url'] == 'http://www.assemblee-nationale.fr/14/projets/pl0042.asp'
+    assert OpenDataStore(transport=transport).text_urls(15) == {
+        'PRJLANR5L14B0042': 'http://www.assemblee-nationale.fr/14/projets/pl0042.asp',
+        'PIONANR5L15B0001': 'http://www.assemblee-nationale.fr/dyn/opendata/PIONANR5L15B0001.html',
+    }
+
+    assert find_texts_discussed_after('2018-01-01', transport=transport) == {url}
+
+
+def test_opendata_zip_decodes_only_the_needed_members(tmpdir, monkeypatch):
+    import anpy.dossier_from_opendata as dossier_from_opendata
+
+    dossier = opendata_dossier('DLR5L15N1', '15', 'un')
+    dossier['dossierParlementaire']['actesLegislatifs'] = {'acteLegislatif': {
+        '@xsi:type': 'DepotInitiative_Type', 'codeActe': 'AN1-DEPOT', 'texteAssocie': 'PIONANR5L15B0042'}}
+    members = {'json/dossierParlementaire/DLR5L15N1.json': dossier}
+    members.update({'json/document/PIONANR5L15B%04d.json' % num: {'document': {'uid': 'PIONANR5L15B%04d' % num}}
+                    for num in range(100)})
+    transport = FileTransport({OPEN_DATA_DOSLEGS_FILES[15][1]: write_zip(str(tmpdir.join('doslegs.zip')), members)})
+
+    decoded = []
+
+    def decode_json(raw):
+        decoded.append(raw)
+        return json.loads(raw.decode('utf-8'))
+    monkeypatch.setattr(dossier_from_opendata, 'decode_json', decode_json)
+
+    with open_data_doslegs_zip(15, transport=transport) as data_zip:
+        assert [dossier['uid'] for dossier in data_zip.dossiers()] == ['DLR5L15N1']
+    assert len(decoded) == 1
+
+    del decoded[:]
+    dossier, docs = find_in_open_data_zip('http://www.assemblee-nationale.fr/dyn/15/dossiers/un', 15, transport=transport)
+    assert dossier['uid'] == 'DLR5L15N1'
+    assert list(docs) == ['PIONANR5L15B0042']
+    assert len(decoded) == 2
+
+
+def test_opendata_zip_single_file(tmpdir, monkeypatch):
+    import anpy.dossier_from_opendata as dossier_from_opendata
+
+    export = {'export': {
+        'dossiersLegislatifs': {'dossier': [opendata_dossier('DLR5L14N1', '14', 'un')]},
+        'textesLegislatifs': {'document': [{'uid': 'PRJLANR5L14B0001'}]},
+    }}
+    filename, file_url = OPEN_DATA_DOSLEGS_FILES[14]
+    transport = FileTransport({file_url: write_zip(str(tmpdir.join('export.zip')), {filename: export})})
+
+    decoded = []
+
+    def decode_json(raw):
+        decoded.append(raw)
+        return json.loads(raw.decode('utf-8'))
+    monkeypatch.setattr(dossier_from_opendata, 'decode_json', decode_json)
+
+    with open_data_doslegs_zip(14, transport=transport) as data_zip:
+        assert [dossier['uid'] for dossier in data_zip.dossiers()] == ['DLR5L14N1']
+        assert [doc['uid'] for doc in data_zip.documents()] == ['PRJLANR5L14B0001']
+    assert len(decoded) == 1
+
+
+def test_opendata_parallel_decoding(tmpdir):
+    opendata_transport(tmpdir)
+
+    with zipfile.ZipFile(str(tmpdir.join('doslegs.zip'))) as data_zip:
+        export = convert_dossiers_open_data_file(data_zip)
+        assert [doc['uid'] for doc in export['export']['textesLegislatifs']['document']] == ['PRJLANR5L14B0042', 'PIONANR5L15B0001']
+        assert convert_dossiers_open_data_file(data_zip, workers=2) == export
+
+
+def test_opendata_snapshot(tmpdir):
+    transport = opendata_transport(tmpdir)
+    path = str(tmpdir.join('snapshot.json'))
+
+    snapshot = OpenDataSnapshot.load(path)
+    changes = snapshot.refresh_legislature(15, transport=transport)
+    assert changes.added == {'DLR5L15N2', 'DLR5L15N5'}
+    assert not changes.changed and not changes.removed
+    snapshot.save(path)
+
+    snapshot = OpenDataSnapshot.load(path)
+    assert snapshot.url('DLR5L15N5') == 'http://www.assemblee-nationale.fr/dyn/15/dossiers/depot'
+    assert snapshot.refresh_legislature(15, transport=transport) == OpenDataChanges()
+
+    # a text of DLR5L15N5 changes, DLR5L15N2 is replaced by DLR5L15N6
+    with zipfile.ZipFile(str(tmpdir.join('doslegs.zip'))) as data_zip:
+        members = {name: json.loads(data_zip.read(name).decode('utf-8')) for name in data_zip.namelist()}
+    del members['json/dossierParlementaire/DLR5L15N2.json']
+    members['json/dossierParlementaire/DLR5L15N6.json'] = opendata_dossier('DLR5L15N6', '15', 'nouveau')
+    members['json/document/PRJLANR5L14B0042.json']['document']['titre'] = 'nouveau titre'
+    write_zip(str(tmpdir.join('doslegs.zip')), members)
+
+    changes = snapshot.refresh_legislature(15, transport=transport)
+    assert changes == OpenDataChanges(added={'DLR5L15N6'}, changed={'DLR5L15N5'}, removed={'DLR5L15N2'})
+    assert changes.updated == {'DLR5L15N5', 'DLR5L15N6'}
+
+
+def test_opendata_snapshot_single_file(tmpdir):
+    def export(*dossiers):
+        return {'export': {'dossiersLegislatifs': {'dossier': list(dossiers)}, 'textesLegislatifs': {'document': []}}}
+
+    path = str(tmpdir.join('export.zip'))
+    snapshot = OpenDataSnapshot()
+    with zipfile.ZipFile(write_zip(path, {'export.json': export(opendata_dossier('DLR5L14N1', '14', 'un'))})) as data_zip:
+        assert snapshot.refresh(data_zip, filename='export.json').added == {'DLR5L14N1'}
+        assert snapshot.refresh(data_zip, filename='export.json') == OpenDataChanges()
+
+    exported = export(opendata_dossier('DLR5L14N1', '14', 'un'), opendata_dossier('DLR5L14N2', '14', 'deux'))
+    with zipfile.ZipFile(write_zip(path, {'export.json': exported})) as data_zip:
+        assert snapshot.refresh(data_zip, filename='export.json') == OpenDataChanges(added={'DLR5L14N2'})
+
+
+def test_classify_code_acte():
+    assert classify_code_acte('AN1-DEPOT') == ('assemblee', 'depot', '1ère lecture', False)
+    assert classify_code_acte('SNNLEC-COM-FOND') == ('senat', 'commission', 'nouv. lect.', False)
+    assert classify_code_acte('CMP-DEBATS-AN-DEC') == ('assemblee', 'hemicycle', 'CMP', False)
+    assert classify_code_acte('CMP-COM-RAPPORT-SN') == ('senat', 'commission', 'CMP', True)
+    assert classify_code_acte('ANLDEF-COM') == ('assemblee', 'commission', 'l. définitive', True)
+    assert classify_code_acte('AN1-COM-AVIS-RAPPORT') == (None, None, None, True)
+    assert classify_code_acte('AN1-ETI') == ('assemblee', None, None, False)
+
+
+def test_yield_leafs():
+    leaf = {'uid': 'leaf'}
+    etape = {'uid': 'root', 'actesLegislatifs': {'acteLegislatif': [
+        {'uid': 'a', 'actesLegislatifs': {'acteLegislatif': leaf}},
+        {'uid': 'b'},
+    ]}}
+    assert [([parent['uid'] for parent in path], acte['uid']) for path, acte in yield_leafs(etape)] == \
+        [(['root', 'a'], 'leaf'), (['root'], 'b')]
+
+
+def test_text_url_resolver():
+    resolver = TextUrlResolver()
+    assert resolver.text_url('PRJLANR5L14B0042', 'PRJL') == 'http://www.assemblee-nationale.fr/14/projets/pl0042.asp'
+    assert resolver.text_url('PRJLANR5L14BTC0042', 'PRJL') == 'http://www.assemblee-nationale.fr/14/ta-commission/r0042-a0.asp'
+    assert resolver.source_url('PIONANR5L15B0001', 'PION') == 'http://www.assemblee-nationale.fr/dyn/opendata/PIONANR5L15B0001.html'
+    with pytest.raises(Exception):
+        resolver.text_url('ALCNANR5L14B0002', 'ALCN')
+
+    assert resolver.source_urls([
+        {'uid': 'PRJLANR5L14B0042', 'classification': {'type': {'code': 'PRJL'}}},
+        ('ALCNANR5L14B0002', 'ALCN'),
+    ]) == {
+        'PRJLANR5L14B0042': 'http://www.assemblee-nationale.fr/14/projets/pl0042.asp',
+        'ALCNANR5L14B0002': None,
+    }
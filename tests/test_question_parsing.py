@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import codecs
+import tarfile
+from datetime import date
+from operator import attrgetter
 
-from anpy.question import parse_question
+from anpy.question import iterparse_questions, parse_question, parse_question_files
+
+QUESTION_PATH = 'tests/resources/questions/q14_14-47351QE.xml'
 
 
 def test_question_parsing():
@@ -12,3 +17,42 @@ def test_question_parsing():
     assert ['@TYPE', 'LEGISLATURE', 'DEPOT', 'AUTEUR', 'GROUPE', 'CIRCONSCRIPTION', 'INDEXATION_AN', 'MINI', 'MINA',
             'ERRATUM_QUESTION', 'SIGNALEMENT', 'RENOUVELLEMENT', 'CLOTURE', 'REPONSE', 'ERRATUM_REPONSE',
             'URL'] == list(parsing_result.keys())
+
+
+def test_iterparse_questions():
+    with open(QUESTION_PATH, 'rb') as f:
+        record, = iterparse_questions(f)
+
+    assert record.url == 'http://questions.assemblee-nationale.fr/q14/14-47351QE.htm'
+    assert (record.legislature, record.numero, record.question_type) == (14, 47351, 'QE')
+    assert record.date_depot == date(2014, 1, 7)
+    assert (record.author_id, record.author, record.groupe) == (923, 'François Cornut-Gentille', 'LES-REP')
+    assert record.rubrique == 'défense'
+    assert record.analyses == ('équipements militaires', 'vieillissement', 'bilan')
+    assert record.ministere_attributaire == 'Ministère de la défense'
+    assert record.texte.startswith("M. François Cornut-Gentille interroge")
+    assert record.cloture == 'Réponse publiée'
+    assert record.date_reponse == date(2014, 5, 13)
+
+    # same question in many documents: the categorical values are shared
+    with open(QUESTION_PATH, 'rb') as f:
+        other, = iterparse_questions(f.read())
+    assert other == record
+    assert other.rubrique is record.rubrique
+
+
+def test_parse_question_files(tmpdir):
+    with open(QUESTION_PATH, 'rb') as f:
+        xml = f.read()
+    directory = tmpdir.mkdir('questions')
+    for numero in (3, 1, 2):
+        directory.join('q14_14-%dQE.xml' % numero).write_binary(xml.replace(b'NUMERO="47351"', b'NUMERO="%d"' % numero))
+    tarball = str(tmpdir.join('questions.tar.gz'))
+    with tarfile.open(tarball, 'w:gz') as tar:
+        tar.add(str(directory), arcname='questions')
+
+    records = list(parse_question_files(str(directory), workers=0))
+    assert [record.numero for record in records] == [1, 2, 3]
+    assert list(parse_question_files(str(directory), workers=2, chunk_size=2)) == records
+    assert sorted(parse_question_files(tarball, workers=0), key=attrgetter('numero')) == records
+    assert records[0].rubrique is list(parse_question_files(tarball, workers=1))[0].rubrique
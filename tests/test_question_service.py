@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
+import re
 
-from anpy.question import QuestionSearchService
+import attr
+
+from anpy.question import QuestionSearchCursor, QuestionSearchService
 
 
 def test_get():
@@ -19,3 +22,67 @@ def test_iter():
     next(iterator)
     second_page_result = next(iterator)
     assert 5 == len(second_page_result.results)
+
+
+class FakeQuestionSearchTransport(object):
+    """Serves `total_count` fake questions, the pages are linked by their offset"""
+    def __init__(self, total_count):
+        self.total_count = total_count
+        self.size = None
+        self.requested_offsets = []
+
+    def post(self, url, data=None):
+        self.size = data['limit']
+        return self.page(url, 0)
+
+    def get(self, url):
+        return self.page(url, int(re.search(r'\(offset\)/(\d+)', url).group(1)))
+
+    def page(self, url, offset):
+        self.requested_offsets.append(offset)
+        rows = ''.join(
+            '<tr><td><a href="http://questions.assemblee-nationale.fr/q15/15-%dQE.htm">%d</a></td>'
+            '<td><strong>Auteur</strong><em>tags</em></td><td><strong>01/02/2018</strong></td></tr>' % (num, num)
+            for num in range(offset + 1, min(offset + self.size, self.total_count) + 1))
+        next_link = ''
+        if offset + self.size < self.total_count:
+            next_link = '<a href="recherche/resultats_questions/(offset)/%d">Suivant</a>' % (offset + self.size)
+        html = ('<article><div><div><p><strong>%d</strong></p></div></div></article>'
+                '<table><tr><th>Question</th></tr>%s</table>'
+                '<div class="pagination-bootstrap"><ul><li>1</li><li>%s</li></ul></div>') % (self.total_count, rows, next_link)
+        return FakeResponse(url, html.encode('utf-8'))
+
+
+class FakeResponse(object):
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+
+
+def numeros(pages):
+    return [int(question.numero) for page in pages for question in page.results]
+
+
+def test_iter_pages():
+    transport = FakeQuestionSearchTransport(total_count=23)
+    pages = list(QuestionSearchService(transport=transport).iter(legislature=15, size=5, concurrency=3))
+
+    assert numeros(pages) == list(range(1, 24))
+    assert sorted(transport.requested_offsets) == [0, 5, 10, 15, 20]
+
+
+def test_iter_from_cursor():
+    transport = FakeQuestionSearchTransport(total_count=23)
+    service = QuestionSearchService(transport=transport)
+    cursor = QuestionSearchCursor(legislature=15, size=5)
+
+    iterator = service.iter_from(cursor)
+    next(iterator)
+    next(iterator)
+    assert cursor.offset == 5  # the second page is not processed yet
+    iterator.close()
+
+    transport.requested_offsets = []
+    resumed = list(service.iter_from(QuestionSearchCursor(**attr.asdict(cursor)), concurrency=2))
+    assert numeros(resumed) == list(range(6, 24))
+    assert sorted(transport.requested_offsets) == [0, 5, 10, 15, 20]
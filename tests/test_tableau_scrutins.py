@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+
+from anpy.tableau_scrutins import parse_tableau_page, parse_tableau_scrutins
+
+PAGE_URL = 'http://www2.assemblee-nationale.fr/scrutins/liste/(offset)/0/(legislature)/15/(type)/TOUS/(idDossier)/TOUS'
+
+
+class FakeTableauTransport(object):
+    """Serves a table of `total_count` scrutins, the last page past its end"""
+    def __init__(self, total_count):
+        self.total_count = total_count
+        self.requested_offsets = []
+
+    def get(self, url):
+        offset = int(re.search(r'\(offset\)/(\d+)', url).group(1))
+        self.requested_offsets.append(offset)
+        offset = min(offset, (self.total_count - 1) // 100 * 100)
+        rows = ''.join(
+            '<tr><td>%d*</td><td>01/02/2018</td><td>Objet %d <a href="/15/dossiers/d%d.asp">[dossier]</a> '
+            '<a href="/scrutins/detail/(legislature)/15/(num)/%d">[analyse du scrutin]</a></td>'
+            '<td>10</td><td>5</td><td>0</td></tr>' % (num, num, num, num)
+            for num in range(self.total_count - offset, max(self.total_count - offset - 100, 0), -1))
+        return FakeResponse('<table id="listeScrutins"><tbody>%s</tbody></table>' % rows)
+
+
+class FakeResponse(object):
+    def __init__(self, text):
+        self.text = text
+
+
+def test_parse_tableau_page():
+    html = ('<table id="listeScrutins"><tbody><tr><td>1212</td><td>26/01/2016</td>'
+            '<td>l\'ensemble du projet de loi <a href="/14/dossiers/republique_numerique.asp">[dossier]</a> '
+            '<a href="/scrutins/detail/(legislature)/14/(num)/1212">[analyse du scrutin]</a></td>'
+            '<td>356</td><td>1</td><td>206</td></tr></tbody></table>')
+
+    assert parse_tableau_page(PAGE_URL, html) == [{
+        "numero": 1212,
+        "date": "26/01/2016",
+        "objet": "l'ensemble du projet de loi",
+        "pour": 356,
+        "contre": 1,
+        "abstention": 206,
+        "url_dossier": "http://www2.assemblee-nationale.fr/14/dossiers/republique_numerique.asp",
+        "url_scrutin": "http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212",
+    }]
+
+
+def test_parse_tableau_scrutins_full_crawl():
+    transport = FakeTableauTransport(total_count=250)
+    scrutins = list(parse_tableau_scrutins(concurrency=4, transport=transport))
+
+    assert [scrutin["numero"] for scrutin in scrutins] == list(range(250, 0, -1))
+    assert scrutins[0]["url_dossier"] == 'http://www2.assemblee-nationale.fr/15/dossiers/d250.asp'
+    assert sorted(transport.requested_offsets)[:4] == [0, 100, 200, 300]
+
+
+def test_parse_tableau_scrutins_since():
+    transport = FakeTableauTransport(total_count=250)
+    scrutins = list(parse_tableau_scrutins(since=230, concurrency=4, transport=transport))
+
+    assert [scrutin["numero"] for scrutin in scrutins] == list(range(250, 230, -1))
+    assert transport.requested_offsets == [0]
+
+    transport = FakeTableauTransport(total_count=250)
+    scrutins = list(parse_tableau_scrutins(since=120, transport=transport))
+    assert len(scrutins) == 130
+    assert transport.requested_offsets == [0, 100]
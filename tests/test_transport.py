@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import codecs
+
+from anpy.amendement import Amendement, parse_amendement
+from anpy.scrutin import Scrutin
+from anpy.transport import FileTransport, Transport
+from anpy.utils import json_dumps, json_loads
+
+AMENDEMENT_URL = 'http://www.assemblee-nationale.fr/14/amendements/0996/CION_LOIS/CL4.asp'
+AMENDEMENT_PATH = 'tests/resources/amendements/14_amendements_0996_CION_LOIS_CL4.html'
+SCRUTIN_URL = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212'
+
+
+def test_transport_session_pool():
+    transport = Transport(pool_maxsize=4, pool_block=True, timeout=5)
+    adapter = transport.session.get_adapter('http://www2.assemblee-nationale.fr/')
+
+    assert adapter._pool_maxsize == 4
+    assert adapter._pool_block
+    assert transport.timeout == 5
+
+
+def test_file_transport():
+    transport = FileTransport({AMENDEMENT_URL: AMENDEMENT_PATH}, encoding='utf-8')
+
+    response = transport.get(AMENDEMENT_URL)
+    assert response.status_code == 200
+    assert response.url == AMENDEMENT_URL
+
+    assert transport.get(AMENDEMENT_URL + '?foo=bar').status_code == 404
+    assert transport.get(AMENDEMENT_URL, params={'foo': 'bar'}).status_code == 404
+
+
+def test_amendement_download_and_build():
+    transport = FileTransport({AMENDEMENT_URL: AMENDEMENT_PATH})
+    html = codecs.open(AMENDEMENT_PATH, encoding='utf-8').read()
+
+    assert Amendement.download_and_build(AMENDEMENT_URL, transport=transport) == parse_amendement(AMENDEMENT_URL, html)
+
+
+def test_scrutin_download_and_build():
+    transport = FileTransport({SCRUTIN_URL: 'tests/resources/scrutins/14_num_1212.html'})
+    scrutin = Scrutin.download_and_build(SCRUTIN_URL, transport=transport)
+    expected = json_loads(codecs.open('tests/resources/scrutins/14_num_1212.json', encoding='utf-8').read())
+
+    assert json_loads(json_dumps(scrutin.to_dict())) == expected
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import gc
+
+from anpy.utils import gc_paused
+
+
+def test_gc_paused_overlapping():
+    assert gc.isenabled()
+    outer = gc_paused()
+    outer.__enter__()
+    with gc_paused():
+        assert not gc.isenabled()
+    # the inner block exiting first does not turn the collector back on
+    assert not gc.isenabled()
+    outer.__exit__(None, None, None)
+    assert gc.isenabled()
+
+    gc.disable()
+    try:
+        with gc_paused():
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+
+import pytest
+
+from anpy.videos import SeenSet, parse_videos_list
+
+
+class FakeVideosTransport(object):
+    """Serves `counts[type]` videos per type, 3 per page, the last page past its end"""
+    def __init__(self, counts):
+        self.counts = counts
+        self.requested_pages = []
+
+    def get(self, url):
+        type, page = re.search(r'/([a-z-]+)\.p(\d+)$', url).groups()
+        self.requested_pages.append((type, int(page)))
+        count = self.counts[type]
+        start = min((int(page) - 1) * 3, (count - 1) // 3 * 3)
+        videos = ''.join('<div class="span4"><a class="vl" href="/%s.video.%d">video</a></div>' % (type, num)
+                         for num in range(count - start, max(count - start - 3, 0), -1))
+        return FakeResponse('<div id="myCarousel-contenu">%s</div>' % videos)
+
+
+class FakeResponse(object):
+    def __init__(self, text):
+        self.text = text
+
+
+def urls(videos):
+    return [(video['type'], int(video['url'].rsplit('.', 1)[1])) for video in videos]
+
+
+def test_parse_videos_list_full_crawl():
+    transport = FakeVideosTransport({'seance-publique': 7, 'commissions': 2})
+    seen = SeenSet()
+    videos = list(parse_videos_list(seen=seen, concurrency=3, transport=transport))
+
+    assert urls(videos) == [('seance', num) for num in range(7, 0, -1)] + [('commission', 2), ('commission', 1)]
+    assert len(seen) == 9
+
+
+def test_parse_videos_list_incremental(tmp_path):
+    path = str(tmp_path / 'videos.seen')
+    transport = FakeVideosTransport({'seance-publique': 7, 'commissions': 2})
+    seen = SeenSet.load(path)
+    list(parse_videos_list(seen=seen, transport=transport))
+    seen.save(path)
+
+    transport = FakeVideosTransport({'seance-publique': 9, 'commissions': 2})
+    seen = SeenSet.load(path)
+    assert len(seen) == 9
+    assert 'http://videos.assemblee-nationale.fr/seance-publique.video.7' in seen
+
+    videos = list(parse_videos_list(seen=seen, concurrency=3, transport=transport))
+    assert urls(videos) == [('seance', 9), ('seance', 8)]
+    assert transport.requested_pages == [('seance-publique', 1), ('seance-publique', 2), ('commissions', 1)]
+
+
+class InterruptedVideosTransport(FakeVideosTransport):
+    """Fails once `pages_before_failure` pages were served"""
+    def __init__(self, counts, pages_before_failure):
+        super(InterruptedVideosTransport, self).__init__(counts)
+        self.pages_before_failure = pages_before_failure
+
+    def get(self, url):
+        if len(self.requested_pages) == self.pages_before_failure:
+            raise IOError('connection reset')
+        return super(InterruptedVideosTransport, self).get(url)
+
+
+def test_parse_videos_list_interrupted_full_crawl(tmp_path):
+    path = str(tmp_path / 'videos.seen')
+    transport = InterruptedVideosTransport({'seance-publique': 7, 'commissions': 2}, pages_before_failure=2)
+    seen = SeenSet.load(path)
+    videos = []
+    with pytest.raises(IOError):
+        for video in parse_videos_list(seen=seen, transport=transport):
+            videos.append(video)
+    seen.save(path)
+    assert urls(videos) == [('seance', num) for num in range(7, 1, -1)]
+
+    # the next run is still a full crawl, it goes past the pages already seen
+    seen = SeenSet.load(path)
+    assert not seen.complete
+    transport = FakeVideosTransport({'seance-publique': 8, 'commissions': 2})
+    videos = list(parse_videos_list(seen=seen, transport=transport))
+    assert urls(videos) == [('seance', 8), ('seance', 1), ('commission', 2), ('commission', 1)]
+    seen.save(path)
+
+    seen = SeenSet.load(path)
+    assert seen.complete and len(seen) == 10
+    transport = FakeVideosTransport({'seance-publique': 8, 'commissions': 2})
+    assert list(parse_videos_list(seen=seen, transport=transport)) == []
+    assert transport.requested_pages == [('seance-publique', 1), ('commissions', 1)]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import codecs
+import math
+
+import pytest
+
+from anpy.scrutin import Scrutin, ScrutinGroupe, parse_scrutin
+from anpy.vote_matrix import ABSENT, ABSTENTION, CONTRE, NON_VOTANT, POUR, VoteMatrix
+
+SCRUTIN_URL = 'http://www2.assemblee-nationale.fr/scrutins/detail/(legislature)/14/(num)/1212'
+
+
+def build_scrutins():
+    return [
+        Scrutin(legislature=14, numero=1, groupes=[
+            ScrutinGroupe(groupe='A', pour=['a1', 'a2', 'a3'], contre=['a4']),
+            ScrutinGroupe(groupe='B', contre=['b1', 'b2'], nonvotants=['b3']),
+        ]),
+        Scrutin(legislature=14, numero=2, groupes=[
+            ScrutinGroupe(groupe='A', pour=['a1', 'a2'], contre=['a3', 'a4']),
+            ScrutinGroupe(groupe='B', pour=['b1'], abstention=['b2']),
+        ]),
+        Scrutin(legislature=14, numero=3, groupes=[
+            ScrutinGroupe(groupe='A', pour=['a1', 'a2', 'a3', 'a4']),
+            ScrutinGroupe(groupe='B', nonvotants=['b3']),
+        ]),
+    ]
+
+
+@pytest.fixture(params=[False, True], ids=['array', 'numpy'])
+def use_numpy(request):
+    if request.param:
+        pytest.importorskip('numpy')
+    return request.param
+
+
+def test_vote_matrix_ids_and_votes(use_numpy):
+    matrix = VoteMatrix.from_scrutins(build_scrutins(), use_numpy=use_numpy)
+
+    assert matrix.shape == (7, 3)
+    assert matrix.deputes == ['a1', 'a2', 'a3', 'a4', 'b1', 'b2', 'b3']
+    assert matrix.groupe_names == ['A', 'B']
+    assert matrix.scrutins == [(14, 1), (14, 2), (14, 3)]
+
+    assert list(matrix.depute_votes('a3')) == [POUR, CONTRE, POUR]
+    assert list(matrix.depute_votes('b2')) == [CONTRE, ABSTENTION, ABSENT]
+    assert list(matrix.depute_votes('b3')) == [NON_VOTANT, ABSENT, NON_VOTANT]
+    assert matrix.vote('b1', (14, 2)) == POUR
+    assert matrix.vote('unknown', (14, 2)) == ABSENT
+    assert list(matrix.depute_votes('unknown')) == [ABSENT, ABSENT, ABSENT]
+
+
+def test_vote_matrix_replace_scrutin(use_numpy):
+    matrix = VoteMatrix.from_scrutins(build_scrutins(), use_numpy=use_numpy)
+    scrutin_id = matrix.add(Scrutin(legislature=14, numero=2, groupes=[
+        ScrutinGroupe(groupe='C', contre=['c1']),
+    ]))
+
+    assert scrutin_id == 1
+    assert matrix.shape == (8, 3)
+    assert list(matrix.depute_votes('a1')) == [POUR, ABSENT, POUR]
+    assert list(matrix.depute_votes('c1')) == [ABSENT, CONTRE, ABSENT]
+
+
+def test_vote_matrix_cohesion(use_numpy):
+    matrix = VoteMatrix.from_scrutins(build_scrutins(), use_numpy=use_numpy)
+
+    assert list(matrix.cohesion('A')) == [0.625, 0.25, 1.0]
+    cohesion_b = list(matrix.cohesion('B'))
+    assert cohesion_b[:2] == [1.0, 0.25]
+    assert cohesion_b[2] is None or math.isnan(cohesion_b[2])
+
+
+def test_vote_matrix_agreement(use_numpy):
+    matrix = VoteMatrix.from_scrutins(build_scrutins(), use_numpy=use_numpy)
+
+    assert matrix.agreement('a1', 'a2') == 1.0
+    assert matrix.agreement('a1', 'a3') == 2.0 / 3
+    assert matrix.agreement('a4', 'b2') == 0.5
+    assert matrix.agreement('a1', 'b3') is None
+    assert matrix.agreement('a1', 'unknown') is None
+
+
+def test_vote_matrix_agreement_matrix():
+    pytest.importorskip('numpy')
+    matrix = VoteMatrix.from_scrutins(build_scrutins())
+    agreement = matrix.agreement_matrix()
+
+    ids = matrix.depute_ids
+    assert agreement.shape == (7, 7)
+    assert agreement[ids['a1'], ids['a3']] == pytest.approx(2.0 / 3)
+    assert math.isnan(agreement[ids['a1'], ids['b3']])
+
+
+def test_vote_matrix_from_scrutin_page():
+    with codecs.open('tests/resources/scrutins/14_num_1212.html') as f:
+        scrutin = parse_scrutin(SCRUTIN_URL, f.read())
+    matrix = VoteMatrix.from_scrutins([scrutin], use_numpy=False)
+
+    votes = sum(len(groupe.pour) + len(groupe.contre) + len(groupe.abstention) + len(groupe.nonvotants)
+                for groupe in scrutin.groupes)
+    assert matrix.shape == (votes, 1)
+    assert matrix.vote('Claude Bartolone', (14, 1212)) == NON_VOTANT